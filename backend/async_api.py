@@ -0,0 +1,264 @@
+"""Async database mode for the core CRUD endpoints.
+
+Enabled with ``DB_ASYNC=1``: GET/POST/PUT/PATCH/DELETE on ``/cars`` run as
+``async def`` handlers on an ``AsyncEngine`` (asyncpg for PostgreSQL,
+aiosqlite for SQLite), so a request waiting on the database no longer holds
+one of the threadpool's worker threads. Query construction, caching, ETags
+and invalidation are shared with the sync handlers in ``main``.
+"""
+import os
+from datetime import datetime
+from typing import List, Optional, Union
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db_pool import engine_options, watch_pool
+from main import (
+    CATALOG_STATE_QUERY,
+    DATABASE_URL,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SORT,
+    DUPLICATE_DEALER_REF,
+    MAX_PAGE_SIZE,
+    Car,
+    CarCreate,
+    CarFilters,
+    CarPatch,
+    CarPhoto,
+    CarResponse,
+    CarSummary,
+    apply_car_update,
+    car_entry,
+    car_list_entry,
+    car_list_response,
+    car_list_statement,
+    car_patch_failed,
+    car_patch_statement,
+    car_photo_keys,
+    car_response,
+    car_stamp_statement,
+    car_version_statement,
+    catalog_bump_statement,
+    catalog_state_tuple,
+    check_car_stamp,
+    get_session_factory,
+    has_validators,
+    is_not_modified,
+    kick_blob_cleanup,
+    list_cache_key,
+    list_etag,
+    list_projection,
+    listing_cache,
+    new_car,
+    not_modified_response,
+    page_rows,
+    parse_sort,
+    patch_changes_rollups,
+    projected_list_entry,
+    projection_photos_statement,
+    publish_car_change,
+    queue_blob_deletions,
+    rollup_delta_rows,
+    rollup_entries_statement,
+    rollup_entry,
+    rollup_upsert_statement,
+)
+
+# Async driver for each sync dialect the app is deployed with
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Swap the driver in a sync SQLAlchemy URL for its async counterpart."""
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if not separator or dialect not in ASYNC_DRIVERS:
+        return url
+    return ASYNC_DRIVERS[dialect] + separator + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool))
+watch_pool(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def touch_catalog(db: AsyncSession):
+    await db.execute(catalog_bump_statement(datetime.utcnow()))
+
+
+async def apply_rollup_delta(db: AsyncSession, removed=(), added=()):
+    rows = rollup_delta_rows(removed, added)
+    if rows:
+        await db.execute(rollup_upsert_statement(db.bind.dialect.name), rows)
+
+
+async def commit_or_conflict(db: AsyncSession):
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+
+
+async def flush_car_write(db: AsyncSession):
+    try:
+        await db.flush()
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Car not found")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+
+
+router = APIRouter()
+
+
+@router.get("/cars", response_model=Union[List[CarResponse], List[CarSummary]])
+async def get_cars(
+    request: Request,
+    filters: CarFilters = Depends(),
+    sort: str = DEFAULT_SORT,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    unbounded: bool = Query(False, alias="all"),
+    fields: Optional[str] = Query(None, description="Comma-separated car fields to return"),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    column, descending = parse_sort(sort)
+    projection = list_projection(fields, view)
+    cache_key = list_cache_key(filters, sort, limit, cursor, unbounded, projection)
+    entry = None if unbounded else listing_cache.get_list(cache_key)
+    if entry is None:
+        generation = listing_cache.generation
+
+        version, last_modified = catalog_state_tuple((await db.execute(CATALOG_STATE_QUERY)).first())
+        etag = list_etag(version, cache_key)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        statement = car_list_statement(filters, sort, column, descending, limit, cursor, unbounded, projection)
+        if projection is None:
+            cars = (await db.scalars(statement)).all()
+            entry = car_list_entry(cars, sort, column, limit, unbounded, etag, last_modified)
+        else:
+            rows, next_cursor = page_rows((await db.execute(statement)).all(), sort, column, limit, unbounded)
+            photos = projection_photos_statement(projection, rows)
+            photo_rows = (await db.execute(photos)).all() if photos is not None else []
+            entry = projected_list_entry(rows, photo_rows, projection, next_cursor, etag, last_modified)
+        if not unbounded:
+            listing_cache.set_list(cache_key, entry, generation)
+    return car_list_response(request, entry)
+
+
+@router.get("/cars/{car_id}", response_model=CarResponse)
+async def get_car(car_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    entry = listing_cache.get_car(car_id)
+    if entry is None:
+        generation = listing_cache.generation
+
+        if has_validators(request):
+            stamp = (await db.execute(car_stamp_statement(car_id))).first()
+            not_modified = check_car_stamp(request, car_id, stamp)
+            if not_modified is not None:
+                return not_modified
+
+        car = await db.get(Car, car_id)
+        if car is None:
+            raise HTTPException(status_code=404, detail="Car not found")
+        entry = car_entry(car)
+        listing_cache.set_car(car_id, entry, generation)
+    return car_response(request, entry)
+
+
+@router.post("/cars", response_model=CarResponse)
+async def create_car(car: CarCreate, db: AsyncSession = Depends(get_async_db)):
+    db_car = new_car(car)
+    db.add(db_car)
+    await apply_rollup_delta(db, added=[rollup_entry(car)])
+    await touch_catalog(db)
+    await commit_or_conflict(db)
+    await db.refresh(db_car)
+    publish_car_change(db_car.id, db_car)
+    return db_car
+
+
+@router.put("/cars/{car_id}", response_model=CarResponse)
+async def update_car(car_id: int, car: CarCreate, db: AsyncSession = Depends(get_async_db)):
+    db_car = await db.get(Car, car_id, with_for_update=True)
+    if db_car is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+
+    before = rollup_entry(db_car)
+    apply_car_update(db_car, car)
+    await flush_car_write(db)
+    await apply_rollup_delta(db, [before], [rollup_entry(car)])
+    await touch_catalog(db)
+    await commit_or_conflict(db)
+    await db.refresh(db_car)
+    publish_car_change(db_car.id, db_car)
+    return db_car
+
+
+@router.patch("/cars/{car_id}", response_model=CarResponse)
+async def patch_car(car_id: int, patch: CarPatch, db: AsyncSession = Depends(get_async_db)):
+    # Deliberate extra read, as in main.patch_car: RETURNING cannot report the replaced values
+    before = None
+    if patch_changes_rollups(patch):
+        before = (await db.execute(rollup_entries_statement(Car.id == car_id, Car.version == patch.version))).first()
+    try:
+        db_car = (await db.scalars(car_patch_statement(car_id, patch))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+    if db_car is None:
+        await db.rollback()
+        raise car_patch_failed(await db.scalar(car_version_statement(car_id)))
+
+    response = CarResponse.model_validate(db_car)
+    if before is not None:
+        await apply_rollup_delta(db, [rollup_entry(before)], [rollup_entry(db_car)])
+    await touch_catalog(db)
+    await db.commit()
+    publish_car_change(car_id, db_car)
+    return response
+
+
+@router.delete("/cars/{car_id}")
+async def delete_car(
+    car_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory=Depends(get_session_factory),
+):
+    db_car = await db.get(Car, car_id, with_for_update=True)
+    if db_car is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+
+    removed, keys = rollup_entry(db_car), car_photo_keys(db_car.photo_rows)
+    await db.execute(delete(CarPhoto).where(CarPhoto.car_id == car_id))
+    if not (await db.execute(delete(Car).where(Car.id == car_id))).rowcount:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Car not found")
+    queue_blob_deletions(db, keys)
+    await apply_rollup_delta(db, removed=[removed])
+    await touch_catalog(db)
+    await db.commit()
+    publish_car_change(car_id)
+    kick_blob_cleanup(background_tasks, session_factory)
+    return {"message": "Car deleted successfully"}
@@ -0,0 +1,115 @@
+"""Benchmark the sync CRUD handlers against the async database mode.
+
+Each mode runs in its own process (``DB_ASYNC`` is read at import time) and
+serves a mix of GET /cars and GET /cars/{id} to ``--concurrency`` clients in
+flight at once, with the read cache disabled so every request reaches the
+database. Prints requests/second for both modes and the ratio.
+
+Usage:
+    python benchmarks/async_throughput.py [--concurrency 500] [--requests 5000] [--cars 1000]
+        [--database-url postgresql://user:pw@localhost/cars]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CAR = {
+    "brand": "Toyota",
+    "model": "Camry",
+    "series": "Hybrid",
+    "year": 2023,
+    "mileage_km": 15000,
+    "engine_cm3": 2500,
+    "car_status": "odpala i jezdzi",
+    "location_status": "na miejscu",
+    "price": 95000.0,
+}
+
+
+async def drive(app, concurrency, total, car_ids):
+    import httpx
+
+    paths = [f"/cars/{car_ids[i % len(car_ids)]}" if i % 2 else "/cars?limit=20" for i in range(total)]
+    queue = iter(paths)
+    latencies = []
+
+    async def worker(client):
+        for path in queue:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+def run_worker(args):
+    """Serve the benchmark in this process, in the mode selected by DB_ASYNC."""
+    from sqlalchemy import text
+
+    import main
+
+    main.ensure_schema()
+    with main.engine.begin() as conn:
+        conn.execute(text("DELETE FROM cars"))
+    with main.SessionLocal() as db:
+        cars = [main.new_car(main.CarCreate(**dict(CAR, price=float(i)))) for i in range(args.cars)]
+        db.add_all(cars)
+        db.commit()
+        car_ids = [car.id for car in cars]
+
+    result = asyncio.run(drive(main.app, args.concurrency, args.requests, car_ids))
+    print(json.dumps(result))
+
+
+def run_mode(args, database_url, async_mode):
+    env = dict(os.environ, DATABASE_URL=database_url, DB_ASYNC="1" if async_mode else "0", CACHE_TTL_SECONDS="0")
+    command = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--concurrency", str(args.concurrency), "--requests", str(args.requests), "--cars", str(args.cars)]
+    output = subprocess.run(command, env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='car-finder-bench-'), 'bench.db')}"
+    results = {"sync": run_mode(args, database_url, False), "async": run_mode(args, database_url, True)}
+    for mode, result in results.items():
+        print(f"{mode:>5}: {result['requests_per_second']:>8.1f} req/s  "
+              f"p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+    ratio = results["async"]["requests_per_second"] / results["sync"]["requests_per_second"]
+    print(f"async/sync throughput at {args.concurrency} concurrent connections: {ratio:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,83 @@
+"""Benchmark single-item POST /cars against POST /cars/bulk.
+
+Runs both paths in-process against a throwaway SQLite file database and
+prints cars/second for each plus the speedup.
+
+Usage:
+    python benchmarks/bulk_create.py [--cars 2000] [--chunk-size 500] [--min-speedup 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="car-finder-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+import main  # noqa: E402
+
+CAR = {
+    "brand": "Toyota",
+    "model": "Camry",
+    "series": "Hybrid",
+    "year": 2023,
+    "mileage_km": 15000,
+    "engine_cm3": 2500,
+    "car_status": "odpala i jezdzi",
+    "location_status": "na miejscu",
+    "price": 95000.0,
+}
+
+
+def reset_database():
+    with main.engine.begin() as conn:
+        conn.execute(text("DELETE FROM cars"))
+    main.listing_cache.clear()
+
+
+def bench_single(client, count):
+    reset_database()
+    start = time.perf_counter()
+    for i in range(count):
+        response = client.post("/cars", json=dict(CAR, price=float(i)))
+        assert response.status_code == 200, response.text
+    return count / (time.perf_counter() - start)
+
+
+def bench_bulk(client, count, chunk_size):
+    reset_database()
+    items = [dict(CAR, price=float(i)) for i in range(count)]
+    start = time.perf_counter()
+    response = client.post("/cars/bulk", params={"chunk_size": chunk_size}, json=items)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200 and response.json()["created"] == count, response.text
+    return count / elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--min-speedup", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        single = bench_single(client, args.cars)
+        bulk = bench_bulk(client, args.cars, args.chunk_size)
+
+    speedup = bulk / single
+    print(f"single POST /cars : {single:10.1f} cars/s")
+    print(f"POST /cars/bulk   : {bulk:10.1f} cars/s")
+    print(f"speedup           : {speedup:10.1f}x (target {args.min_speedup:g}x)")
+    return 0 if speedup >= args.min_speedup else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,95 @@
+"""Benchmark cold start: importing the app, running startup hooks, first request.
+
+Every run is a fresh interpreter against a throwaway SQLite database, so the
+numbers include module imports and schema creation but nothing cached in
+memory. Prints the median of each phase as JSON; ``--max-import-ms`` turns it
+into a regression gate (exit code 1 when the median import is slower).
+
+Usage:
+    python benchmarks/cold_start.py [--runs 5] [--max-import-ms 2000] [--top-imports 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    first = time.perf_counter()
+    ready = client.get("/ready").status_code
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (first - started) * 1000,
+    "ready_status": ready,
+}))
+"""
+
+
+def probe_env(workdir):
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env.setdefault("STORAGE_BACKEND", "local")
+    env["LOCAL_STORAGE_DIR"] = os.path.join(workdir, "media")
+    env["BLOB_CLEANUP_INTERVAL"] = "0"
+    return env
+
+
+def run_once():
+    with tempfile.TemporaryDirectory(prefix="car-finder-bench-") as workdir:
+        output = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=probe_env(workdir),
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(count):
+    """Return the ``count`` slowest imports of ``main`` by cumulative time."""
+    with tempfile.TemporaryDirectory(prefix="car-finder-bench-") as workdir:
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                                env=probe_env(workdir), capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return [{"module": name, "cumulative_ms": round(ms, 1)} for ms, name in sorted(rows, reverse=True)[:count]]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, help="fail when the median import is slower")
+    parser.add_argument("--top-imports", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+    result = {
+        phase: round(statistics.median(run[phase] for run in runs), 1)
+        for phase in ("import_ms", "startup_ms", "first_request_ms")
+    }
+    result["ready_status"] = runs[-1]["ready_status"]
+    if args.top_imports:
+        result["top_imports"] = top_imports(args.top_imports)
+    print(json.dumps(result, indent=2))
+
+    if args.max_import_ms is not None and result["import_ms"] > args.max_import_ms:
+        print(f"import took {result['import_ms']} ms, over the {args.max_import_ms} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,326 @@
+"""Load test the API against synthetic catalogs and compare result files.
+
+``run`` seeds the database with cars from ``factories.CarFactory`` and its
+variants (10k, 100k and 1M by default; each size tops up the previous one, and
+a database passed with ``--database-url`` that already holds enough cars is
+reused as is), then drives every scenario at ``--concurrency`` requests in
+flight and writes throughput plus p50/p95/p99 latencies to a JSON file. By
+default the app is served in-process over ASGI; ``--base-url`` sends the
+requests to a running server instead (seeding still goes through
+``--database-url``, which must be the server's database).
+
+``compare`` prints the change per catalog size and scenario between two result
+files and exits with 1 when p95 latency or throughput regressed by more than
+``--max-regression`` percent, or when a scenario has more failed requests.
+
+Usage:
+    python benchmarks/load_test.py run [--sizes 10000,100000,1000000] [--concurrency 32] [--requests 2000]
+        [--scenarios list,summary,get,filter,create,update,photo] [--database-url ...] [--base-url ...]
+        [--output results.json]
+    python benchmarks/load_test.py compare baseline.json candidate.json [--max-regression 10]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCENARIOS = ("list", "summary", "get", "filter", "create", "update", "photo")
+DEFAULT_SIZES = "10000,100000,1000000"
+SEED_BATCH_SIZE = 5000
+BRANDS = ("Toyota", "BMW", "Mercedes", "Audi", "Volkswagen")
+CAR_STATUSES = ("stacjonarny", "odpala", "odpala i jezdzi")
+
+
+def factory_weights():
+    """Mix of factory variants the catalog is seeded from, as ``(factory, weight)``."""
+    from factories import CarFactory, CarWithPhotosFactory, HighMileageCarFactory, LuxuryCarFactory
+
+    return [(CarFactory, 70), (HighMileageCarFactory, 15), (LuxuryCarFactory, 10), (CarWithPhotosFactory, 5)]
+
+
+def seed_catalog(main, target: int, rng: random.Random) -> int:
+    """Insert factory-built cars until the catalog holds ``target``; returns how many were added."""
+    import factory
+    from sqlalchemy import func, insert, select, text
+    from inventory_stats import rebuild_rollups
+
+    with main.engine.connect() as conn:
+        existing = conn.scalar(select(func.count()).select_from(main.Car))
+    factories, weights = zip(*factory_weights())
+    now = datetime.utcnow()
+    added = 0
+    while existing + added < target:
+        count = min(SEED_BATCH_SIZE, target - existing - added)
+        cars, photos = [], []
+        for factory_class in rng.choices(factories, weights, k=count):
+            car = factory.build(dict, FACTORY_CLASS=factory_class)
+            photos.append(car.pop("photo_rows", []))
+            # Spread over a year so keyset pages by created_at look like a real catalog
+            car["created_at"] = car["updated_at"] = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+            cars.append(car)
+        with main.engine.begin() as conn:
+            car_ids = conn.scalars(insert(main.Car).returning(main.Car.id, sort_by_parameter_order=True), cars).all()
+            photo_rows = [
+                {"car_id": car_id, "position": photo.position, "key": photo.key, "url": photo.url,
+                 "sizes": photo.sizes, "created_at": now}
+                for car_id, car_photos in zip(car_ids, photos) for photo in car_photos
+            ]
+            if photo_rows:
+                conn.execute(insert(main.CarPhoto), photo_rows)
+        added += count
+        print(f"seeded {existing + added}/{target} cars", file=sys.stderr)
+    if added:
+        # The seed inserts behind the API's back, so /stats needs the rollups recounted
+        rebuild_rollups(main.SessionLocal)
+        with main.engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        # New list ETags, and no cached page from before the seed
+        with main.SessionLocal() as db:
+            main.touch_catalog(db)
+            db.commit()
+        main.listing_cache.clear()
+    return added
+
+
+def car_id_range(main):
+    from sqlalchemy import func, select
+
+    with main.engine.connect() as conn:
+        return tuple(conn.execute(select(func.min(main.Car.id), func.max(main.Car.id))).one())
+
+
+def make_photo() -> bytes:
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.effect_noise((1200, 800), 64).convert("RGB").save(output, "JPEG", quality=85)
+    return output.getvalue()
+
+
+def car_body(rng: random.Random) -> dict:
+    return {
+        "brand": rng.choice(BRANDS),
+        "model": "Camry",
+        "year": rng.randint(2015, 2024),
+        "mileage_km": rng.randint(1000, 200000),
+        "engine_cm3": rng.randint(1000, 5000),
+        "car_status": rng.choice(CAR_STATUSES),
+        "location_status": "na miejscu",
+        "price": round(rng.uniform(10000, 500000), 2),
+    }
+
+
+def scenario_request(scenario: str, rng: random.Random, ids: tuple, photo: bytes) -> dict:
+    """Keyword arguments for ``httpx.AsyncClient.request`` for one request of ``scenario``."""
+    car_id = rng.randint(*ids)
+    if scenario in ("list", "summary"):
+        sort = rng.choice(("-created_at", "price", "-price", "year", "mileage_km"))
+        params = {"sort": sort, "limit": 20}
+        if scenario == "summary":
+            params["view"] = "summary"
+        return {"method": "GET", "url": "/cars", "params": params}
+    if scenario == "get":
+        return {"method": "GET", "url": f"/cars/{car_id}"}
+    if scenario == "filter":
+        low = rng.randint(10, 400) * 1000
+        params = {"brand": rng.choice(BRANDS), "price_min": low, "price_max": low + 100000,
+                  "year_min": rng.randint(2015, 2022), "sort": "price", "limit": 20}
+        return {"method": "GET", "url": "/cars", "params": params}
+    if scenario == "create":
+        return {"method": "POST", "url": "/cars", "json": car_body(rng)}
+    if scenario == "update":
+        return {"method": "PUT", "url": f"/cars/{car_id}", "json": car_body(rng)}
+    if scenario == "photo":
+        return {"method": "POST", "url": f"/cars/{car_id}/photos",
+                "files": {"file": ("photo.jpg", photo, "image/jpeg")}}
+    raise ValueError(f"Unknown scenario {scenario!r}")
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    # 99 cut points; index 49 is the median
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def drive(client, scenario: str, concurrency: int, total: int, rng: random.Random, ids: tuple,
+                photo: bytes) -> dict:
+    requests = iter([scenario_request(scenario, rng, ids, photo) for _ in range(total)])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for request in requests:
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            # A missing car is an expected outcome of picking ids at random, not a failure
+            if response.status_code >= 400 and response.status_code != 404:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_size(main, args, scenarios, rng, photo) -> dict:
+    import httpx
+
+    ids = car_id_range(main)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=None,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=None)
+    results = {}
+    async with client:
+        for scenario in scenarios:
+            # Warm connections, caches and the thumbnail pool outside the measurement
+            await drive(client, scenario, min(args.concurrency, 8), min(args.requests, 50), rng, ids, photo)
+            results[scenario] = await drive(client, scenario, args.concurrency, args.requests, rng, ids, photo)
+            print(f"  {scenario:>7}: {results[scenario]['requests_per_second']:>8.1f} req/s  "
+                  f"p50 {results[scenario]['p50_ms']:.1f} ms  p95 {results[scenario]['p95_ms']:.1f} ms  "
+                  f"p99 {results[scenario]['p99_ms']:.1f} ms", file=sys.stderr)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> int:
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    if args.base_url and not args.database_url:
+        print("--base-url needs --database-url, the server's database, for seeding", file=sys.stderr)
+        return 2
+
+    # Settings are read when main is imported
+    workdir = tempfile.mkdtemp(prefix="car-finder-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("STORAGE_BACKEND", "local")
+    os.environ.setdefault("LOCAL_STORAGE_DIR", os.path.join(workdir, "media"))
+    os.environ.setdefault("BLOB_CLEANUP_INTERVAL", "0")
+    if not args.cache:
+        os.environ["CACHE_TTL_SECONDS"] = "0"
+    import factory.random
+    import main
+
+    main.ensure_schema()
+    factory.random.reseed_random(args.seed)
+    rng = random.Random(args.seed)
+    photo = make_photo() if "photo" in scenarios else b""
+
+    results = {}
+    for size in sizes:
+        print(f"catalog of {size} cars", file=sys.stderr)
+        seed_catalog(main, size, rng)
+        results[str(size)] = asyncio.run(run_size(main, args, scenarios, rng, photo))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": main.engine.url.get_backend_name(),
+            "target": args.base_url or "in-process",
+            "async_db": main.ASYNC_DB,
+            "cache": args.cache,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+def percent_change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.candidate) as f:
+        candidate = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'size':>8} {'scenario':>8} {'req/s':>20} {'p95 ms':>20} {'p99 ms':>20}")
+    for size in sorted(set(baseline) & set(candidate), key=int):
+        for scenario in [name for name in SCENARIOS if name in baseline[size] and name in candidate[size]]:
+            old, new = baseline[size][scenario], candidate[size][scenario]
+            throughput = percent_change(old["requests_per_second"], new["requests_per_second"])
+            p95 = percent_change(old["p95_ms"], new["p95_ms"])
+            p99 = percent_change(old["p99_ms"], new["p99_ms"])
+            print(f"{size:>8} {scenario:>8} "
+                  f"{old['requests_per_second']:>8.1f} -> {new['requests_per_second']:>8.1f} "
+                  f"{old['p95_ms']:>8.1f} -> {new['p95_ms']:>8.1f} {old['p99_ms']:>8.1f} -> {new['p99_ms']:>8.1f}"
+                  f"  ({throughput:+.1f}% req/s, {p95:+.1f}% p95, {p99:+.1f}% p99)")
+            if p95 > args.max_regression or -throughput > args.max_regression or new["errors"] > old["errors"]:
+                regressions.append(f"{size}/{scenario}")
+
+    if regressions:
+        print(f"regressed by more than {args.max_regression:g}%: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed catalogs and measure every scenario")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated catalog sizes")
+    run_parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--requests", type=int, default=2000, help="requests per scenario and size")
+    run_parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    run_parser.add_argument("--base-url", help="load a running server instead of the in-process app")
+    run_parser.add_argument("--cache", action="store_true", help="keep the read cache on (off by default)")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--output", default="load_test_results.json")
+
+    compare_parser = commands.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--max-regression", type=float, default=10.0,
+                                help="percent of p95 latency increase or throughput drop that fails")
+    args = parser.parse_args(argv)
+
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
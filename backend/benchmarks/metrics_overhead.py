@@ -0,0 +1,113 @@
+"""Benchmark the per-request cost of the /metrics instrumentation.
+
+Times the ASGI middleware around a do-nothing app (so only the middleware is
+measured, not routing or serialization) and the query listeners around an
+in-memory SQLite ``SELECT 1``, each against the same work uninstrumented.
+Prints microseconds per request and per query as JSON; ``--max-request-us``
+turns it into a regression gate (exit code 1 when the middleware costs more).
+
+Usage:
+    python benchmarks/metrics_overhead.py [--requests 20000] [--queries 20000] [--max-request-us 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+import metrics  # noqa: E402
+import query_stats  # noqa: E402
+
+
+class Route:
+    path = "/cars/{car_id}"
+
+
+async def noop_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def time_requests(app, count: int) -> float:
+    async def run():
+        started = time.perf_counter()
+        for _ in range(count):
+            await app({"type": "http", "method": "GET", "path": "/cars/1"}, receive, send)
+        return time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def time_queries(connection, count: int, in_request: bool) -> float:
+    token = query_stats.current_request.set(query_stats.QueryStats() if in_request else None)
+    try:
+        started = time.perf_counter()
+        for _ in range(count):
+            connection.execute(text("SELECT 1"))
+        return time.perf_counter() - started
+    finally:
+        query_stats.current_request.reset(token)
+
+
+def per_call_us(seconds: float, count: int) -> float:
+    return round(seconds / count * 1e6, 2)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--max-request-us", type=float, help="fail when the middleware adds more per request")
+    args = parser.parse_args(argv)
+
+    # Warm up both paths, then take the best of three to shed scheduler noise
+    time_requests(noop_app, 1000)
+    time_requests(metrics.MetricsMiddleware(noop_app), 1000)
+    bare = min(time_requests(noop_app, args.requests) for _ in range(3))
+    wrapped = min(time_requests(metrics.MetricsMiddleware(noop_app), args.requests) for _ in range(3))
+
+    with create_engine("sqlite://").connect() as connection:
+        for name, listener in (("before_cursor_execute", query_stats.before_cursor_execute),
+                               ("after_cursor_execute", query_stats.after_cursor_execute)):
+            if event.contains(Engine, name, listener):
+                event.remove(Engine, name, listener)
+        unwatched = min(time_queries(connection, args.queries, True) for _ in range(3))
+        query_stats.watch_queries()
+        outside = min(time_queries(connection, args.queries, False) for _ in range(3))
+        inside = min(time_queries(connection, args.queries, True) for _ in range(3))
+
+    result = {
+        "request_us_bare": per_call_us(bare, args.requests),
+        "request_us_instrumented": per_call_us(wrapped, args.requests),
+        "request_overhead_us": per_call_us(wrapped - bare, args.requests),
+        "query_us_bare": per_call_us(unwatched, args.queries),
+        "query_overhead_us_outside_request": per_call_us(outside - unwatched, args.queries),
+        "query_overhead_us_in_request": per_call_us(inside - unwatched, args.queries),
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.max_request_us is not None and result["request_overhead_us"] > args.max_request_us:
+        print(f"middleware adds {result['request_overhead_us']} us per request, "
+              f"over the {args.max_request_us} us budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
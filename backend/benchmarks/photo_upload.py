@@ -0,0 +1,96 @@
+"""Benchmark the photo upload and delete paths on the local storage backend.
+
+Runs in-process against a throwaway SQLite database and media directory, so
+it measures the API's own overhead (streaming, derivative encoding, database
+updates) without network storage. Prints uploads/second and deletes/second.
+
+Usage:
+    python benchmarks/photo_upload.py [--photos 200] [--concurrency 16] [--width 3000]
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="car-finder-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = os.path.join(WORKDIR, "media")
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import main  # noqa: E402
+from thumbnails import PHOTO_SIZES  # noqa: E402
+
+
+def make_photo(width):
+    output = io.BytesIO()
+    Image.effect_noise((width, width * 2 // 3), 64).convert("RGB").save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+async def run(photos, concurrency, photo):
+    main.ensure_schema()
+    # One car per concurrent client, so uploads don't contend on a single row
+    with main.SessionLocal() as db:
+        cars = [main.new_car(main.CarCreate(brand="Toyota", model="Camry", year=2023, mileage_km=15000,
+                                            engine_cm3=2500, car_status="odpala", location_status="na miejscu",
+                                            price=95000.0)) for _ in range(concurrency)]
+        db.add_all(cars)
+        db.commit()
+        car_ids = [car.id for car in cars]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def upload(i):
+            async with slots:
+                car_id = car_ids[i % concurrency]
+                files = {"file": (f"photo{i}.jpg", photo, "image/jpeg")}
+                response = await client.post(f"/cars/{car_id}/photos", files=files)
+                assert response.status_code == 200, response.text
+                return car_id, response.json()["photo_id"]
+
+        start = time.perf_counter()
+        uploaded = await asyncio.gather(*(upload(i) for i in range(photos)))
+        upload_rate = photos / (time.perf_counter() - start)
+
+        async def delete(car_id, photo_id):
+            async with slots:
+                response = await client.delete(f"/cars/{car_id}/photos/{photo_id}")
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(delete(car_id, photo_id) for car_id, photo_id in uploaded))
+        delete_rate = photos / (time.perf_counter() - start)
+    return upload_rate, delete_rate
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--width", type=int, default=3000, help="width of the generated JPEG in pixels")
+    args = parser.parse_args(argv)
+
+    photo = make_photo(args.width)
+    try:
+        upload_rate, delete_rate = asyncio.run(run(args.photos, args.concurrency, photo))
+    finally:
+        main.shutdown_pool()
+    print(f"photo size: {len(photo) / 1024:.0f} KiB, {args.photos} photos, concurrency {args.concurrency}")
+    print(f"uploads: {upload_rate:.1f}/s (original + {len(PHOTO_SIZES)} sizes each)")
+    print(f"deletes: {delete_rate:.1f}/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
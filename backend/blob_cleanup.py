@@ -0,0 +1,155 @@
+"""Background deletion of photo blobs.
+
+Deleting a car or photo only queues its storage keys in ``blob_deletions``,
+in the same transaction that drops the references, so the request never
+waits on storage and no key is lost if the process dies. The queue is
+worked in batches right after the response and by a periodic sweep that
+retries failures with exponential backoff. The sweep also reconciles the
+bucket: ``car_{id}_*`` objects that no car references (left behind by
+crashed uploads or deletes from before this queue) are queued as well.
+
+Usage:
+    python blob_cleanup.py [--reconcile]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from main import BlobDeletion, CarPhoto, SessionLocal, car_photo_keys, ensure_schema, photo_storage, queue_blob_deletions
+from metrics import storage_timer
+
+BLOB_DELETE_BATCH_SIZE = int(os.getenv("BLOB_DELETE_BATCH_SIZE", "100"))
+BLOB_DELETE_MAX_ATTEMPTS = int(os.getenv("BLOB_DELETE_MAX_ATTEMPTS", "10"))
+BLOB_RETRY_BASE_SECONDS = 30
+BLOB_RETRY_MAX_SECONDS = 6 * 3600
+BLOB_CLEANUP_INTERVAL = float(os.getenv("BLOB_CLEANUP_INTERVAL", "60"))
+BLOB_RECONCILE_INTERVAL = float(os.getenv("BLOB_RECONCILE_INTERVAL", str(6 * 3600)))
+# Younger objects may belong to an upload that has not committed its row yet
+BLOB_ORPHAN_MIN_AGE = float(os.getenv("BLOB_ORPHAN_MIN_AGE", "3600"))
+RECONCILE_CHUNK_SIZE = 1000
+
+PHOTO_KEY = re.compile(r"^car_(\d+)_")
+
+
+def retry_delay(attempts: int) -> float:
+    return min(BLOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), BLOB_RETRY_MAX_SECONDS)
+
+
+def process_deletions(session_factory, storage, batch_size: int = BLOB_DELETE_BATCH_SIZE,
+                      now: Optional[datetime] = None) -> dict:
+    """Delete every due blob, one batch per storage call and commit."""
+    now = now or datetime.utcnow()
+    deleted = failed = 0
+    db = session_factory()
+    try:
+        while True:
+            # SKIP LOCKED lets several replicas work the queue without waiting on each other
+            batch = db.scalars(
+                select(BlobDeletion)
+                .where(BlobDeletion.attempts < BLOB_DELETE_MAX_ATTEMPTS, BlobDeletion.next_attempt_at <= now)
+                .order_by(BlobDeletion.next_attempt_at, BlobDeletion.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not batch:
+                break
+
+            try:
+                with storage_timer("delete_many"):
+                    errors = storage.delete_many([row.key for row in batch])
+            except Exception as e:
+                errors = {row.key: str(e) or type(e).__name__ for row in batch}
+            for row in batch:
+                if row.key in errors:
+                    # Rescheduled into the future, so this loop cannot pick it up again
+                    row.attempts += 1
+                    row.last_error = errors[row.key][:1000]
+                    row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+                    failed += 1
+                else:
+                    db.delete(row)
+                    deleted += 1
+            db.commit()
+    finally:
+        db.close()
+    return {"deleted": deleted, "failed": failed}
+
+
+def queue_orphans(db, candidates: list) -> int:
+    car_ids = {car_id for car_id, _ in candidates}
+    referenced = set(car_photo_keys(db.scalars(select(CarPhoto).where(CarPhoto.car_id.in_(car_ids)))))
+    keys = [key for _, key in candidates if key not in referenced]
+    queued = set(db.scalars(select(BlobDeletion.key).where(BlobDeletion.key.in_(keys))))
+    orphans = [key for key in keys if key not in queued]
+    queue_blob_deletions(db, orphans)
+    db.commit()
+    return len(orphans)
+
+
+def reconcile_orphans(session_factory, storage, min_age: float = BLOB_ORPHAN_MIN_AGE,
+                      now: Optional[datetime] = None) -> int:
+    """Queue ``car_{id}_*`` objects that no car references; returns how many."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=min_age)
+    queued = 0
+    candidates = []
+    db = session_factory()
+    try:
+        # Checked against the database a chunk at a time, however large the bucket
+        for key, updated in storage.list_keys("car_"):
+            match = PHOTO_KEY.match(key)
+            if match and (updated is None or updated <= cutoff):
+                candidates.append((int(match.group(1)), key))
+            if len(candidates) >= RECONCILE_CHUNK_SIZE:
+                queued += queue_orphans(db, candidates)
+                candidates = []
+        if candidates:
+            queued += queue_orphans(db, candidates)
+    finally:
+        db.close()
+    return queued
+
+
+async def cleanup_loop(session_factory, storage, interval: float = BLOB_CLEANUP_INTERVAL,
+                       reconcile_interval: float = BLOB_RECONCILE_INTERVAL):
+    last_reconcile = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if time.monotonic() - last_reconcile >= reconcile_interval:
+                last_reconcile = time.monotonic()
+                await run_in_threadpool(reconcile_orphans, session_factory, storage)
+            await run_in_threadpool(process_deletions, session_factory, storage)
+        except Exception as e:
+            print(f"⚠️ Blob cleanup failed: {e}")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Delete queued photo blobs.")
+    parser.add_argument("--reconcile", action="store_true", help="first queue orphaned car_{id}_* objects")
+    args = parser.parse_args(argv)
+
+    try:
+        photo_storage.get()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    ensure_schema()
+    result = {}
+    if args.reconcile:
+        result["orphans_queued"] = reconcile_orphans(SessionLocal, photo_storage)
+    result.update(process_deletions(SessionLocal, photo_storage))
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
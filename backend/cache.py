@@ -0,0 +1,132 @@
+"""In-process read cache for car listings with pluggable invalidation broadcast."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class InvalidationBus:
+    """Broadcasts invalidation messages to every replica, including this one.
+
+    Implementations for a shared broker (Redis pub/sub, Pub/Sub, Postgres
+    LISTEN/NOTIFY) must deliver each published message to all subscribers
+    exactly like :class:`LocalInvalidationBus` does within one process.
+    """
+
+    def publish(self, message: Dict[str, Any]):
+        raise NotImplementedError
+
+    def subscribe(self, handler: Callable[[Dict[str, Any]], None]):
+        raise NotImplementedError
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """In-memory stand-in for a single process or for tests."""
+
+    def __init__(self):
+        self._handlers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def publish(self, message: Dict[str, Any]):
+        for handler in self._handlers:
+            handler(message)
+
+    def subscribe(self, handler: Callable[[Dict[str, Any]], None]):
+        self._handlers.append(handler)
+
+
+class ListingCache:
+    """Serialized responses keyed by car id and by list query parameters.
+
+    A car write evicts that car and every cached list page, since any page
+    may contain it. ``generation`` guards against a slow reader storing a
+    response it built from rows read before a concurrent write committed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.cars = TTLCache(max_entries, ttl)
+        self.lists = TTLCache(max_entries, ttl)
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get_car(self, car_id: int):
+        return self.cars.get(car_id)
+
+    def set_car(self, car_id: int, value, generation: int):
+        with self._lock:
+            if generation == self.generation:
+                self.cars.set(car_id, value)
+
+    def get_list(self, key: Hashable):
+        return self.lists.get(key)
+
+    def set_list(self, key: Hashable, value, generation: int):
+        with self._lock:
+            if generation == self.generation:
+                self.lists.set(key, value)
+
+    def invalidate(self, car_id: Optional[int] = None):
+        """Evict one car (or all cars when ``car_id`` is None) and all lists."""
+        with self._lock:
+            self.generation += 1
+            if car_id is None:
+                self.cars.clear()
+            else:
+                self.cars.delete(car_id)
+            self.lists.clear()
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss counters."""
+        self.invalidate()
+        for cache in (self.cars, self.lists):
+            cache.hits = cache.misses = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"cars": self.cars.stats(), "lists": self.lists.stats()}
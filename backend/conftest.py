@@ -1,27 +1,36 @@
 """Test configuration and fixtures for backend tests."""
 import pytest
 import asyncio
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 import tempfile
 import os
 from unittest.mock import Mock, patch
 
-from main import app, get_db, Base
+from query_stats import capture_queries
+from storage_backends import GCSStorage, LocalStorage
+from main import app, get_db, get_session_factory, Base, search_index, listing_cache, ASYNC_DB
 
 
 # Test database setup
 @pytest.fixture(scope="function")
-def test_db():
+def test_db(tmp_path):
     """Create a fresh test database for each test."""
-    # Use in-memory SQLite for fast tests
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    if ASYNC_DB:
+        # aiosqlite cannot see another engine's in-memory database, so both engines share a file
+        database_url = f"sqlite:///{tmp_path / 'test.db'}"
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    else:
+        # Use in-memory SQLite for fast tests
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     # Create tables
@@ -35,14 +44,56 @@ def test_db():
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    api_engine = engine
+    if ASYNC_DB:
+        from async_api import async_database_url, get_async_db
+
+        # NullPool: connections are bound to the TestClient's event loop, so none outlive a request
+        async_engine = create_async_engine(async_database_url(database_url), poolclass=NullPool)
+        AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with AsyncTestingSessionLocal() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        api_engine = async_engine.sync_engine
+    search_index.reset()
+    listing_cache.clear()
     
-    yield TestingSessionLocal()
+    session = TestingSessionLocal()
+    session.info["api_engine"] = api_engine
+    yield session
     
     # Cleanup
     app.dependency_overrides.clear()
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def api_engine(test_db):
+    """Engine the CRUD endpoints query through, for statement capture in tests."""
+    return test_db.info["api_engine"]
+
+
+@pytest.fixture(scope="function")
+def assert_max_queries(test_db, api_engine):
+    """Pin a query budget: ``with assert_max_queries(2): client.get(...)``.
+
+    Counts every statement run inside the block on the test database's
+    engines (the async one too in DB_ASYNC mode) and fails with the
+    statements grouped by fingerprint when there are more than ``n``.
+    """
+    @contextmanager
+    def check(n):
+        with capture_queries(test_db.get_bind(), api_engine) as captured:
+            yield captured
+        assert len(captured) <= n, f"{len(captured)} queries, budget {n}:\n{captured.report()}"
+
+    return check
+
+
 @pytest.fixture(scope="function")
 def client(test_db):
     """Create a test client with database dependency override."""
@@ -52,28 +103,33 @@ def client(test_db):
 
 @pytest.fixture(scope="function")
 def mock_storage_client():
-    """Mock Google Cloud Storage client."""
-    with patch('main.storage_client') as mock_client:
-        mock_bucket = Mock()
-        mock_blob = Mock()
-        
-        # Configure mock blob behavior
-        mock_blob.public_url = "https://storage.googleapis.com/test-bucket/test-file.jpg"
-        mock_blob.exists.return_value = True
-        
-        # Configure mock bucket behavior
-        mock_bucket.blob.return_value = mock_blob
-        
-        # Configure mock client behavior
-        mock_client.bucket.return_value = mock_bucket
-        
+    """Mock Google Cloud Storage bucket behind the GCS photo storage backend."""
+    mock_bucket = Mock()
+    mock_blob = Mock()
+    
+    # Configure mock blob behavior
+    mock_blob.public_url = "https://storage.googleapis.com/test-bucket/test-file.jpg"
+    mock_blob.exists.return_value = True
+    
+    # Configure mock bucket behavior
+    mock_bucket.blob.return_value = mock_blob
+    
+    with patch('main.photo_storage', GCSStorage("test-bucket", bucket=mock_bucket)) as backend:
         yield {
-            'client': mock_client,
+            'storage': backend,
             'bucket': mock_bucket,
             'blob': mock_blob
         }
 
 
+@pytest.fixture(scope="function")
+def local_storage(tmp_path):
+    """Local-disk photo storage in a temporary directory."""
+    backend = LocalStorage(str(tmp_path / "media"), "/media")
+    with patch('main.photo_storage', backend):
+        yield backend
+
+
 @pytest.fixture(scope="function")
 def sample_car_data():
     """Sample car data for testing."""
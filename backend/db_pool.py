@@ -0,0 +1,147 @@
+"""Database connection pool settings and health metrics.
+
+Each replica holds at most ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` connections, so
+under autoscaling the total is that times the pod count and must stay below
+the server's ``max_connections``. ``DB_POOL_PRE_PING`` and
+``DB_POOL_RECYCLE`` keep connections dropped by a failover from reaching a
+request. The metrics (checkout wait, occupancy, overflow connections and
+timeouts) exist to size the pool from data rather than guesswork.
+"""
+import os
+import threading
+import time
+from typing import Dict, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """Counters for one engine's pool; cheap enough to update on every checkout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)  # last one is +Inf
+        self.peak_checked_out = 0
+        self.overflow_connections = 0
+        self.timeouts = 0
+        self.invalidations = 0
+
+    def observe_checkout(self, seconds: float, checked_out: int):
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.wait_buckets[bucket] += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_overflow(self):
+        with self._lock:
+            self.overflow_connections += 1
+
+    def observe_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool) -> dict:
+        """Current occupancy of ``pool`` plus the counters since start-up."""
+        stats = {}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                max_overflow=pool._max_overflow,
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        with self._lock:
+            stats.update(
+                peak_checked_out=self.peak_checked_out,
+                checkouts=self.checkouts,
+                wait_seconds_total=round(self.wait_seconds_total, 6),
+                wait_seconds_max=round(self.wait_seconds_max, 6),
+                wait_buckets={
+                    str(bound): count for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self.wait_buckets)
+                },
+                overflow_connections=self.overflow_connections,
+                timeouts=self.timeouts,
+                invalidations=self.invalidations,
+            )
+        return stats
+
+
+def instrumented_pool(base: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """Subclass of ``base`` timing every checkout; survives ``engine.dispose()``."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except PoolTimeoutError:
+            metrics.observe_timeout()
+            raise
+        metrics.observe_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"connect": connect, "metrics": metrics})
+
+
+def engine_options(url: str, pool_class: Type[QueuePool] = QueuePool) -> dict:
+    """Pool keyword arguments for ``create_engine`` / ``create_async_engine``."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # One connection per thread by design; there is no pool to size
+        return {}
+    return {
+        "poolclass": instrumented_pool(pool_class, PoolMetrics()),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def watch_pool(engine):
+    """Count overflow connections and invalidations (failed pre-pings, dropped connections)."""
+    metrics = getattr(engine.pool, "metrics", None)
+    if metrics is None:
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # The overflow counter is raised before the new connection is made
+        if engine.pool.overflow() > 0:
+            metrics.observe_overflow()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.observe_invalidation()
+
+
+def pool_stats(engines: Dict[str, object]) -> dict:
+    """``{name: snapshot}`` for every engine whose pool is instrumented."""
+    return {
+        name: engine.pool.metrics.snapshot(engine.pool)
+        for name, engine in engines.items()
+        if getattr(engine.pool, "metrics", None) is not None
+    }
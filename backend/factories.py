@@ -2,7 +2,7 @@
 import factory
 from factory import fuzzy
 from datetime import datetime
-from main import Car
+from main import Car, CarPhoto
 
 
 class CarFactory(factory.Factory):
@@ -30,10 +30,17 @@ class CarFactory(factory.Factory):
     price = fuzzy.FuzzyFloat(10000.0, 500000.0)
     
     # Metadata
-    photos = factory.LazyFunction(lambda: [])
     created_at = factory.LazyFunction(datetime.utcnow)
 
 
+def car_photos(*urls, sizes=None):
+    """Build ``car_photos`` rows for the given URLs, in order."""
+    return [
+        CarPhoto(position=position, key=url.split("/")[-1], url=url, sizes=(sizes or [{}] * len(urls))[position])
+        for position, url in enumerate(urls)
+    ]
+
+
 # Pre-configured car factories for specific test scenarios
 class ToyotaCamryFactory(CarFactory):
     """Factory for Toyota Camry cars."""
@@ -69,7 +76,7 @@ class LuxuryCarFactory(CarFactory):
 
 class CarWithPhotosFactory(CarFactory):
     """Factory for cars with photos."""
-    photos = factory.LazyFunction(lambda: [
+    photo_rows = factory.LazyFunction(lambda: car_photos(
         "https://storage.googleapis.com/test-bucket/car_1_photo1.jpg",
         "https://storage.googleapis.com/test-bucket/car_1_photo2.jpg"
-    ])
\ No newline at end of file
+    ))
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""Streaming dealer feed import.
+
+Feeds (CSV or JSONL) are read one row at a time, validated and upserted on
+``dealer_ref`` in chunks. Each chunk's writes, row errors and the job's
+``rows_processed`` checkpoint commit in one transaction, so a crashed import
+resumes after the last committed row and re-running a chunk never inserts a
+car twice.
+
+Usage:
+    python importer.py FEED [--format csv|jsonl] [--chunk-size N]
+    python importer.py --resume JOB_ID [--chunk-size N]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+
+from main import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_FORMATS,
+    Car,
+    CarCreate,
+    ImportJob,
+    ImportRowError,
+    SessionLocal,
+    apply_rollup_delta,
+    ensure_schema,
+    import_claim_statement,
+    km_to_miles,
+    next_version,
+    publish_car_change,
+    rollup_entries_statement,
+    rollup_entry,
+    touch_catalog,
+)
+
+
+class FeedRow(CarCreate):
+    """A feed row; unlike the API, feeds must identify every car."""
+    dealer_ref: str
+
+
+def iter_feed(path: str, feed_format: str) -> Iterator[Tuple[int, Optional[dict], Optional[list]]]:
+    """Yield ``(row_number, record, errors)`` with 1-based data row numbers."""
+    with open(path, newline="", encoding="utf-8") as feed:
+        if feed_format == "csv":
+            for row_number, row in enumerate(csv.DictReader(feed), start=1):
+                # Empty cells mean "not set"; cells beyond the header are dropped
+                yield row_number, {key: value or None for key, value in row.items() if key is not None}, None
+            return
+
+        row_number = 0
+        for line in feed:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, [{"msg": f"Invalid JSON: {e}"}]
+                continue
+            if not isinstance(record, dict):
+                yield row_number, None, [{"msg": "Expected a JSON object"}]
+                continue
+            yield row_number, record, None
+
+
+def import_chunk(db, job: ImportJob, chunk: list):
+    """Upsert one chunk and advance the job checkpoint in the same transaction."""
+    # Last occurrence wins when a feed repeats a dealer_ref within a chunk
+    valid = {}
+    failures = []
+    for row_number, record, errors in chunk:
+        if errors is None:
+            try:
+                car = FeedRow.model_validate(record)
+                valid[car.dealer_ref] = car
+                continue
+            except ValidationError as e:
+                errors = json.loads(e.json(include_url=False))
+        failures.append(ImportRowError(job_id=job.id, row_number=row_number, errors=errors))
+
+    # Ids to update, and the rollup values those updates replace
+    existing, replaced = {}, []
+    for row in db.execute(rollup_entries_statement(Car.dealer_ref.in_(list(valid))).add_columns(Car.dealer_ref)):
+        existing[row.dealer_ref] = row.id
+        replaced.append(rollup_entry(row))
+    now = datetime.utcnow()
+    new_cars, new_rows, changed = [], [], []
+    update_rows = []
+    for dealer_ref, car in valid.items():
+        row = dict(car.model_dump(), mileage_miles=km_to_miles(car.mileage_km), updated_at=now)
+        if dealer_ref in existing:
+            update_rows.append(dict(row, id=existing[dealer_ref]))
+            changed.append((existing[dealer_ref], car))
+        else:
+            new_rows.append(dict(row, created_at=now))
+            new_cars.append(car)
+
+    if new_rows:
+        statement = insert(Car).returning(Car.id, sort_by_parameter_order=True)
+        changed.extend(zip(db.scalars(statement, new_rows).all(), new_cars))
+    if update_rows:
+        db.execute(update(Car).values(version=next_version()), update_rows)
+    apply_rollup_delta(db, replaced, [rollup_entry(car) for car in valid.values()])
+    db.add_all(failures)
+
+    job.rows_processed = chunk[-1][0]
+    job.rows_created += len(new_rows)
+    job.rows_updated += len(update_rows)
+    job.rows_failed += len(failures)
+    touch_catalog(db)
+    db.commit()
+
+    for car_id, car in changed:
+        publish_car_change(car_id, car)
+
+
+def run_import(session_factory, job_id: int, chunk_size: int = IMPORT_CHUNK_SIZE,
+               on_progress: Optional[Callable[[ImportJob], None]] = None, spooled: bool = False) -> dict:
+    """Run (or resume) an import job and return its final counters.
+
+    Only a pending, failed or interrupted job is run; any other is reported as
+    it stands. A ``spooled`` feed is a copy made by ``POST /imports`` and is
+    deleted once the job completes.
+    """
+    db = session_factory()
+    result = None
+    try:
+        claimed = db.execute(import_claim_statement(job_id, ("pending", "failed"), "running")).rowcount
+        db.commit()
+        job = db.get(ImportJob, job_id)
+        if job is None:
+            raise ValueError(f"Import job {job_id} not found")
+        feed_path = job.path
+
+        if claimed:
+            try:
+                checkpoint = job.rows_processed
+                chunk = []
+                for entry in iter_feed(job.path, job.format):
+                    # Rows up to the checkpoint were committed by an earlier run
+                    if entry[0] <= checkpoint:
+                        continue
+                    chunk.append(entry)
+                    if len(chunk) >= chunk_size:
+                        import_chunk(db, job, chunk)
+                        chunk = []
+                        if on_progress:
+                            on_progress(job)
+                if chunk:
+                    import_chunk(db, job, chunk)
+                job.status = "completed"
+                job.finished_at = datetime.utcnow()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                job = db.get(ImportJob, job_id)
+                job.status = "failed"
+                job.error = str(e)[:1000]
+                db.commit()
+
+        result = {
+            "id": job.id,
+            "status": job.status,
+            "rows_processed": job.rows_processed,
+            "rows_created": job.rows_created,
+            "rows_updated": job.rows_updated,
+            "rows_failed": job.rows_failed,
+            "error": job.error,
+        }
+        return result
+    finally:
+        db.close()
+        # A failed job keeps its feed to resume from; a completed one never reads it again
+        if spooled and result is not None and result["status"] == "completed" and os.path.exists(feed_path):
+            os.unlink(feed_path)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Import a dealer feed into the car catalog.")
+    parser.add_argument("feed", nargs="?", help="path to a .csv or .jsonl feed")
+    parser.add_argument("--format", choices=sorted(IMPORT_FORMATS))
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="resume an interrupted job")
+    args = parser.parse_args(argv)
+    ensure_schema()
+
+    if args.resume is not None:
+        job_id = args.resume
+    elif args.feed:
+        extension = args.feed.rsplit(".", 1)[-1].lower()
+        feed_format = IMPORT_FORMATS.get(args.format or extension)
+        if feed_format is None:
+            parser.error("feed must be .csv or .jsonl, or pass --format")
+        db = SessionLocal()
+        try:
+            job = ImportJob(filename=os.path.basename(args.feed), path=os.path.abspath(args.feed), format=feed_format)
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+    else:
+        parser.error("pass a feed path or --resume JOB_ID")
+
+    def report(job):
+        print(f"job {job.id}: {job.rows_processed} rows processed, "
+              f"{job.rows_created} created, {job.rows_updated} updated, {job.rows_failed} failed")
+
+    result = run_import(SessionLocal, job_id, args.chunk_size, on_progress=report)
+    print(json.dumps(result))
+    return 0 if result["status"] == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
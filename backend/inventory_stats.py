@@ -0,0 +1,110 @@
+"""Rebuild and drift check for the inventory rollups behind ``GET /stats``.
+
+Every car write adjusts ``inventory_rollups`` in its own transaction, so the
+rollups only drift if cars are changed behind the API's back (manual SQL, a
+restored backup, a bug). This recounts them from ``cars`` and reports every
+rollup whose count or price total differs; unless ``--check`` is given it
+then replaces the rollups with the recount. The rebuild locks the rollups
+first, so writes that commit meanwhile are applied on top of the recount
+instead of being lost.
+
+Usage:
+    python inventory_stats.py [--check]
+"""
+import argparse
+import json
+import math
+import sys
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, insert, select, text
+
+from main import ROLLUP_COLUMNS, ROLLUP_KEY, InventoryRollup, SessionLocal, ensure_schema, rollup_price_bucket
+
+REBUILD_BATCH_SIZE = 10000
+# Price totals are sums of floats adjusted up and down; differences below this are rounding
+PRICE_TOTAL_TOLERANCE = 0.01
+DRIFT_REPORT_LIMIT = 20
+
+
+def compute_rollups(db) -> Dict[tuple, list]:
+    """``{rollup key: [cars, price total]}`` counted from the cars table."""
+    rollups = {}
+    statement = select(*ROLLUP_COLUMNS).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    for brand, model, year, location_status, price in db.execute(statement):
+        entry = rollups.setdefault((brand, model, year, location_status, rollup_price_bucket(price)), [0, 0.0])
+        entry[0] += 1
+        entry[1] += price
+    return rollups
+
+
+def read_rollups(db) -> Dict[tuple, list]:
+    """The stored rollups in the same shape; emptied rollups are left out."""
+    columns = [getattr(InventoryRollup, field) for field in ROLLUP_KEY]
+    statement = select(*columns, InventoryRollup.car_count, InventoryRollup.price_total)
+    return {tuple(row[:-2]): [row[-2], row[-1]] for row in db.execute(statement) if row[-2] or row[-1]}
+
+
+def rollup_drift(expected: Dict[tuple, list], actual: Dict[tuple, list]) -> List[Tuple[tuple, list, list]]:
+    """``(key, expected, actual)`` for every rollup that differs."""
+    drift = []
+    for key in sorted(expected.keys() | actual.keys(), key=repr):
+        want, have = expected.get(key, [0, 0.0]), actual.get(key, [0, 0.0])
+        if want[0] != have[0] or not math.isclose(want[1], have[1], abs_tol=PRICE_TOTAL_TOLERANCE):
+            drift.append((key, want, have))
+    return drift
+
+
+def lock_rollups(db):
+    # Holds off the writers' rollup upserts until the recount commits; SQLite's
+    # single writer gets the same effect from the DELETE that follows
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {InventoryRollup.__tablename__} IN EXCLUSIVE MODE"))
+
+
+def rebuild_rollups(session_factory, check_only: bool = False) -> dict:
+    """Recount the rollups, find drift and, unless ``check_only``, replace them."""
+    db = session_factory()
+    try:
+        if not check_only:
+            lock_rollups(db)
+        actual = read_rollups(db)
+        if not check_only:
+            db.execute(delete(InventoryRollup))
+        expected = compute_rollups(db)
+        drift = rollup_drift(expected, actual)
+        if not check_only and expected:
+            db.execute(insert(InventoryRollup), [
+                dict(zip(ROLLUP_KEY, key), car_count=count, price_total=total)
+                for key, (count, total) in expected.items()
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "cars": sum(count for count, _ in expected.values()),
+        "rollups": len(expected),
+        "drift": drift,
+        "rebuilt": not check_only,
+    }
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Recount the inventory rollups and check them for drift.")
+    parser.add_argument("--check", action="store_true", help="only report drift; exit 1 if there is any")
+    args = parser.parse_args(argv)
+    ensure_schema()
+
+    result = rebuild_rollups(SessionLocal, check_only=args.check)
+    drift = result.pop("drift")
+    for key, want, have in drift[:DRIFT_REPORT_LIMIT]:
+        print(f"⚠️ Rollup drift {'/'.join(map(str, key))}: expected {want[0]} cars ({want[1]:.2f}), "
+              f"found {have[0]} ({have[1]:.2f})")
+    result["drifted"] = len(drift)
+    print(json.dumps(result))
+    return 1 if args.check and drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,17 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Query, Request, Response, Body, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Index, ForeignKey, tuple_, inspect, event, text, insert, update, delete, select, func, table, column, literal, union_all, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import declarative_base, sessionmaker, Session, relationship, lazyload
+from sqlalchemy.orm.exc import StaleDataError
+from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, List, Dict, Union
 import os
 import json
-from google.cloud import storage
+import base64
+import hashlib
+import csv
+import io
+import tempfile
+import asyncio
+import threading
+import math
+import contextlib
+
+from cache import ListingCache, LocalInvalidationBus
+from db_pool import engine_options, pool_stats, watch_pool
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render as render_metrics, storage_timer
+from query_stats import watch_queries
+from search import CarSearchIndex
+from storage_backends import LazyStorage, create_storage_backend
+from thumbnails import PHOTO_FORMAT, PHOTO_FORMATS, InvalidImage, render_in_pool, shutdown_pool
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cars.db")
-engine = create_engine(DATABASE_URL)
+# Opt-in async mode: the CRUD endpoints run on an AsyncEngine (see async_api.py)
+ASYNC_DB = os.getenv("DB_ASYNC", "").lower() in ("1", "true", "yes")
+# Pool sizing, pre-ping and recycle come from DB_POOL_* (see db_pool.py)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+watch_pool(engine)
+# Per-request query counts and fingerprints, slow query log (see query_stats.py)
+watch_queries()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -30,7 +59,127 @@ class Car(Base):
     car_status = Column(String, nullable=False)  # stacjonarny / odpala / odpala i jezdzi
     location_status = Column(String, nullable=False)  # na miejscu / w drodze
     price = Column(Float, nullable=False)
-    photos = Column(JSON, nullable=True, default=lambda: [])
+    dealer_ref = Column(String, nullable=True)  # dealer feed's own id, natural key for imports
+    version = Column(Integer, nullable=False, default=1)  # bumped by every write of the fields above
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination walks (sort column, id); one index per sortable column
+        Index("ix_cars_created_at_id", "created_at", "id"),
+        Index("ix_cars_price_id", "price", "id"),
+        Index("ix_cars_year_id", "year", "id"),
+        Index("ix_cars_mileage_km_id", "mileage_km", "id"),
+        Index("ix_cars_engine_cm3_id", "engine_cm3", "id"),
+        # Equality filters followed by the default newest-first order
+        Index("ix_cars_brand_model_created_at", "brand", "model", "created_at", "id"),
+        Index("ix_cars_status_created_at", "location_status", "car_status", "created_at", "id"),
+        Index("ix_cars_dealer_ref", "dealer_ref", unique=True),
+    )
+
+    # Loaded with one IN query per batch of cars, which also works on the async engine
+    photo_rows = relationship("CarPhoto", order_by="CarPhoto.position", lazy="selectin",
+                              cascade="all, delete-orphan")
+
+    # Flat views used by CarResponse; the three lists are aligned
+    @property
+    def photos(self) -> List[str]:
+        return [photo.url for photo in self.photo_rows]
+
+    @property
+    def photo_ids(self) -> List[int]:
+        return [photo.id for photo in self.photo_rows]
+
+    @property
+    def photo_sizes(self) -> List[Dict[str, str]]:
+        return [photo.sizes or {} for photo in self.photo_rows]
+
+# One row per photo; appending never rewrites the car or its other photos
+class CarPhoto(Base):
+    __tablename__ = "car_photos"
+
+    id = Column(Integer, primary_key=True)
+    car_id = Column(Integer, ForeignKey("cars.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # display order; gaps left by deletes are fine
+    key = Column(String, nullable=False)  # storage key of the original
+    url = Column(String, nullable=False)
+    sizes = Column(JSON, nullable=False, default=dict)  # {size: url} of the derivatives
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_car_photos_car_id_position", "car_id", "position", unique=True),
+    )
+
+# Single-row catalog version, bumped by every write so list validators need no row scan
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Version 0 is the never-written catalog. The row exists as soon as the table does,
+# so writers only ever UPDATE it and concurrent first writes cannot race to insert it
+EPOCH = datetime(1970, 1, 1)
+CATALOG_STATE_SEED = {"id": 1, "version": 0, "updated_at": EPOCH}
+
+@event.listens_for(CatalogState.__table__, "after_create")
+def seed_catalog_state(target, connection, **kw):
+    connection.execute(insert(target).values(**CATALOG_STATE_SEED))
+
+# Inventory counts and price totals per brand/model/year/location and log-scale price bucket,
+# kept in step by every car write (see apply_rollup_delta) so GET /stats never scans cars
+class InventoryRollup(Base):
+    __tablename__ = "inventory_rollups"
+
+    id = Column(Integer, primary_key=True)
+    brand = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+    location_status = Column(String, nullable=False)
+    price_bucket = Column(Integer, nullable=False)  # see rollup_price_bucket(); medians are read from these
+    car_count = Column(Integer, nullable=False, default=0)
+    price_total = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_inventory_rollups_key", "brand", "model", "year", "location_status", "price_bucket", unique=True),
+    )
+
+# Dealer feed import jobs; rows_processed is the resume checkpoint
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    format = Column(String, nullable=False)  # csv / jsonl
+    status = Column(String, nullable=False, default="pending")  # pending / running / completed / failed
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_created = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class ImportRowError(Base):
+    __tablename__ = "import_row_errors"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    row_number = Column(Integer, nullable=False)
+    errors = Column(JSON, nullable=False)
+
+# Durable queue of storage objects to delete, written in the transaction that drops their references
+class BlobDeletion(Base):
+    __tablename__ = "blob_deletions"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 # Pydantic models
@@ -44,35 +193,192 @@ class CarBase(BaseModel):
     car_status: str
     location_status: str
     price: float
+    dealer_ref: Optional[str] = None
 
 class CarCreate(CarBase):
     pass
 
+class CarBulkUpdate(CarCreate):
+    id: int
+
+# Fields a partial or bulk update may set; omitted ones are left alone
+class CarAssignments(BaseModel):
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    series: Optional[str] = None
+    year: Optional[int] = None
+    mileage_km: Optional[int] = None
+    engine_cm3: Optional[int] = None
+    car_status: Optional[str] = None
+    location_status: Optional[str] = None
+    price: Optional[float] = None
+
+    @field_validator("brand", "model", "year", "mileage_km", "engine_cm3", "car_status", "location_status", "price")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+# Partial update: only the fields sent are written, and only if version still matches
+class CarPatch(CarAssignments):
+    version: int
+    dealer_ref: Optional[str] = None
+
 class CarResponse(CarBase):
     id: int
     mileage_miles: int
     photos: Optional[List[str]] = []
+    photo_ids: Optional[List[int]] = []
+    photo_sizes: Optional[List[Dict[str, str]]] = []
+    version: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Compact list card, GET /cars?view=summary: the first photo and its derivatives only
+class CarSummary(BaseModel):
+    id: int
+    brand: str
+    model: str
+    year: int
+    price: float
+    photo: Optional[str] = None
+    photo_sizes: Dict[str, str] = {}
+
+# Filters shared by the endpoints that select a subset of the catalog
+class CarFilters(BaseModel):
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    series: Optional[str] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    mileage_km_min: Optional[int] = None
+    mileage_km_max: Optional[int] = None
+    engine_cm3_min: Optional[int] = None
+    engine_cm3_max: Optional[int] = None
+    car_status: Optional[str] = None
+    location_status: Optional[str] = None
+
+def photo_key_from_url(photo_url: str) -> str:
+    return photo_url.split('/')[-1]
+
+PHOTO_MIGRATION_BATCH_SIZE = 1000
+
+# One-time move of the old cars.photos / cars.photo_sizes JSON arrays into car_photos
+def move_photo_arrays(conn, has_sizes: bool):
+    legacy = table("cars", column("id", Integer), column("photos", JSON), column("photo_sizes", JSON))
+    columns = [legacy.c.id, legacy.c.photos] + ([legacy.c.photo_sizes] if has_sizes else [])
+    now = datetime.utcnow()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(*columns)
+            .where(legacy.c.id > last_id)
+            .order_by(legacy.c.id)
+            .limit(PHOTO_MIGRATION_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        photos = [
+            {"car_id": car_id, "position": position, "key": photo_key_from_url(url), "url": url,
+             "sizes": sizes[position] if position < len(sizes) else {}, "created_at": now}
+            for car_id, urls, sizes in ((row[0], row[1] or [], (row[2] if has_sizes else None) or []) for row in rows)
+            for position, url in enumerate(urls)
+        ]
+        if photos:
+            conn.execute(insert(CarPhoto), photos)
+
+# Set-based update of every car matching ids and/or filters
+class CarSetUpdate(BaseModel):
+    ids: Optional[List[int]] = None
+    filters: Optional[CarFilters] = None
+    set: CarAssignments
 
-# Cloud Storage setup
-BUCKET_NAME = "car-finder-dev-photos"
-try:
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
-    print("✅ Google Cloud Storage initialized successfully")
-except Exception as e:
-    print(f"⚠️ Could not initialize Google Cloud Storage: {e}")
-    storage_client = None
-    bucket = None
+# Bring databases created by earlier releases up to the current schema
+def upgrade_schema(bind):
+    columns = {column["name"] for column in inspect(bind).get_columns("cars")}
+    with bind.begin() as conn:
+        if "updated_at" not in columns:
+            conn.execute(text("ALTER TABLE cars ADD COLUMN updated_at TIMESTAMP"))
+            conn.execute(text("UPDATE cars SET updated_at = created_at"))
+        if "dealer_ref" not in columns:
+            conn.execute(text("ALTER TABLE cars ADD COLUMN dealer_ref VARCHAR"))
+        if "version" not in columns:
+            conn.execute(text("ALTER TABLE cars ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        if "photos" in columns:
+            # Same transaction as the column drops, so an interrupted move is simply redone
+            CarPhoto.__table__.create(conn, checkfirst=True)
+            move_photo_arrays(conn, "photo_sizes" in columns)
+            conn.execute(text("ALTER TABLE cars DROP COLUMN photos"))
+            if "photo_sizes" in columns:
+                conn.execute(text("ALTER TABLE cars DROP COLUMN photo_sizes"))
+        # Earlier releases inserted the row on the first write, so a never-written catalog has none
+        CatalogState.__table__.create(conn, checkfirst=True)
+        if conn.execute(select(CatalogState.id)).first() is None:
+            conn.execute(insert(CatalogState).values(**CATALOG_STATE_SEED))
+    for index in Car.__table__.indexes:
+        index.create(bind, checkfirst=True)
+
+# Create tables: once per process, from the startup hook or a script, never at import
+schema_ready = False
+schema_lock = threading.Lock()
+
+def ensure_schema():
+    global schema_ready
+    with schema_lock:
+        if not schema_ready:
+            # Rollups added to an existing catalog start from a full recount
+            new_rollups = not inspect(engine).has_table(InventoryRollup.__tablename__)
+            Base.metadata.create_all(bind=engine)
+            upgrade_schema(engine)
+            if new_rollups:
+                from inventory_stats import rebuild_rollups
+                rebuild_rollups(lambda: Session(bind=engine))
+            schema_ready = True
+
+# Photo storage setup: "gcs" or "local" (see storage_backends.py), built on first use
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+BUCKET_NAME = os.getenv("STORAGE_BUCKET", "car-finder-dev-photos")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "./media")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/media")
+photo_storage = LazyStorage(
+    lambda: create_storage_backend(STORAGE_BACKEND, BUCKET_NAME, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL)
+)
 
 # FastAPI app
 app = FastAPI(title="Car Finder API", version="1.0.1")
+app.add_event_handler("shutdown", shutdown_pool)
+
+async def check_schema():
+    await run_in_threadpool(ensure_schema)
+
+app.add_event_handler("startup", check_schema)
+
+# Periodic retry of failed blob deletions and orphan reconciliation (blob_cleanup.py)
+blob_cleanup_task = None
+
+async def start_blob_cleanup():
+    global blob_cleanup_task
+    from blob_cleanup import BLOB_CLEANUP_INTERVAL, cleanup_loop
+    if BLOB_CLEANUP_INTERVAL > 0 and photo_storage is not None:
+        blob_cleanup_task = asyncio.create_task(cleanup_loop(SessionLocal, photo_storage))
+
+async def stop_blob_cleanup():
+    if blob_cleanup_task is not None:
+        blob_cleanup_task.cancel()
+
+app.add_event_handler("startup", start_blob_cleanup)
+app.add_event_handler("shutdown", stop_blob_cleanup)
+
+# The local backend's files are served by the API itself
+if STORAGE_BACKEND == "local" and LOCAL_STORAGE_URL.startswith("/"):
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR, check_dir=False), name="media")
 
 # CORS middleware
 app.add_middleware(
@@ -81,8 +387,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+# Request counts, latency and per-request database time for /metrics; added last so it times CORS too
+app.add_middleware(MetricsMiddleware)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -91,62 +401,397 @@ def get_db():
     finally:
         db.close()
 
+# Session factory for work that outlives the request handler, such as streamed responses
+def get_session_factory():
+    return SessionLocal
+
 # Helper function to convert km to miles
 def km_to_miles(km: int) -> int:
     return int(km * 0.621371)
 
-# API Endpoints
-@app.get("/")
-def read_root():
-    return {"message": "Car Finder API", "version": "1.0.1", "status": "healthy"}
+# Pagination settings for GET /cars
+DEFAULT_PAGE_SIZE = int(os.getenv("CARS_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = 500
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok", "version": "1.0.1", "timestamp": datetime.utcnow().isoformat()}
+# Whitelisted sort keys; a leading "-" means descending
+SORT_COLUMNS = {
+    "created_at": Car.created_at,
+    "price": Car.price,
+    "year": Car.year,
+    "mileage_km": Car.mileage_km,
+    "engine_cm3": Car.engine_cm3,
+}
+DEFAULT_SORT = "-created_at"
+
+def apply_car_filters(query, filters: CarFilters):
+    for field in ("brand", "model", "series", "car_status", "location_status"):
+        value = getattr(filters, field)
+        if value is not None:
+            query = query.filter(getattr(Car, field) == value)
+    for field in ("year", "price", "mileage_km", "engine_cm3"):
+        low = getattr(filters, f"{field}_min")
+        high = getattr(filters, f"{field}_max")
+        if low is not None:
+            query = query.filter(getattr(Car, field) >= low)
+        if high is not None:
+            query = query.filter(getattr(Car, field) <= high)
+    return query
+
+def parse_sort(sort: str):
+    descending = sort.startswith("-")
+    column = SORT_COLUMNS.get(sort.lstrip("-"))
+    if column is None:
+        allowed = ", ".join(sorted(SORT_COLUMNS))
+        raise HTTPException(status_code=400, detail=f"Invalid sort, allowed: {allowed} (prefix with - for descending)")
+    return column, descending
 
-@app.get("/cars", response_model=List[CarResponse])
-def get_cars(db: Session = Depends(get_db)):
-    cars = db.query(Car).all()
-    return cars
+# Opaque keyset cursor over (sort value, id) of the last car on a page
+def encode_cursor(sort: str, value, car_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, car_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, car_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        if sort.lstrip("-") == "created_at":
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            # Bound straight into the keyset comparison, so anything but a number is a bad cursor
+            raise TypeError(value)
+        if isinstance(car_id, bool) or not isinstance(car_id, int):
+            raise TypeError(car_id)
+        return value, car_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@app.get("/cars/{car_id}", response_model=CarResponse)
-def get_car(car_id: int, db: Session = Depends(get_db)):
-    car = db.query(Car).filter(Car.id == car_id).first()
-    if car is None:
+# Fuzzy search index over brand/model/series, kept in step with every write
+search_index = CarSearchIndex()
+
+def load_search_index(db: Session):
+    # In id order, so every car is appended to its text's sorted ids
+    search_index.ensure_loaded(
+        lambda: db.query(Car.id, Car.brand, Car.model, Car.series).order_by(Car.id).yield_per(10000)
+    )
+
+# Read cache of serialized car responses; a TTL of 0 disables it
+listing_cache = ListingCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", "30")),
+)
+car_list_adapter = TypeAdapter(List[CarResponse])
+
+# Every replica subscribes; swap in a shared broker when running more than one
+invalidation_bus = LocalInvalidationBus()
+
+def apply_car_change(message: dict):
+    car_id = message["car_id"]
+    listing_cache.invalidate(car_id)
+    if message["deleted"]:
+        search_index.remove(car_id)
+    else:
+        search_index.add(car_id, message["brand"], message["model"], message["series"])
+
+invalidation_bus.subscribe(apply_car_change)
+
+# Called after a write commits so caches and the search index drop stale entries
+def publish_car_change(car_id: int, db_car: Optional[Car] = None):
+    message = {"car_id": car_id, "deleted": db_car is None}
+    if db_car is not None:
+        message.update(brand=db_car.brand, model=db_car.model, series=db_car.series)
+    invalidation_bus.publish(message)
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Conditional GET support: strong ETags and Last-Modified, answered with 304
+CATALOG_STATE_QUERY = select(CatalogState.version, CatalogState.updated_at).where(CatalogState.id == 1)
+
+# Atomic increment inside the caller's transaction, committed with the write itself
+def catalog_bump_statement(now: datetime):
+    return (
+        update(CatalogState)
+        .where(CatalogState.id == 1)
+        .values(version=CatalogState.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+def touch_catalog(db: Session):
+    db.execute(catalog_bump_statement(datetime.utcnow()))
+
+def catalog_state_tuple(state):
+    return (state.version, state.updated_at) if state else (0, EPOCH)
+
+def read_catalog_state(db: Session):
+    return catalog_state_tuple(db.execute(CATALOG_STATE_QUERY).first())
+
+# Inventory rollups: each write adds its cars' new values and subtracts their old ones,
+# as one upsert inside the write's own transaction
+ROLLUP_FIELDS = ("brand", "model", "year", "location_status", "price")
+ROLLUP_KEY = ("brand", "model", "year", "location_status", "price_bucket")
+ROLLUP_COLUMNS = [getattr(Car, field) for field in ROLLUP_FIELDS]
+# Bucket bounds grow 1% at a time, so a median read from them is within 1% at any price
+PRICE_BUCKET_RATIO = 1.01
+LOG_PRICE_BUCKET_RATIO = math.log(PRICE_BUCKET_RATIO)
+ROLLUP_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def rollup_price_bucket(price: float) -> int:
+    return int(math.log1p(max(price, 0.0)) / LOG_PRICE_BUCKET_RATIO)
+
+# The rollup-relevant values of a Car, a request model or a result row
+def rollup_entry(car) -> tuple:
+    return tuple(getattr(car, field) for field in ROLLUP_FIELDS)
+
+def rollup_delta_rows(removed=(), added=()) -> List[dict]:
+    deltas = {}
+    for sign, entries in ((-1, removed), (1, added)):
+        for brand, model, year, location_status, price in entries:
+            delta = deltas.setdefault((brand, model, year, location_status, rollup_price_bucket(price)), [0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * price
+    # An update that leaves every rollup field alone nets out to nothing
+    return [
+        dict(zip(ROLLUP_KEY, key), car_count=count, price_total=total)
+        for key, (count, total) in deltas.items() if count or total
+    ]
+
+def rollup_upsert_statement(dialect_name: str):
+    statement = ROLLUP_UPSERT_INSERTS[dialect_name](InventoryRollup)
+    return statement.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            "car_count": InventoryRollup.car_count + statement.excluded.car_count,
+            "price_total": InventoryRollup.price_total + statement.excluded.price_total,
+        },
+    )
+
+def apply_rollup_delta(db: Session, removed=(), added=()):
+    rows = rollup_delta_rows(removed, added)
+    if rows:
+        db.execute(rollup_upsert_statement(db.get_bind().dialect.name), rows)
+
+# Current rollup values of the cars a write is about to change, locked until it commits
+def rollup_entries_statement(*criteria):
+    return select(Car.id, *ROLLUP_COLUMNS).where(*criteria).with_for_update()
+
+def car_etag(car_id: int, updated_at: datetime) -> str:
+    return f'"car-{car_id}-{updated_at:%Y%m%d%H%M%S%f}"'
+
+def list_etag(version: int, cache_key: str) -> str:
+    digest = hashlib.sha1(cache_key.encode()).hexdigest()[:16]
+    return f'"cars-{version}-{digest}"'
+
+def validator_headers(etag: str, last_modified: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+        # Let browsers and the CDN store responses but always revalidate them
+        "Cache-Control": "no-cache",
+    }
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def not_modified_response(etag: str, last_modified: datetime) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+# Building blocks shared by the sync CRUD endpoints and their async twins in async_api.py
+def list_cache_key(filters: CarFilters, sort: str, limit: int, cursor: Optional[str], unbounded: bool,
+                   projection: Optional[List[str]] = None) -> str:
+    key = [filters.model_dump(exclude_none=True), sort, limit, cursor, unbounded]
+    if projection is not None:
+        key.append(projection)
+    return json.dumps(key, sort_keys=True)
+
+# Sparse fieldsets: GET /cars?fields=... or ?view=summary select these columns instead of whole cars
+LIST_FIELDS = list(CarResponse.model_fields)
+SUMMARY_FIELDS = list(CarSummary.model_fields)
+LIST_PHOTO_FIELDS = {"photos": CarPhoto.url, "photo_ids": CarPhoto.id, "photo_sizes": CarPhoto.sizes}
+
+def first_photo(photo_column):
+    # Correlated to each listed car; a seek on the (car_id, position) index
+    return (
+        select(photo_column)
+        .where(CarPhoto.car_id == Car.id)
+        .order_by(CarPhoto.position)
+        .limit(1)
+        .correlate(Car)
+        .scalar_subquery()
+    )
+
+SUMMARY_PHOTO_COLUMNS = {"photo": first_photo(CarPhoto.url), "photo_sizes": first_photo(CarPhoto.sizes)}
+
+def list_projection(fields: Optional[str], view: str) -> Optional[List[str]]:
+    """Output fields of a sparse list, or None for full ``CarResponse`` objects."""
+    if view == "summary":
+        if fields:
+            raise HTTPException(status_code=400, detail="fields cannot be combined with view=summary")
+        return SUMMARY_FIELDS
+    if not fields:
+        return None
+    # id is always included: clients need it to link to the car
+    selected = list(dict.fromkeys(["id"] + [field.strip() for field in fields.split(",") if field.strip()]))
+    unknown = [field for field in selected if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def projection_columns(projection: List[str], sort_column) -> list:
+    columns = []
+    for field in projection:
+        if projection == SUMMARY_FIELDS and field in SUMMARY_PHOTO_COLUMNS:
+            columns.append(SUMMARY_PHOTO_COLUMNS[field].label(field))
+        elif field not in LIST_PHOTO_FIELDS:
+            columns.append(getattr(Car, field))
+    # The cursor is built from the sort value of the last row
+    if sort_column.key not in projection:
+        columns.append(sort_column)
+    return columns
+
+def car_list_statement(filters: CarFilters, sort: str, column, descending: bool, limit: int,
+                       cursor: Optional[str], unbounded: bool, projection: Optional[List[str]] = None):
+    selected = [Car] if projection is None else projection_columns(projection, column)
+    statement = apply_car_filters(select(*selected), filters)
+
+    # id breaks ties so the order is total and matches the (column, id) indexes
+    if descending:
+        statement = statement.order_by(column.desc(), Car.id.desc())
+    else:
+        statement = statement.order_by(column.asc(), Car.id.asc())
+    if unbounded:
+        return statement
+
+    # Seek past the previous page instead of using OFFSET, so every page costs the same
+    if cursor:
+        value, car_id = decode_cursor(cursor, sort)
+        position = tuple_(column, Car.id)
+        statement = statement.where(position < (value, car_id) if descending else position > (value, car_id))
+
+    # Fetch one extra row to find out whether there is a next page
+    return statement.limit(limit + 1)
+
+def page_rows(rows: list, sort: str, column, limit: int, unbounded: bool):
+    next_cursor = None
+    if not unbounded and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+    return rows, next_cursor
+
+def car_list_entry(cars: list, sort: str, column, limit: int, unbounded: bool, etag: str, last_modified: datetime):
+    cars, next_cursor = page_rows(cars, sort, column, limit, unbounded)
+    # Validated from attributes first: the photo lists are properties, not columns
+    body = car_list_adapter.dump_json(car_list_adapter.validate_python(cars, from_attributes=True))
+    return body, next_cursor, etag, last_modified
+
+# Photo lists of a sparse page, all cars in one query; the summary's first photo comes with the rows
+def photo_lists_statement(car_ids, photo_columns: list):
+    return (
+        select(CarPhoto.car_id, *photo_columns)
+        .where(CarPhoto.car_id.in_(car_ids))
+        .order_by(CarPhoto.car_id, CarPhoto.position)
+    )
+
+def projection_photo_fields(projection: List[str]) -> List[str]:
+    return [] if projection == SUMMARY_FIELDS else [field for field in projection if field in LIST_PHOTO_FIELDS]
+
+def projection_photos_statement(projection: List[str], rows: list):
+    photo_fields = projection_photo_fields(projection)
+    if not photo_fields or not rows:
+        return None
+    return photo_lists_statement([row.id for row in rows], [LIST_PHOTO_FIELDS[field] for field in photo_fields])
+
+def list_value(field: str, value):
+    # Photos stored without derivatives have no sizes; CarResponse reports those as {}
+    if field == "photo_sizes" and value is None:
+        return {}
+    return export_value(value)
+
+# Plain rows straight to JSON: no ORM instances and no model validation
+def projected_list_entry(rows: list, photo_rows: list, projection: List[str], next_cursor: Optional[str],
+                         etag: str, last_modified: datetime):
+    photo_fields = projection_photo_fields(projection)
+    photos = {row.id: {field: [] for field in photo_fields} for row in rows}
+    for car_id, *values in photo_rows:
+        for field, value in zip(photo_fields, values):
+            photos[car_id][field].append(list_value(field, value))
+    cars = [
+        {field: photos[row.id][field] if field in photo_fields else list_value(field, getattr(row, field))
+         for field in projection}
+        for row in rows
+    ]
+    return json.dumps(cars).encode(), next_cursor, etag, last_modified
+
+def car_list_response(request: Request, entry) -> Response:
+    body, next_cursor, etag, last_modified = entry
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    headers = validator_headers(etag, last_modified)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return json_response(body, headers)
+
+def has_validators(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def car_stamp_statement(car_id: int):
+    return select(Car.updated_at, Car.created_at).where(Car.id == car_id)
+
+def check_car_stamp(request: Request, car_id: int, stamp) -> Optional[Response]:
+    if stamp is None:
         raise HTTPException(status_code=404, detail="Car not found")
-    return car
+    last_modified = stamp.updated_at or stamp.created_at
+    etag = car_etag(car_id, last_modified)
+    return not_modified_response(etag, last_modified) if is_not_modified(request, etag, last_modified) else None
 
-@app.post("/cars", response_model=CarResponse)
-def create_car(car: CarCreate, db: Session = Depends(get_db)):
-    # Calculate miles from km
-    mileage_miles = km_to_miles(car.mileage_km)
-    
-    db_car = Car(
+def car_entry(car: Car):
+    last_modified = car.updated_at or car.created_at
+    body = CarResponse.model_validate(car).model_dump_json().encode()
+    return body, car_etag(car.id, last_modified), last_modified
+
+def car_response(request: Request, entry) -> Response:
+    body, etag, last_modified = entry
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return json_response(body, validator_headers(etag, last_modified))
+
+def new_car(car: CarCreate) -> Car:
+    return Car(
         brand=car.brand,
         model=car.model,
         series=car.series,
         year=car.year,
         mileage_km=car.mileage_km,
-        mileage_miles=mileage_miles,
+        mileage_miles=km_to_miles(car.mileage_km),
         engine_cm3=car.engine_cm3,
         car_status=car.car_status,
         location_status=car.location_status,
         price=car.price,
-        photos=[]
+        dealer_ref=car.dealer_ref,
     )
-    
-    db.add(db_car)
-    db.commit()
-    db.refresh(db_car)
-    return db_car
 
-@app.put("/cars/{car_id}", response_model=CarResponse)
-def update_car(car_id: int, car: CarCreate, db: Session = Depends(get_db)):
-    db_car = db.query(Car).filter(Car.id == car_id).first()
-    if db_car is None:
-        raise HTTPException(status_code=404, detail="Car not found")
-    
-    # Update fields
+def next_version():
+    return Car.version + 1
+
+def apply_car_update(db_car: Car, car: CarCreate):
     db_car.brand = car.brand
     db_car.model = car.model
     db_car.series = car.series
@@ -157,91 +802,1007 @@ def update_car(car_id: int, car: CarCreate, db: Session = Depends(get_db)):
     db_car.car_status = car.car_status
     db_car.location_status = car.location_status
     db_car.price = car.price
-    
-    db.commit()
+    # Clients that predate dealer feeds must not wipe the import key
+    if "dealer_ref" in car.model_fields_set:
+        db_car.dealer_ref = car.dealer_ref
+    db_car.version = next_version()
+
+# Column values for an update that sets only the given fields
+def assigned_values(assignments: CarAssignments, exclude=None) -> dict:
+    values = assignments.model_dump(exclude_unset=True, exclude=exclude)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if "mileage_km" in values:
+        values["mileage_miles"] = km_to_miles(values["mileage_km"])
+    return dict(values, version=next_version(), updated_at=datetime.utcnow())
+
+# One UPDATE ... WHERE id = ? AND version = ? RETURNING, so there is nothing to read first
+def car_patch_statement(car_id: int, patch: CarPatch):
+    return (
+        update(Car)
+        .where(Car.id == car_id, Car.version == patch.version)
+        .values(**assigned_values(patch, exclude={"version"}))
+        .returning(Car)
+        .execution_options(synchronize_session=False)
+    )
+
+def patch_changes_rollups(patch: CarPatch) -> bool:
+    return any(field in patch.model_fields_set for field in ROLLUP_FIELDS)
+
+def car_version_statement(car_id: int):
+    return select(Car.version).where(Car.id == car_id)
+
+# Tells a missing car from a stale version once the guarded UPDATE matched nothing
+def car_patch_failed(current_version: Optional[int]) -> HTTPException:
+    if current_version is None:
+        return HTTPException(status_code=404, detail="Car not found")
+    return HTTPException(status_code=409, detail=f"Version conflict: the car is at version {current_version}")
+
+def car_photo_keys(photos: List[CarPhoto]) -> List[str]:
+    # The original's key plus one per stored size
+    return [key for photo in photos
+            for key in [photo.key] + [photo_key_from_url(url) for url in (photo.sizes or {}).values()]]
+
+def queue_blob_deletions(db, keys: List[str]):
+    db.add_all([BlobDeletion(key=key) for key in keys])
+
+# Work the queue right after the response; the periodic sweep retries whatever fails
+def kick_blob_cleanup(background_tasks: BackgroundTasks, session_factory):
+    if photo_storage is not None:
+        from blob_cleanup import process_deletions
+        background_tasks.add_task(process_deletions, session_factory, photo_storage)
+
+DUPLICATE_DEALER_REF = "A car with this dealer_ref already exists"
+
+# The only unique constraint a client can hit is the dealer reference
+def commit_or_conflict(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+
+# Writes a pending ORM update now, so a car deleted since it was read is a 404 before any rollup delta
+def flush_car_write(db: Session):
+    try:
+        db.flush()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Car not found")
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+
+# Core CRUD endpoints; registered last (see bottom of file) so the fixed /cars/... paths match first
+crud_router = APIRouter()
+
+# API Endpoints
+@app.get("/")
+def read_root():
+    return {"message": "Car Finder API", "version": "1.0.1", "status": "healthy"}
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok", "version": "1.0.1", "timestamp": datetime.utcnow().isoformat()}
+
+# Readiness, unlike /health, needs the schema checked and the database reachable.
+# Storage is initialized here rather than by the first upload, but its failure
+# only degrades photo endpoints, so it is reported without failing the probe.
+@app.get("/ready")
+def readiness_check(response: Response, db: Session = Depends(get_db)):
+    checks = {"schema": "ok" if schema_ready else "pending"}
+    try:
+        db.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except SQLAlchemyError as e:
+        checks["database"] = f"error: {e}"
+    try:
+        if photo_storage is None:
+            raise RuntimeError("Photo storage unavailable")
+        if isinstance(photo_storage, LazyStorage):
+            photo_storage.get()
+        checks["storage"] = "ok"
+    except RuntimeError as e:
+        checks["storage"] = str(e)
+    ready = checks["schema"] == "ok" and checks["database"] == "ok"
+    response.status_code = 200 if ready else 503
+    return {"status": "ready" if ready else "not ready", "checks": checks}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return listing_cache.stats()
+
+def pooled_engines() -> dict:
+    engines = {"sync": engine}
+    if ASYNC_DB:
+        from async_api import async_engine
+        engines["async"] = async_engine.sync_engine
+    return engines
+
+@app.get("/db/pool/stats")
+def db_pool_stats():
+    return pool_stats(pooled_engines())
+
+# Prometheus scrape target; includes the pool counters above
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(pooled_engines()), media_type=METRICS_CONTENT_TYPE)
+
+@crud_router.get("/cars", response_model=Union[List[CarResponse], List[CarSummary]])
+def get_cars(
+    request: Request,
+    filters: CarFilters = Depends(),
+    sort: str = DEFAULT_SORT,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    unbounded: bool = Query(False, alias="all"),
+    fields: Optional[str] = Query(None, description="Comma-separated car fields to return"),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: Session = Depends(get_db),
+):
+    column, descending = parse_sort(sort)
+    projection = list_projection(fields, view)
+    cache_key = list_cache_key(filters, sort, limit, cursor, unbounded, projection)
+    entry = None if unbounded else listing_cache.get_list(cache_key)
+    if entry is None:
+        generation = listing_cache.generation
+
+        # Read the version before the rows so the ETag can never claim newer data than the body
+        version, last_modified = read_catalog_state(db)
+        etag = list_etag(version, cache_key)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        statement = car_list_statement(filters, sort, column, descending, limit, cursor, unbounded, projection)
+        if projection is None:
+            entry = car_list_entry(db.scalars(statement).all(), sort, column, limit, unbounded, etag, last_modified)
+        else:
+            rows, next_cursor = page_rows(db.execute(statement).all(), sort, column, limit, unbounded)
+            photos = projection_photos_statement(projection, rows)
+            photo_rows = db.execute(photos).all() if photos is not None else []
+            entry = projected_list_entry(rows, photo_rows, projection, next_cursor, etag, last_modified)
+        if not unbounded:
+            listing_cache.set_list(cache_key, entry, generation)
+    return car_list_response(request, entry)
+
+@app.get("/cars/search", response_model=List[CarResponse])
+def search_cars(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    load_search_index(db)
+    ranked_ids = [car_id for car_id, _ in search_index.search(q, limit)]
+    if not ranked_ids:
+        return []
+
+    # Primary-key lookup for the winners only, then restore the ranking
+    cars = {car.id: car for car in db.query(Car).filter(Car.id.in_(ranked_ids))}
+    return [cars[car_id] for car_id in ranked_ids if car_id in cars]
+
+# Faceted counts for the search UI, under the same filters as GET /cars
+FACET_FIELDS = ("brand", "model", "car_status", "location_status")
+DEFAULT_PRICE_BUCKET = 5000.0
+DEFAULT_MILEAGE_BUCKET = 25000
+# Most buckets one histogram may have; a narrower width over the matching cars is a 400
+FACET_MAX_BUCKETS = 200
+
+def facet_cache_key(filters: CarFilters, price_bucket: float, mileage_bucket: int) -> str:
+    return json.dumps(["facets", filters.model_dump(exclude_none=True), price_bucket, mileage_bucket], sort_keys=True)
+
+# One GROUP BY over the four categorical fields, rolled up per field in Python;
+# the combinations are few next to the rows, so this beats a query per field
+def facet_counts_statement(filters: CarFilters):
+    columns = [getattr(Car, field) for field in FACET_FIELDS]
+    # Each group's price and mileage range as well, so the histograms are bounded before they run
+    ranges = [func.min(Car.price), func.max(Car.price), func.min(Car.mileage_km), func.max(Car.mileage_km)]
+    return apply_car_filters(select(*columns, func.count(), *ranges), filters).group_by(*columns)
+
+def histogram_spans(counts_rows, price_bucket: float, mileage_bucket: int) -> Dict[str, int]:
+    """Buckets the price and mileage histograms would have, keyed by their width parameter."""
+    spans = {}
+    for param, width, position in (("price_bucket", price_bucket, 5), ("mileage_bucket", mileage_bucket, 7)):
+        if not counts_rows:
+            spans[param] = 0
+            continue
+        low = min(row[position] for row in counts_rows)
+        high = max(row[position + 1] for row in counts_rows)
+        spans[param] = math.floor(high / width) - math.floor(low / width) + 1
+    return spans
+
+# The three histograms in one round trip; each branch yields (histogram, bucket index, count)
+def facet_histograms_statement(filters: CarFilters, price_bucket: float, mileage_bucket: int):
+    buckets = {
+        "year": Car.year,
+        "price": func.floor(Car.price / price_bucket),
+        "mileage_km": func.floor(Car.mileage_km / mileage_bucket),
+    }
+    return union_all(*[
+        apply_car_filters(select(literal(name).label("histogram"), bucket.label("bucket"), func.count()), filters)
+        .group_by(bucket)
+        for name, bucket in buckets.items()
+    ])
+
+def ranked(counts: dict) -> list:
+    # Most common first, then by value so equal counts keep a stable order
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+def facet_body(counts_rows, histogram_rows, price_bucket: float, mileage_bucket: int) -> dict:
+    facets = {field: {} for field in FACET_FIELDS}
+    for brand, model, car_status, location_status, count, *_ in counts_rows:
+        # Models are counted per brand, since two brands may share a model name
+        for field, value in (("brand", brand), ("model", (brand, model)), ("car_status", car_status),
+                             ("location_status", location_status)):
+            facets[field][value] = facets[field].get(value, 0) + count
+
+    widths = {"price": price_bucket, "mileage_km": mileage_bucket}
+    histograms = {"year": [], "price": [], "mileage_km": []}
+    for name, bucket, count in sorted(histogram_rows, key=lambda row: (row[0], row[1])):
+        bucket = int(bucket)
+        if name == "year":
+            histograms[name].append({"value": bucket, "count": count})
+        else:
+            low = bucket * widths[name]
+            histograms[name].append({"min": low, "max": low + widths[name], "count": count})
+
+    return {
+        "total": sum(facets["brand"].values()),
+        "facets": {
+            field: [{"brand": value[0], "value": value[1], "count": count} if field == "model"
+                    else {"value": value, "count": count} for value, count in ranked(facets[field])]
+            for field in FACET_FIELDS
+        },
+        "histograms": histograms,
+    }
+
+@app.get("/cars/facets")
+def get_car_facets(
+    request: Request,
+    filters: CarFilters = Depends(),
+    price_bucket: float = Query(DEFAULT_PRICE_BUCKET, gt=0),
+    mileage_bucket: int = Query(DEFAULT_MILEAGE_BUCKET, gt=0),
+    db: Session = Depends(get_db),
+):
+    # Cached beside the list pages, so any car write drops it too
+    cache_key = facet_cache_key(filters, price_bucket, mileage_bucket)
+    entry = listing_cache.get_list(cache_key)
+    if entry is None:
+        generation = listing_cache.generation
+        version, last_modified = read_catalog_state(db)
+        etag = list_etag(version, cache_key)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        counts_rows = db.execute(facet_counts_statement(filters)).all()
+        for param, buckets in histogram_spans(counts_rows, price_bucket, mileage_bucket).items():
+            if buckets > FACET_MAX_BUCKETS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{param} too narrow: {buckets} buckets over the matching cars, at most {FACET_MAX_BUCKETS}",
+                )
+        body = facet_body(
+            counts_rows,
+            db.execute(facet_histograms_statement(filters, price_bucket, mileage_bucket)).all(),
+            price_bucket,
+            mileage_bucket,
+        )
+        entry = json.dumps(body).encode(), etag, last_modified
+        listing_cache.set_list(cache_key, entry, generation)
+    return car_response(request, entry)
+
+# Inventory statistics for dashboards, read from the rollups alone
+def median_from_buckets(buckets: List[tuple], count: int) -> Optional[float]:
+    """Median of ``count`` prices given ``(average price, cars)`` per bucket, in bucket order.
+
+    The median car's price is taken to be its bucket's average, which is exact
+    whenever the cars sharing that bucket share a price.
+    """
+    if not count:
+        return None
+    # Zero-based positions of the middle car, or the two middle cars
+    wanted = sorted({(count - 1) // 2, count // 2})
+    values, seen = [], 0
+    for average, cars in buckets:
+        seen += cars
+        while wanted and wanted[0] < seen:
+            values.append(average)
+            wanted.pop(0)
+    return sum(values) / len(values)
+
+@app.get("/stats")
+def get_inventory_stats(db: Session = Depends(get_db)):
+    rows = db.execute(
+        select(InventoryRollup.location_status, func.sum(InventoryRollup.car_count),
+               func.sum(InventoryRollup.price_total))
+        .group_by(InventoryRollup.location_status)
+    ).all()
+    by_location = {location_status: count for location_status, count, _ in rows if count}
+    total = sum(by_location.values())
+    price_total = sum(total_price for _, count, total_price in rows if count)
+    return {
+        "total": total,
+        "average_price": price_total / total if total else None,
+        "by_location_status": [{"value": value, "count": count} for value, count in ranked(by_location)],
+    }
+
+@app.get("/stats/prices")
+def get_price_stats(
+    brand: Optional[str] = None,
+    model: Optional[str] = None,
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    group = (InventoryRollup.brand, InventoryRollup.model, InventoryRollup.year)
+    statement = (
+        select(*group, InventoryRollup.price_bucket, func.sum(InventoryRollup.car_count),
+               func.sum(InventoryRollup.price_total))
+        .group_by(*group, InventoryRollup.price_bucket)
+        .order_by(*group, InventoryRollup.price_bucket)
+    )
+    for field, value in (("brand", brand), ("model", model), ("year", year)):
+        if value is not None:
+            statement = statement.where(getattr(InventoryRollup, field) == value)
+
+    # Rows arrive grouped by brand/model/year with their buckets in price order
+    groups = {}
+    for brand, model, year, bucket, count, total in db.execute(statement):
+        if count:
+            entry = groups.setdefault((brand, model, year), [0, 0.0, []])
+            entry[0] += count
+            entry[1] += total
+            entry[2].append((total / count, count))
+    return [
+        {"brand": brand, "model": model, "year": year, "count": count, "average_price": total / count,
+         "median_price": median_from_buckets(buckets, count)}
+        for (brand, model, year), (count, total, buckets) in groups.items()
+    ]
+
+# Catalog export settings; photo fields are lists gathered from car_photos
+PHOTO_EXPORT_FIELDS = {"photos": CarPhoto.url, "photo_sizes": CarPhoto.sizes}
+EXPORT_FIELDS = [column.name for column in Car.__table__.columns] + list(PHOTO_EXPORT_FIELDS)
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+# One query per batch for the photo fields, instead of one per car
+def export_batch(db: Session, rows: list, fields: List[str]):
+    photo_fields = [field for field in fields if field in PHOTO_EXPORT_FIELDS]
+    if not photo_fields:
+        return [[export_value(value) for value in row] for row in rows]
+    photos = {row.id: {field: [] for field in photo_fields} for row in rows}
+    statement = photo_lists_statement(photos, [PHOTO_EXPORT_FIELDS[field] for field in photo_fields])
+    for car_id, *values in db.execute(statement):
+        for field, value in zip(photo_fields, values):
+            photos[car_id][field].append(value)
+    return [
+        [photos[row.id][field] if field in PHOTO_EXPORT_FIELDS else export_value(getattr(row, field))
+         for field in fields]
+        for row in rows
+    ]
+
+def export_rows(session_factory, fields: List[str], filters: CarFilters):
+    # Own session: the stream is consumed after the handler has returned
+    db = session_factory()
+    try:
+        columns = [getattr(Car, field) for field in fields if field not in PHOTO_EXPORT_FIELDS]
+        # The photo lists are matched up by id; without them each row is exactly the requested fields
+        if "id" not in fields and any(field in PHOTO_EXPORT_FIELDS for field in fields):
+            columns.append(Car.id)
+        query = apply_car_filters(db.query(*columns), filters).order_by(Car.id)
+        # Plain rows through a server-side cursor; memory stays at one batch
+        batch = []
+        for row in query.yield_per(EXPORT_BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield export_batch(db, batch, fields)
+                batch = []
+        if batch:
+            yield export_batch(db, batch, fields)
+    finally:
+        db.close()
+
+def export_ndjson(batches, fields):
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(fields, row))) + "\n" for row in batch)
+
+def export_csv(batches, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows([json.dumps(value) if isinstance(value, list) else value for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/cars/export")
+def export_cars(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to include"),
+    filters: CarFilters = Depends(),
+    session_factory=Depends(get_session_factory),
+):
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else EXPORT_FIELDS
+    unknown = [field for field in selected if field not in EXPORT_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown export fields: {', '.join(unknown)}")
+
+    batches = export_rows(session_factory, selected, filters)
+    body = export_ndjson(batches, selected) if export_format == "ndjson" else export_csv(batches, selected)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="cars.{export_format}"'},
+    )
+
+@crud_router.get("/cars/{car_id}", response_model=CarResponse)
+def get_car(car_id: int, request: Request, db: Session = Depends(get_db)):
+    entry = listing_cache.get_car(car_id)
+    if entry is None:
+        generation = listing_cache.generation
+
+        # Validate against the timestamp alone before loading and serializing the row
+        if has_validators(request):
+            not_modified = check_car_stamp(request, car_id, db.execute(car_stamp_statement(car_id)).first())
+            if not_modified is not None:
+                return not_modified
+
+        car = db.query(Car).filter(Car.id == car_id).first()
+        if car is None:
+            raise HTTPException(status_code=404, detail="Car not found")
+        entry = car_entry(car)
+        listing_cache.set_car(car_id, entry, generation)
+    return car_response(request, entry)
+
+@crud_router.post("/cars", response_model=CarResponse)
+def create_car(car: CarCreate, db: Session = Depends(get_db)):
+    db_car = new_car(car)
+    db.add(db_car)
+    apply_rollup_delta(db, added=[rollup_entry(car)])
+    touch_catalog(db)
+    commit_or_conflict(db)
     db.refresh(db_car)
+    publish_car_change(db_car.id, db_car)
     return db_car
 
-@app.post("/cars/{car_id}/photos")
-async def upload_car_photo(car_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    # Check if car exists
-    db_car = db.query(Car).filter(Car.id == car_id).first()
+# Bulk write settings
+BULK_MAX_ITEMS = 10000
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# Validate every item up front; invalid items are reported, valid ones still get written
+def validate_bulk_items(items: List[dict], schema):
+    valid, results = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            results.append({"index": index, "status": "error", "errors": json.loads(e.json(include_url=False))})
+    return valid, results
+
+def bulk_write_rows(chunk, now: datetime, **extra):
+    return [
+        dict(car.model_dump(), mileage_miles=km_to_miles(car.mileage_km), updated_at=now, **extra)
+        for _, car in chunk
+    ]
+
+def bulk_chunk_failed(chunk, error: SQLAlchemyError):
+    message = str(getattr(error, "orig", None) or error)
+    return [{"index": index, "status": "error", "errors": [{"msg": message}]} for index, _ in chunk]
+
+def bulk_summary(results: list, status_name: str):
+    results.sort(key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["status"] == status_name)
+    return {status_name: succeeded, "failed": len(results) - succeeded, "results": results}
+
+@app.post("/cars/bulk")
+def bulk_create_cars(
+    items: List[dict] = Body(..., max_length=BULK_MAX_ITEMS),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    valid, results = validate_bulk_items(items, CarCreate)
+    now = datetime.utcnow()
+
+    # One multi-row INSERT ... RETURNING and one commit per chunk
+    statement = insert(Car).returning(Car.id, sort_by_parameter_order=True)
+    for chunk in chunked(valid, chunk_size):
+        try:
+            car_ids = db.scalars(statement, bulk_write_rows(chunk, now, created_at=now)).all()
+            apply_rollup_delta(db, added=[rollup_entry(car) for _, car in chunk])
+            touch_catalog(db)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            results.extend(bulk_chunk_failed(chunk, e))
+            continue
+        for (index, car), car_id in zip(chunk, car_ids):
+            results.append({"index": index, "status": "created", "id": car_id})
+            publish_car_change(car_id, car)
+
+    return bulk_summary(results, "created")
+
+@app.put("/cars/bulk")
+def bulk_update_cars(
+    items: List[dict] = Body(..., max_length=BULK_MAX_ITEMS),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    valid, results = validate_bulk_items(items, CarBulkUpdate)
+    now = datetime.utcnow()
+
+    for chunk in chunked(valid, chunk_size):
+        ids = {car.id for _, car in chunk}
+        existing = {row.id: rollup_entry(row) for row in db.execute(rollup_entries_statement(Car.id.in_(ids)))}
+        found = [(index, car) for index, car in chunk if car.id in existing]
+        results.extend(
+            {"index": index, "status": "error", "errors": [{"msg": "Car not found"}]}
+            for index, car in chunk if car.id not in existing
+        )
+        if not found:
+            continue
+
+        # Executemany UPDATE keyed by primary key, one commit per chunk
+        rows = bulk_write_rows(found, now)
+        for row, (_, car) in zip(rows, found):
+            # Items that do not mention dealer_ref must not wipe the import key
+            if "dealer_ref" not in car.model_fields_set:
+                del row["dealer_ref"]
+        try:
+            db.execute(update(Car).values(version=next_version()), rows)
+            # The executemany applies repeated ids in order, so the last item for an id is what stays
+            latest = {car.id: car for _, car in found}
+            apply_rollup_delta(db, [existing[car_id] for car_id in latest], [rollup_entry(car) for car in latest.values()])
+            touch_catalog(db)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            results.extend(bulk_chunk_failed(found, e))
+            continue
+        for index, car in found:
+            results.append({"index": index, "status": "updated", "id": car.id})
+            publish_car_change(car.id, car)
+
+    return bulk_summary(results, "updated")
+
+BULK_SET_MAX_IDS = BULK_MAX_ITEMS
+
+@app.post("/cars/bulk-update")
+def bulk_set_cars(bulk: CarSetUpdate, db: Session = Depends(get_db)):
+    filters = bulk.filters or CarFilters()
+    # Never the whole catalog by accident
+    if bulk.ids is None and not filters.model_dump(exclude_none=True):
+        raise HTTPException(status_code=400, detail="Pass ids or at least one filter")
+    if bulk.ids is not None and len(bulk.ids) > BULK_SET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_SET_MAX_IDS} ids per request")
+
+    # One set-based UPDATE ... RETURNING; only the rows it touched are invalidated
+    statement = apply_car_filters(update(Car), filters)
+    if bulk.ids is not None:
+        statement = statement.where(Car.id.in_(bulk.ids))
+    assignments = assigned_values(bulk.set)
+    # The old rollup values are only needed when the update can move cars between rollups
+    before = {}
+    if any(field in assignments for field in ROLLUP_FIELDS):
+        selected = apply_car_filters(rollup_entries_statement(), filters)
+        if bulk.ids is not None:
+            selected = selected.where(Car.id.in_(bulk.ids))
+        before = {row.id: rollup_entry(row) for row in db.execute(selected)}
+        # Only the locked rows: a car that starts matching the filters meanwhile has no old values
+        statement = statement.where(Car.id.in_(list(before)))
+    statement = (
+        statement.values(**assignments)
+        .returning(Car.id, Car.brand, Car.model, Car.series, Car.year, Car.location_status, Car.price)
+        .execution_options(synchronize_session=False)
+    )
+    touched = db.execute(statement).all()
+    if touched:
+        if before:
+            apply_rollup_delta(db, [before[row.id] for row in touched], [rollup_entry(row) for row in touched])
+        touch_catalog(db)
+    db.commit()
+
+    for row in touched:
+        publish_car_change(row.id, row)
+    return {"updated": len(touched), "ids": sorted(row.id for row in touched)}
+
+@crud_router.put("/cars/{car_id}", response_model=CarResponse)
+def update_car(car_id: int, car: CarCreate, db: Session = Depends(get_db)):
+    db_car = db.query(Car).filter(Car.id == car_id).with_for_update().first()
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
     
+    before = rollup_entry(db_car)
+    apply_car_update(db_car, car)
+    flush_car_write(db)
+    apply_rollup_delta(db, [before], [rollup_entry(car)])
+    touch_catalog(db)
+    commit_or_conflict(db)
+    db.refresh(db_car)
+    publish_car_change(db_car.id, db_car)
+    return db_car
+
+@crud_router.patch("/cars/{car_id}", response_model=CarResponse)
+def patch_car(car_id: int, patch: CarPatch, db: Session = Depends(get_db)):
+    # Read under the same version guard as the UPDATE, so these are the values it replaces. Kept
+    # deliberately: SQLite's RETURNING only sees the new row, so a patch that can move the car
+    # between rollups pays this one locked read; every other patch is still the single UPDATE
+    before = None
+    if patch_changes_rollups(patch):
+        before = db.execute(rollup_entries_statement(Car.id == car_id, Car.version == patch.version)).first()
+    try:
+        db_car = db.scalars(car_patch_statement(car_id, patch)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_DEALER_REF)
+    if db_car is None:
+        db.rollback()
+        raise car_patch_failed(db.scalar(car_version_statement(car_id)))
+    
+    # Serialized before the commit expires the returned row
+    response = CarResponse.model_validate(db_car)
+    if before is not None:
+        apply_rollup_delta(db, [rollup_entry(before)], [rollup_entry(db_car)])
+    touch_catalog(db)
+    db.commit()
+    publish_car_change(car_id, response)
+    return response
+
+# Photo uploads are streamed to storage chunk by chunk; GCS needs chunks in multiples of 256 KiB
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))
+PHOTO_CHUNK_SIZE = int(os.getenv("PHOTO_CHUNK_SIZE", str(1024 * 1024)))
+
+def photo_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Photo exceeds the {PHOTO_MAX_BYTES} byte limit")
+
+async def storage_call(operation: str, func, *args):
+    # The blocking storage calls run in the threadpool so the event loop keeps serving requests
+    with storage_timer(operation):
+        return await run_in_threadpool(func, *args)
+
+async def stream_to_storage(file: UploadFile, key: str) -> str:
+    writer = await storage_call("stream_open", photo_storage.stream_put, key, file.content_type, PHOTO_CHUNK_SIZE)
+    try:
+        size = 0
+        while chunk := await file.read(PHOTO_CHUNK_SIZE):
+            size += len(chunk)
+            if size > PHOTO_MAX_BYTES:
+                raise photo_too_large()
+            await storage_call("stream_write", writer.write, chunk)
+        return await storage_call("stream_commit", writer.commit)
+    except BaseException:
+        # Too large, a failed read, write or commit, or a cancelled request: discard the partial upload
+        await storage_call("stream_abort", writer.abort)
+        raise
+
+async def store_derivatives(file: UploadFile, photo_key: str) -> Dict[str, str]:
+    # Read back the spooled upload (bounded by PHOTO_MAX_BYTES) for the encoder processes
+    await file.seek(0)
+    try:
+        derivatives = await render_in_pool(await file.read())
+    except InvalidImage:
+        # Pillow cannot decode it; clients fall back to the original
+        return {}
+    extension = "jpg" if PHOTO_FORMAT == "jpeg" else PHOTO_FORMAT
+    content_type = PHOTO_FORMATS[PHOTO_FORMAT][1]
+    names = list(derivatives)
+    urls = await asyncio.gather(*(
+        storage_call("put", photo_storage.put, f"{photo_key}_{name}.{extension}", derivatives[name], content_type)
+        for name in names
+    ))
+    return dict(zip(names, urls))
+
+# Changes the car's ETag; the UPDATE also locks the row, serializing writers to one car's photos
+def touch_car(db: Session, car_id: int):
+    db.execute(update(Car).where(Car.id == car_id).values(updated_at=datetime.utcnow())
+               .execution_options(synchronize_session=False))
+
+def add_car_photos(db: Session, db_car: Car, uploaded: List[tuple]) -> List[int]:
+    # Inserts only the new rows; positions continue after the car's last photo
+    car_id = db_car.id
+    touch_car(db, car_id)
+    start = db.scalar(select(func.coalesce(func.max(CarPhoto.position) + 1, 0)).where(CarPhoto.car_id == car_id))
+    now = datetime.utcnow()
+    # One executemany plus one SELECT for the ids, however many photos; the row lock from
+    # touch_car keeps other writers out of the positions read back
+    db.execute(insert(CarPhoto), [
+        {"car_id": car_id, "position": start + offset, "key": photo_key_from_url(photo_url), "url": photo_url,
+         "sizes": sizes, "created_at": now}
+        for offset, (photo_url, sizes) in enumerate(uploaded)
+    ])
+    photo_ids = db.scalars(
+        select(CarPhoto.id).where(CarPhoto.car_id == car_id, CarPhoto.position >= start).order_by(CarPhoto.position)
+    ).all()
+    touch_catalog(db)
+    db.commit()
+    publish_car_change(car_id, db_car)
+    return photo_ids
+
+def validate_photo(file: UploadFile):
     # Validate file type
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
+    # Reject early when the spooled size is already over the limit
+    if file.size is not None and file.size > PHOTO_MAX_BYTES:
+        raise photo_too_large()
+
+async def store_photo(file: UploadFile, car_id: int):
+    validate_photo(file)
     
-    # Generate unique filename
+    # Generate unique filename; derivatives share its key
     import uuid
     file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-    unique_filename = f"car_{car_id}_{uuid.uuid4()}.{file_extension}"
+    photo_key = f"car_{car_id}_{uuid.uuid4()}"
+    unique_filename = f"{photo_key}.{file_extension}"
+    
+    # Stream to photo storage; returns the public URL
+    photo_url = await stream_to_storage(file, unique_filename)
+    sizes = await store_derivatives(file, photo_key)
+    return photo_url, sizes
+
+@app.post("/cars/{car_id}/photos")
+async def upload_car_photo(car_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Check if car exists; its photos are not needed
+    db_car = await run_in_threadpool(db.get, Car, car_id, options=[lazyload(Car.photo_rows)])
+    if db_car is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+    validate_photo(file)
     
     try:
-        # Upload to Cloud Storage
-        blob = bucket.blob(unique_filename)
-        contents = await file.read()
-        blob.upload_from_string(contents, content_type=file.content_type)
-        blob.make_public()
-        
-        # Get public URL
-        photo_url = blob.public_url
+        photo_url, sizes = await store_photo(file, car_id)
         
         # Update car photos in database
-        if db_car.photos is None:
-            db_car.photos = []
-        db_car.photos = db_car.photos + [photo_url]
-        
-        db.commit()
-        db.refresh(db_car)
+        [photo_id] = await run_in_threadpool(add_car_photos, db, db_car, [(photo_url, sizes)])
         
-        return {"message": "Photo uploaded successfully", "photo_url": photo_url}
+        return {"message": "Photo uploaded successfully", "photo_id": photo_id, "photo_url": photo_url, "sizes": sizes}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload photo: {str(e)}")
 
-@app.delete("/cars/{car_id}/photos/{photo_index}")
-def delete_car_photo(car_id: int, photo_index: int, db: Session = Depends(get_db)):
+# Many photos in one request: uploaded in parallel, appended in one commit
+PHOTO_BATCH_MAX_FILES = int(os.getenv("PHOTO_BATCH_MAX_FILES", "50"))
+PHOTO_UPLOAD_CONCURRENCY = int(os.getenv("PHOTO_UPLOAD_CONCURRENCY", "4"))
+
+@app.post("/cars/{car_id}/photos/batch")
+async def upload_car_photos(car_id: int, files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    db_car = await run_in_threadpool(db.get, Car, car_id, options=[lazyload(Car.photo_rows)])
+    if db_car is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+    if len(files) > PHOTO_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {PHOTO_BATCH_MAX_FILES} files per request")
+    
+    slots = asyncio.Semaphore(PHOTO_UPLOAD_CONCURRENCY)
+    
+    async def upload(index: int, file: UploadFile):
+        result = {"index": index, "filename": file.filename}
+        async with slots:
+            try:
+                photo_url, sizes = await store_photo(file, car_id)
+            except HTTPException as e:
+                return dict(result, status="error", errors=[{"msg": e.detail}])
+            except Exception as e:
+                return dict(result, status="error", errors=[{"msg": f"Failed to upload photo: {str(e)}"}])
+        return dict(result, status="uploaded", photo_url=photo_url, sizes=sizes)
+    
+    results = list(await asyncio.gather(*(upload(index, file) for index, file in enumerate(files))))
+    
+    # Request order, not completion order, decides the photos' positions
+    stored = [result for result in results if result["status"] == "uploaded"]
+    if stored:
+        uploaded = [(result["photo_url"], result["sizes"]) for result in stored]
+        photo_ids = await run_in_threadpool(add_car_photos, db, db_car, uploaded)
+        for result, photo_id in zip(stored, photo_ids):
+            result["photo_id"] = photo_id
+    return bulk_summary(results, "uploaded")
+
+@app.delete("/cars/{car_id}/photos/{photo_id}")
+def delete_car_photo(
+    car_id: int,
+    photo_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+):
     # Check if car exists
-    db_car = db.query(Car).filter(Car.id == car_id).first()
+    db_car = db.get(Car, car_id, options=[lazyload(Car.photo_rows)])
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
     
-    # Check if photo exists
-    if not db_car.photos or photo_index >= len(db_car.photos) or photo_index < 0:
+    # Check if photo exists and belongs to this car
+    photo = db.get(CarPhoto, photo_id)
+    if photo is None or photo.car_id != car_id:
         raise HTTPException(status_code=404, detail="Photo not found")
     
     try:
-        # Extract filename from URL and delete from Cloud Storage
-        photo_url = db_car.photos[photo_index]
-        filename = photo_url.split('/')[-1]
-        blob = bucket.blob(filename)
-        if blob.exists():
-            blob.delete()
-        
-        # Remove from database
-        photos_list = list(db_car.photos)
-        photos_list.pop(photo_index)
-        db_car.photos = photos_list
+        # Queue the original and its sizes for deletion from photo storage
+        queue_blob_deletions(db, car_photo_keys([photo]))
         
+        # Remove from database; the other photos keep their positions
+        db.delete(photo)
+        touch_car(db, car_id)
+        touch_catalog(db)
         db.commit()
+        publish_car_change(car_id, db_car)
+        kick_blob_cleanup(background_tasks, session_factory)
         
         return {"message": "Photo deleted successfully"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete photo: {str(e)}")
 
-@app.delete("/cars/{car_id}")
-def delete_car(car_id: int, db: Session = Depends(get_db)):
-    db_car = db.query(Car).filter(Car.id == car_id).first()
+@crud_router.delete("/cars/{car_id}")
+def delete_car(
+    car_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+):
+    db_car = db.query(Car).filter(Car.id == car_id).with_for_update().first()
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
     
-    db.delete(db_car)
+    removed, keys = rollup_entry(db_car), car_photo_keys(db_car.photo_rows)
+    db.execute(delete(CarPhoto).where(CarPhoto.car_id == car_id))
+    # Deleted by statement so the row count tells whether this request is the one removing the car
+    if not db.execute(delete(Car).where(Car.id == car_id)).rowcount:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Car not found")
+    queue_blob_deletions(db, keys)
+    apply_rollup_delta(db, removed=[removed])
+    touch_catalog(db)
     db.commit()
+    publish_car_change(car_id)
+    kick_blob_cleanup(background_tasks, session_factory)
     return {"message": "Car deleted successfully"}
 
+# Dealer feed imports
+IMPORT_DIR = os.getenv("IMPORT_DIR", os.path.join(tempfile.gettempdir(), "car-finder-imports"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_FORMATS = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}
+# A running job whose checkpoint has not moved for this long lost its worker and counts as interrupted
+IMPORT_STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", "300"))
+
+class ImportJobResponse(BaseModel):
+    id: int
+    filename: str
+    format: str
+    status: str
+    rows_processed: int
+    rows_created: int
+    rows_updated: int
+    rows_failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ImportRowErrorResponse(BaseModel):
+    row_number: int
+    errors: list
+
+    class Config:
+        from_attributes = True
+
+def get_import_job(db: Session, job_id: int) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+# Moves a job to `status` only from one of `from_statuses` or from an interrupted run,
+# so the same job never runs twice at once
+def import_claim_statement(job_id: int, from_statuses, status: str):
+    stale = datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS)
+    return (
+        update(ImportJob)
+        .where(ImportJob.id == job_id)
+        .where(or_(ImportJob.status.in_(from_statuses),
+                   and_(ImportJob.status == "running", ImportJob.updated_at < stale)))
+        .values(status=status, error=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+# Uploads are spooled into IMPORT_DIR; a CLI job points at the caller's own file
+def is_spooled_feed(path: str) -> bool:
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(IMPORT_DIR)
+
+@app.post("/imports", response_model=ImportJobResponse, status_code=202)
+async def create_import(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    feed_format: Optional[str] = Query(None, alias="format", pattern="^(csv|jsonl|ndjson)$"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+):
+    import uuid
+    from importer import run_import
+
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    resolved_format = IMPORT_FORMATS.get(feed_format or extension)
+    if resolved_format is None:
+        raise HTTPException(status_code=400, detail="Feed must be .csv or .jsonl, or pass format=")
+
+    # Spool the upload to disk in pieces; the importer re-reads it as a stream
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_DIR, f"{uuid.uuid4()}.{resolved_format}")
+    try:
+        with open(path, "wb") as target:
+            while chunk := await file.read(1024 * 1024):
+                await run_in_threadpool(target.write, chunk)
+    except BaseException:
+        # open() itself may be what failed, leaving nothing to remove
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        raise
+
+    job = ImportJob(filename=file.filename, path=path, format=resolved_format)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    background_tasks.add_task(run_import, session_factory, job.id, chunk_size, spooled=True)
+    return job
+
+@app.get("/imports/{job_id}", response_model=ImportJobResponse)
+def get_import(job_id: int, db: Session = Depends(get_db)):
+    return get_import_job(db, job_id)
+
+@app.get("/imports/{job_id}/errors", response_model=List[ImportRowErrorResponse])
+def get_import_errors(
+    job_id: int,
+    after_row: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    get_import_job(db, job_id)
+    return (
+        db.query(ImportRowError)
+        .filter(ImportRowError.job_id == job_id, ImportRowError.row_number > after_row)
+        .order_by(ImportRowError.row_number)
+        .limit(limit)
+        .all()
+    )
+
+@app.post("/imports/{job_id}/resume", response_model=ImportJobResponse, status_code=202)
+def resume_import(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+):
+    from importer import run_import
+
+    job = get_import_job(db, job_id)
+    # Conditional, so a repeated request or a job that is still running is refused instead of run twice
+    if not db.execute(import_claim_statement(job_id, ("failed",), "pending")).rowcount:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Import job is {job.status}; only failed or interrupted jobs resume")
+    db.commit()
+    db.refresh(job)
+    background_tasks.add_task(run_import, session_factory, job.id, chunk_size, spooled=is_spooled_feed(job.path))
+    return job
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Import string, so the app is built exactly as under "uvicorn main:app"
+    uvicorn.run("main:app", host="0.0.0.0", port=8000)
+elif ASYNC_DB:
+    from async_api import router as async_crud_router
+    app.include_router(async_crud_router)
+else:
+    app.include_router(crud_router)
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""Prometheus metrics for the API, served as text by ``GET /metrics``.
+
+Request counters and latency histograms are labelled by route template
+(``/cars/{car_id}``, never the raw path) so the number of series stays
+bounded; requests that match no route share ``route="unmatched"``. Every
+request also records how many queries it ran and how long they took (from
+the listeners in ``query_stats``), and storage calls made by the photo
+endpoints are timed by operation.
+
+The exposition format is written here rather than pulling in
+``prometheus_client``: the handful of metric types below is all the API
+needs, and each observation is one lock and a dict update.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from db_pool import WAIT_BUCKETS
+from query_stats import QueryStats, current_request, report_repeated_statements
+
+# Starlette appends "; charset=utf-8" to text types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upper bounds in seconds; requests and storage calls share them
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+    def lines(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return self.header() + "".join(line + "\n" for line in self.lines())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # {labels: [count per bucket (last is +Inf), sum]}
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def total(self, labels: tuple = ()) -> float:
+        state = self._values.get(labels)
+        return state[1] if state else 0.0
+
+    def lines(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            yield from histogram_lines(self.name, self.labelnames, labels, self.buckets, counts, total)
+
+
+def histogram_lines(name, labelnames, labels, buckets, counts, total):
+    """Cumulative ``_bucket`` lines plus ``_sum`` and ``_count`` from per-bucket counts."""
+    cumulative = 0
+    for bound, count in zip(buckets + (float("inf"),), counts):
+        cumulative += count
+        bucket_labels = format_labels(labelnames + ("le",), labels + (format_value(bound),))
+        yield f"{name}_bucket{bucket_labels} {cumulative}"
+    yield f"{name}_sum{format_labels(labelnames, labels)} {format_value(total)}"
+    yield f"{name}_count{format_labels(labelnames, labels)} {cumulative}"
+
+
+REQUESTS = Counter("http_requests_total", "Requests handled, by route and status.",
+                   ("method", "route", "status"))
+REQUEST_DURATION = Histogram("http_request_duration_seconds",
+                             "Time from request start to the last response byte.", ("method", "route"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.")
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Database queries run per request.",
+                            ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_QUERY_DURATION = Histogram("http_request_db_duration_seconds",
+                                   "Time per request spent executing database queries.", ("method", "route"))
+STORAGE_DURATION = Histogram("storage_operation_duration_seconds", "Photo storage call latency, by operation.",
+                             ("operation",))
+STORAGE_ERRORS = Counter("storage_operation_errors_total", "Photo storage calls that raised, by operation.",
+                         ("operation",))
+
+METRICS = (REQUESTS, REQUEST_DURATION, IN_FLIGHT, REQUEST_QUERIES, REQUEST_QUERY_DURATION,
+           STORAGE_DURATION, STORAGE_ERRORS)
+
+
+@contextmanager
+def storage_timer(operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STORAGE_ERRORS.inc((operation,))
+        raise
+    finally:
+        STORAGE_DURATION.observe((operation,), time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; unlike ``BaseHTTPMiddleware`` it adds no task or stream per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = QueryStats()
+        token = current_request.set(stats)
+        status = 500
+        recorded = False
+        IN_FLIGHT.inc()
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            IN_FLIGHT.dec()
+            # The router adds the matched route to the scope; FastAPI keeps the path template on it
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", None) or UNMATCHED_ROUTE)
+            REQUESTS.inc(labels + (str(status),))
+            REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+            REQUEST_QUERIES.observe(labels, stats.queries)
+            REQUEST_QUERY_DURATION.observe(labels, stats.query_seconds)
+            report_repeated_statements(stats, " ".join(labels))
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            # Background tasks run after the last body chunk; they are not the client's latency
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not recorded:
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_request.reset(token)
+            if not recorded:
+                record()
+
+
+def pool_lines(engines: Dict[str, object]) -> Iterable[str]:
+    """The ``db_pool`` counters of each instrumented engine, labelled by engine name."""
+    from db_pool import pool_stats
+
+    snapshots = pool_stats(engines)
+    gauges = [
+        ("db_pool_size", "size", "Connections the pool keeps open."),
+        ("db_pool_checked_out", "checked_out", "Connections currently lent to requests."),
+        ("db_pool_idle", "idle", "Open connections waiting in the pool."),
+        ("db_pool_overflow", "overflow", "Connections open beyond the pool size."),
+        ("db_pool_checked_out_peak", "peak_checked_out", "Most connections lent at once since start-up."),
+    ]
+    counters = [
+        ("db_pool_overflow_connections_total", "overflow_connections", "Connections opened beyond the pool size."),
+        ("db_pool_timeouts_total", "timeouts", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+        ("db_pool_invalidations_total", "invalidations", "Connections discarded as broken."),
+    ]
+    for metric, key, documentation, kind in [g + ("gauge",) for g in gauges] + [c + ("counter",) for c in counters]:
+        samples = [(name, snapshot[key]) for name, snapshot in snapshots.items() if key in snapshot]
+        if samples:
+            yield f"# HELP {metric} {documentation}"
+            yield f"# TYPE {metric} {kind}"
+            for name, value in samples:
+                yield f"{metric}{format_labels(('engine',), (name,))} {format_value(value)}"
+    if snapshots:
+        name = "db_pool_checkout_wait_seconds"
+        yield f"# HELP {name} Time spent waiting for a pooled connection."
+        yield f"# TYPE {name} histogram"
+        for engine_name, snapshot in snapshots.items():
+            counts = list(snapshot["wait_buckets"].values())
+            yield from histogram_lines(name, ("engine",), (engine_name,), WAIT_BUCKETS, counts,
+                                       snapshot["wait_seconds_total"])
+
+
+def render(engines: Optional[Dict[str, object]] = None) -> str:
+    """Every metric in the Prometheus text exposition format."""
+    text = "".join(metric.render() for metric in METRICS)
+    if engines:
+        text += "".join(line + "\n" for line in pool_lines(engines))
+    return text
@@ -0,0 +1,188 @@
+"""SQL statement instrumentation: per-request counts, fingerprints and slow queries.
+
+Cursor listeners on every ``Engine`` (the API's sync engine, the async
+engine's ``sync_engine`` and any engine a test or script creates) time each
+statement and add it to the :class:`QueryStats` of the request being handled,
+which ``metrics.MetricsMiddleware`` sets per request. At the end of a request
+one fingerprint repeated ``SQL_REPEATED_QUERY_WARN`` times is reported as a
+likely N+1 (the batches of an executemany repeat by design and are left out); any statement slower than ``SQL_SLOW_QUERY_MS`` is reported as it
+finishes, with its plan when ``SQL_EXPLAIN_SLOW`` is set.
+
+A fingerprint is the statement with literals and bound parameters replaced by
+``?`` and ``IN``/``VALUES`` lists collapsed, so ``WHERE id IN (1, 2)`` and
+``WHERE id IN (3, 4, 5)`` count as the same query.
+"""
+import os
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "500"))  # 0 turns the slow query log off
+SQL_EXPLAIN_SLOW = os.getenv("SQL_EXPLAIN_SLOW", "").lower() in ("1", "true", "yes")
+SQL_REPEATED_QUERY_WARN = int(os.getenv("SQL_REPEATED_QUERY_WARN", "20"))  # 0 turns the N+1 warning off
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# pyformat, format, numeric ($1) and named (:name, but not ::casts) placeholders
+PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+PLACEHOLDER_TUPLE = r"\( ?\?(?: ?, ?\?)* ?\)"
+ROW_LIST = re.compile(rf"({PLACEHOLDER_TUPLE})(?: ?, ?{PLACEHOLDER_TUPLE})+")
+PLACEHOLDER_LIST = re.compile(r"\( ?\?(?: ?, ?\?)+ ?\)")
+WHITESPACE = re.compile(r"\s+")
+
+# Statements come from SQLAlchemy's compiled cache, so few distinct strings recur
+FINGERPRINT_CACHE_SIZE = 2000
+fingerprint_cache: Dict[str, str] = {}
+
+
+def fingerprint(statement: str) -> str:
+    """``statement`` normalized so that runs differing only in values compare equal."""
+    cached = fingerprint_cache.get(statement)
+    if cached is not None:
+        return cached
+    normalized = WHITESPACE.sub(" ", statement).strip()
+    normalized = STRING_LITERAL.sub("?", normalized)
+    normalized = PLACEHOLDER.sub("?", normalized)
+    normalized = NUMBER_LITERAL.sub("?", normalized)
+    normalized = ROW_LIST.sub(r"\1, ...", normalized)
+    normalized = PLACEHOLDER_LIST.sub("(?, ...)", normalized)
+    if len(fingerprint_cache) >= FINGERPRINT_CACHE_SIZE:
+        fingerprint_cache.clear()
+    fingerprint_cache[statement] = normalized
+    return normalized
+
+
+class QueryStats:
+    """Statements run on behalf of one request; see :data:`current_request`."""
+
+    __slots__ = ("queries", "query_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        # Raw statement -> [count, seconds]; fingerprinted only when read
+        self.statements: Dict[str, list] = {}
+
+    def record(self, statement: str, seconds: float, executemany: bool = False):
+        self.queries += 1
+        self.query_seconds += seconds
+        # One statement over many rows (insertmanyvalues pages included), not a query per row
+        if executemany:
+            return
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def by_fingerprint(self) -> List[Tuple[str, int, float]]:
+        """``(fingerprint, count, seconds)``, most frequent first."""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for statement, (count, seconds) in self.statements.items():
+            entry = grouped[fingerprint(statement)]
+            entry[0] += count
+            entry[1] += seconds
+        return sorted(((fp, count, seconds) for fp, (count, seconds) in grouped.items()), key=lambda row: -row[1])
+
+
+# Set per request by the metrics middleware; copied into the threadpool and SQLAlchemy's greenlets
+current_request: ContextVar[Optional[QueryStats]] = ContextVar("current_request", default=None)
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """Plan of ``statement``; neither form of EXPLAIN executes it."""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # A raw DBAPI cursor, so the EXPLAIN itself does not pass through these listeners
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def report_slow_query(conn, statement: str, parameters, executemany: bool, seconds: float):
+    print(f"⚠️ Slow query ({seconds * 1000:.0f} ms): {fingerprint(statement)}")
+    # Only reads: on PostgreSQL a failing EXPLAIN would abort the caller's transaction
+    if SQL_EXPLAIN_SLOW and not executemany and statement.lstrip()[:6].upper() in ("SELECT", "WITH "):
+        try:
+            for line in explain(conn, statement, parameters):
+                print(f"    {line}")
+        except Exception as e:
+            print(f"    EXPLAIN failed: {e}")
+
+
+def report_repeated_statements(stats: QueryStats, label: str):
+    """Warn when one fingerprint ran often enough in a request to suggest an N+1."""
+    if not SQL_REPEATED_QUERY_WARN:
+        return
+    for statement, count, seconds in stats.by_fingerprint():
+        if count < SQL_REPEATED_QUERY_WARN:
+            break
+        print(f"⚠️ {label} ran the same query {count} times ({seconds * 1000:.0f} ms), possible N+1: {statement}")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats = current_request.get()
+    if stats is not None:
+        stats.record(statement, seconds, executemany)
+    if SQL_SLOW_QUERY_MS and seconds * 1000 >= SQL_SLOW_QUERY_MS:
+        report_slow_query(conn, statement, parameters, executemany, seconds)
+
+
+def watch_queries():
+    """Time every statement on every engine, sync or async."""
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+
+class CapturedQueries(list):
+    """Statements executed inside :func:`capture_queries`, in order."""
+
+    def __init__(self):
+        super().__init__()
+        # Positions of executemany batches, which repeat by design
+        self.executemany = set()
+
+    def report(self) -> str:
+        counts = defaultdict(int)
+        for index, statement in enumerate(self):
+            counts[fingerprint(statement) + (" [executemany]" if index in self.executemany else "")] += 1
+        return "\n".join(f"{count:>4} x {statement}" for statement, count in
+                         sorted(counts.items(), key=lambda item: -item[1]))
+
+
+@contextmanager
+def capture_queries(*engines):
+    """Collect every statement the ``engines`` execute inside the block."""
+    captured = CapturedQueries()
+    engines = list(dict.fromkeys(engines))
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            captured.executemany.add(len(captured))
+        captured.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "after_cursor_execute", capture)
+    try:
+        yield captured
+    finally:
+        for engine in engines:
+            event.remove(engine, "after_cursor_execute", capture)
@@ -0,0 +1,159 @@
+"""In-process trigram index for fuzzy search over car brand/model/series."""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Letters NFKD does not decompose into an ASCII base
+TRANSLITERATE = str.maketrans({"ł": "l", "ß": "ss", "ø": "o", "æ": "ae"})
+
+MIN_SIMILARITY = 0.3
+PREFIX_SCORE = 0.9
+MIN_PREFIX_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip diacritics and collapse punctuation to spaces."""
+    text = unicodedata.normalize("NFKD", text.lower().translate(TRANSLITERATE))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(normalize(text)) if text else []
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CarSearchIndex:
+    """Trigram index over the distinct brand/model/series texts in the catalog.
+
+    Many listings share the same text ("BMW X5 Sport"), so scoring runs over
+    distinct texts and only the winners are expanded into car ids. Each text
+    keeps its car ids sorted, so expanding a winner reads only the newest
+    ``limit`` ids. Lookups therefore depend on the size of the vocabulary,
+    not on the number of cars.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop everything; the next search reloads from the loader."""
+        with self._lock:
+            self.loaded = False
+            self._car_text: Dict[int, Tuple[str, ...]] = {}
+            self._text_cars: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+            self._token_texts: Dict[str, Set[Tuple[str, ...]]] = defaultdict(set)
+            self._trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[tuple]]):
+        """Build the index once from (id, brand, model, series) rows."""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            for car_id, brand, model, series in loader():
+                self._add(car_id, brand, model, series)
+            self.loaded = True
+
+    def add(self, car_id: int, brand: str, model: str, series: Optional[str]):
+        """Index a new car or re-index an updated one."""
+        with self._lock:
+            if self.loaded:
+                self._remove(car_id)
+                self._add(car_id, brand, model, series)
+
+    def remove(self, car_id: int):
+        with self._lock:
+            if self.loaded:
+                self._remove(car_id)
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Return up to ``limit`` (car_id, score) pairs, best match first."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            # Best similarity of each query token against every matching text
+            scores: Dict[Tuple[str, ...], float] = defaultdict(float)
+            for query_token in dict.fromkeys(query_tokens):
+                best: Dict[Tuple[str, ...], float] = {}
+                for token, similarity in self._similar_tokens(query_token):
+                    for text in self._token_texts[token]:
+                        if similarity > best.get(text, 0.0):
+                            best[text] = similarity
+                for text, similarity in best.items():
+                    scores[text] += similarity
+
+            # Every text has at least one car, so the best ``limit`` texts fill the page
+            results: List[Tuple[int, float]] = []
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            for text, score in ranked:
+                # Newest listings first within equally scored texts
+                cars = self._text_cars[text]
+                for car_id in reversed(cars[-(limit - len(results)):]):
+                    results.append((car_id, round(score / len(query_tokens), 4)))
+                    if len(results) >= limit:
+                        return results
+            return results
+
+    def _similar_tokens(self, query_token: str) -> List[Tuple[str, float]]:
+        query_trigrams = trigrams(query_token)
+        shared: Dict[str, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for token in self._trigram_tokens.get(trigram, ()):
+                shared[token] += 1
+
+        matches = []
+        for token, count in shared.items():
+            similarity = count / (len(query_trigrams) + len(trigrams(token)) - count)
+            if token != query_token and len(query_token) >= MIN_PREFIX_LENGTH and token.startswith(query_token):
+                similarity = max(similarity, PREFIX_SCORE)
+            if similarity >= MIN_SIMILARITY:
+                matches.append((token, similarity))
+        return matches
+
+    def _add(self, car_id, brand, model, series):
+        text = tuple(tokenize(brand) + tokenize(model) + tokenize(series))
+        self._car_text[car_id] = text
+        cars = self._text_cars[text]
+        if not cars:
+            for token in set(text):
+                self._token_texts[token].add(text)
+                for trigram in trigrams(token):
+                    self._trigram_tokens[trigram].add(token)
+        # New cars have the highest ids, so this is nearly always an append
+        if not cars or car_id > cars[-1]:
+            cars.append(car_id)
+        else:
+            bisect.insort(cars, car_id)
+
+    def _remove(self, car_id):
+        text = self._car_text.pop(car_id, None)
+        if text is None:
+            return
+        cars = self._text_cars[text]
+        position = bisect.bisect_left(cars, car_id)
+        if position < len(cars) and cars[position] == car_id:
+            del cars[position]
+        if cars:
+            return
+        del self._text_cars[text]
+        for token in set(text):
+            texts = self._token_texts[token]
+            texts.discard(text)
+            if not texts:
+                del self._token_texts[token]
+                for trigram in trigrams(token):
+                    self._trigram_tokens[trigram].discard(token)
@@ -0,0 +1,239 @@
+"""Pluggable blob storage for car photos.
+
+``STORAGE_BACKEND`` picks the implementation: ``gcs`` (Google Cloud Storage,
+objects made public) or ``local`` (files under a directory, served by the
+API itself). Keys are flat object names such as ``car_12_<uuid>.jpg``.
+Every method blocks; async callers run them in the threadpool.
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class StorageWriter:
+    """Incremental upload returned by :meth:`StorageBackend.stream_put`.
+
+    Nothing is visible under the key until :meth:`commit`; :meth:`abort`
+    discards what was written so far.
+    """
+
+    def write(self, chunk: bytes):
+        raise NotImplementedError
+
+    def commit(self) -> str:
+        """Finish the upload and return the object's public URL."""
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+
+class StorageBackend:
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        """Store ``data`` under ``key`` and return its public URL."""
+        raise NotImplementedError
+
+    def stream_put(self, key: str, content_type: str, chunk_size: int) -> StorageWriter:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove ``key``; deleting a missing key is not an error."""
+        raise NotImplementedError
+
+    def delete_many(self, keys: List[str]) -> Dict[str, str]:
+        """Remove several keys; returns ``{key: error}`` for those that failed."""
+        errors = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as e:
+                errors[key] = str(e) or type(e).__name__
+        return errors
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, Optional[datetime]]]:
+        """Yield ``(key, last_modified)`` for every object under ``prefix`` (naive UTC)."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+
+class GCSWriter(StorageWriter):
+    def __init__(self, blob, writer):
+        self.blob = blob
+        self.writer = writer
+
+    def write(self, chunk: bytes):
+        self.writer.write(chunk)
+
+    def commit(self) -> str:
+        self.writer.close()
+        self.blob.make_public()
+        return self.blob.public_url
+
+    def abort(self):
+        # A resumable upload that is never closed does not create the object
+        pass
+
+
+class GCSStorage(StorageBackend):
+    def __init__(self, bucket_name: str, bucket=None):
+        if bucket is None:
+            from google.cloud import storage
+
+            bucket = storage.Client().bucket(bucket_name)
+        self.bucket_name = bucket_name
+        self.bucket = bucket
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        blob = self.bucket.blob(key)
+        blob.upload_from_string(data, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+    def stream_put(self, key: str, content_type: str, chunk_size: int) -> StorageWriter:
+        blob = self.bucket.blob(key)
+        return GCSWriter(blob, blob.open("wb", chunk_size=chunk_size, content_type=content_type))
+
+    def delete(self, key: str):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.bucket.blob(key).delete()
+        except NotFound:
+            pass
+
+    def delete_many(self, keys: List[str]) -> Dict[str, str]:
+        # One HTTP round trip for up to 100 deletes (the GCS batch limit)
+        try:
+            with self.bucket.client.batch():
+                for key in keys:
+                    self.bucket.delete_blob(key)
+            return {}
+        except Exception:
+            # Any failed call (a 404 included) fails the whole batch; redo it key by key
+            return super().delete_many(keys)
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, Optional[datetime]]]:
+        for blob in self.bucket.list_blobs(prefix=prefix):
+            updated = blob.updated.astimezone(timezone.utc).replace(tzinfo=None) if blob.updated else None
+            yield blob.name, updated
+
+    def exists(self, key: str) -> bool:
+        return self.bucket.blob(key).exists()
+
+    def url(self, key: str) -> str:
+        return self.bucket.blob(key).public_url
+
+
+class LocalWriter(StorageWriter):
+    def __init__(self, storage: "LocalStorage", key: str):
+        self.path = storage.path(key)
+        self.url = storage.url(key)
+        self.file = tempfile.NamedTemporaryFile(dir=storage.root, prefix=".upload-", delete=False)
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self) -> str:
+        self.file.close()
+        # Atomic within one filesystem, so readers never see a partial photo
+        os.replace(self.file.name, self.path)
+        return self.url
+
+    def abort(self):
+        self.file.close()
+        os.unlink(self.file.name)
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        if not key or key.startswith(".") or "/" in key or "\\" in key:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        writer = self.stream_put(key, content_type, len(data))
+        writer.write(data)
+        return writer.commit()
+
+    def stream_put(self, key: str, content_type: str, chunk_size: int) -> StorageWriter:
+        return LocalWriter(self, key)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def list_keys(self, prefix: str) -> Iterator[Tuple[str, Optional[datetime]]]:
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                # Dotfiles are uploads still being written
+                if entry.name.startswith(prefix) and not entry.name.startswith(".") and entry.is_file():
+                    yield entry.name, datetime.utcfromtimestamp(entry.stat().st_mtime)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class LazyStorage:
+    """Proxy that builds the real backend on first use.
+
+    Creating a GCS client runs credential discovery, which can take seconds
+    without a metadata server, so it must not happen at import. A failed
+    attempt is retried at most every ``retry_after`` seconds.
+    """
+
+    def __init__(self, factory, retry_after: float = 30.0):
+        self._factory = factory
+        self._retry_after = retry_after
+        self._backend: Optional[StorageBackend] = None
+        self._failed_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> StorageBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    if self._failed_at is not None and time.monotonic() - self._failed_at < self._retry_after:
+                        raise RuntimeError(f"Photo storage unavailable: {self.error}")
+                    try:
+                        self._backend = self._factory()
+                    except Exception as e:
+                        self._failed_at = time.monotonic()
+                        self.error = str(e)
+                        print(f"⚠️ Could not initialize photo storage: {e}")
+                        raise RuntimeError(f"Photo storage unavailable: {e}") from e
+                    print("✅ Photo storage initialized successfully")
+        return self._backend
+
+    @property
+    def initialized(self) -> bool:
+        return self._backend is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def create_storage_backend(name: str, bucket_name: str, local_dir: str, local_url: str) -> StorageBackend:
+    if name == "gcs":
+        return GCSStorage(bucket_name)
+    if name == "local":
+        return LocalStorage(local_dir, local_url)
+    raise ValueError(f"Unknown STORAGE_BACKEND {name!r}; expected 'gcs' or 'local'")
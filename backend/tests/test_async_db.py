@@ -0,0 +1,121 @@
+"""Tests for the async database mode (DB_ASYNC=1) CRUD handlers."""
+import asyncio
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import async_api
+from main import Base, crud_router, listing_cache, search_index
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    """Client for an app serving only the async CRUD router on a fresh file database."""
+    path = tmp_path / "async.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_api.router)
+    app.dependency_overrides[async_api.get_async_db] = override_get_async_db
+    search_index.reset()
+    listing_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+class TestAsyncDatabaseUrl:
+    """Test translation of the sync DATABASE_URL to an async driver."""
+
+    @pytest.mark.parametrize("url, expected", [
+        ("postgresql://user:pw@db:5432/cars", "postgresql+asyncpg://user:pw@db:5432/cars"),
+        ("postgresql+psycopg2://user:pw@db/cars", "postgresql+asyncpg://user:pw@db/cars"),
+        ("sqlite:///./cars.db", "sqlite+aiosqlite:///./cars.db"),
+        ("mysql://db/cars", "mysql://db/cars"),
+    ])
+    def test_driver_swap(self, url, expected):
+        """Test known dialects get their async driver and others pass through."""
+        assert async_api.async_database_url(url) == expected
+
+
+class TestAsyncCrud:
+    """Test the async handlers behave like their sync counterparts."""
+
+    def test_handlers_are_coroutines(self):
+        """Test every CRUD handler runs on the event loop rather than the threadpool."""
+        endpoints = [route.endpoint for route in async_api.router.routes]
+
+        assert len(endpoints) == len(crud_router.routes) == 6
+        assert all(asyncio.iscoroutinefunction(endpoint) for endpoint in endpoints)
+
+    def test_create_get_update_delete(self, async_client, sample_car_data):
+        """Test a full car lifecycle through the async handlers."""
+        created = async_client.post("/cars", json=sample_car_data)
+        assert created.status_code == status.HTTP_200_OK
+        car_id = created.json()["id"]
+        assert created.json()["mileage_miles"] == 9320
+
+        updated = async_client.put(f"/cars/{car_id}", json=dict(sample_car_data, price=1.0))
+        assert updated.json()["price"] == 1.0
+        assert async_client.get(f"/cars/{car_id}").json()["price"] == 1.0
+
+        assert async_client.delete(f"/cars/{car_id}").status_code == status.HTTP_200_OK
+        assert async_client.get(f"/cars/{car_id}").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_patch_with_version(self, async_client, sample_car_data):
+        """Test partial updates and version conflicts through the async handler."""
+        car = async_client.post("/cars", json=sample_car_data).json()
+
+        patched = async_client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 1.0})
+        stale = async_client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 2.0})
+
+        assert (patched.json()["price"], patched.json()["version"]) == (1.0, car["version"] + 1)
+        assert stale.status_code == status.HTTP_409_CONFLICT
+
+    def test_list_pagination_and_filters(self, async_client, sample_car_data):
+        """Test keyset pagination and filters on the async list handler."""
+        for price in (1.0, 2.0, 3.0):
+            async_client.post("/cars", json=dict(sample_car_data, price=price))
+
+        first = async_client.get("/cars", params={"sort": "price", "limit": 2})
+        second = async_client.get("/cars", params={"sort": "price", "limit": 2,
+                                                   "cursor": first.headers["X-Next-Cursor"]})
+
+        assert [car["price"] for car in first.json()] == [1.0, 2.0]
+        assert [car["price"] for car in second.json()] == [3.0]
+        assert "X-Next-Cursor" not in second.headers
+        assert len(async_client.get("/cars", params={"price_min": 2.5}).json()) == 1
+
+    def test_conditional_get(self, async_client, sample_car_data):
+        """Test ETag revalidation on a cold cache answers 304."""
+        car_id = async_client.post("/cars", json=sample_car_data).json()["id"]
+        etag = async_client.get(f"/cars/{car_id}").headers["ETag"]
+        list_etag = async_client.get("/cars").headers["ETag"]
+        listing_cache.clear()
+
+        assert async_client.get(f"/cars/{car_id}", headers={"If-None-Match": etag}).status_code == 304
+        assert async_client.get("/cars", headers={"If-None-Match": list_etag}).status_code == 304
+
+    def test_write_bumps_list_etag(self, async_client, sample_car_data):
+        """Test async writes advance the catalog version."""
+        etag = async_client.get("/cars").headers["ETag"]
+
+        async_client.post("/cars", json=sample_car_data)
+
+        assert async_client.get("/cars").headers["ETag"] != etag
+
+    def test_duplicate_dealer_ref_conflict(self, async_client, sample_car_data):
+        """Test the unique dealer reference maps to 409."""
+        async_client.post("/cars", json=dict(sample_car_data, dealer_ref="X"))
+
+        response = async_client.post("/cars", json=dict(sample_car_data, dealer_ref="X"))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
@@ -0,0 +1,163 @@
+"""Tests for background blob deletion - blob_cleanup.py and the delete endpoints."""
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+from factories import ToyotaCamryFactory, car_photos
+import blob_cleanup
+from main import BlobDeletion
+from storage_backends import GCSStorage, LocalStorage
+
+OLD = time.time() - 2 * 3600
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+
+def car_with_photos(test_db, storage, count=2):
+    car = ToyotaCamryFactory()
+    test_db.add(car)
+    test_db.commit()
+    keys = [f"car_{car.id}_{i}.jpg" for i in range(count)]
+    sizes = [{"thumbnail": storage.put(f"car_{car.id}_{i}_thumbnail.webp", b"t", "image/webp")} for i in range(count)]
+    car.photo_rows = car_photos(*[storage.put(key, b"photo", "image/jpeg") for key in keys], sizes=sizes)
+    test_db.commit()
+    return car
+
+
+class FlakyStorage(LocalStorage):
+    """Local storage whose deletes fail for keys in ``failing``."""
+
+    def __init__(self, root):
+        super().__init__(root, "/media")
+        self.failing = set()
+        self.batches = []
+
+    def delete_many(self, keys):
+        self.batches.append(list(keys))
+        return dict({key: "unavailable" for key in keys if key in self.failing}, **super().delete_many(
+            [key for key in keys if key not in self.failing]))
+
+
+class TestDeleteEndpoints:
+    """Test deletes queue their blobs and clean up after the response."""
+
+    def test_delete_car_removes_all_blobs(self, client, test_db, local_storage):
+        """Test deleting a car deletes every original and size, via the queue."""
+        car = car_with_photos(test_db, local_storage)
+
+        response = client.delete(f"/cars/{car.id}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(local_storage.list_keys("car_")) == []
+        assert test_db.query(BlobDeletion).count() == 0
+
+    def test_delete_is_queued_in_the_same_transaction(self, client, test_db, local_storage):
+        """Test keys are durably queued even when the after-response work never runs."""
+        car = car_with_photos(test_db, local_storage, count=1)
+
+        with patch("main.kick_blob_cleanup"):
+            response = client.delete(f"/cars/{car.id}/photos/{car.photo_ids[0]}")
+
+        assert response.status_code == status.HTTP_200_OK
+        queued = {row.key for row in test_db.query(BlobDeletion)}
+        assert queued == {f"car_{car.id}_0.jpg", f"car_{car.id}_0_thumbnail.webp"}
+        assert local_storage.exists(f"car_{car.id}_0.jpg")
+
+    def test_storage_failure_does_not_fail_delete(self, client, test_db, tmp_path):
+        """Test the request succeeds and the failure is kept for retry."""
+        storage = FlakyStorage(str(tmp_path))
+        car = car_with_photos(test_db, storage, count=1)
+        storage.failing = {f"car_{car.id}_0.jpg"}
+
+        with patch("main.photo_storage", storage):
+            response = client.delete(f"/cars/{car.id}")
+
+        assert response.status_code == status.HTTP_200_OK
+        row = test_db.query(BlobDeletion).one()
+        assert (row.key, row.attempts, row.last_error) == (f"car_{car.id}_0.jpg", 1, "unavailable")
+
+
+class TestProcessDeletions:
+    """Test batching, retries and backoff."""
+
+    def queue(self, test_db, *keys):
+        test_db.add_all([BlobDeletion(key=key) for key in keys])
+        test_db.commit()
+
+    def test_batches(self, test_db, session_factory, tmp_path):
+        """Test the queue is worked in batches of batch_size."""
+        storage = FlakyStorage(str(tmp_path))
+        self.queue(test_db, *[f"car_1_{i}.jpg" for i in range(5)])
+
+        result = blob_cleanup.process_deletions(session_factory, storage, batch_size=2)
+
+        assert result == {"deleted": 5, "failed": 0}
+        assert [len(batch) for batch in storage.batches] == [2, 2, 1]
+
+    def test_retry_with_backoff(self, test_db, session_factory, tmp_path):
+        """Test a failed key waits out its backoff, then succeeds."""
+        storage = FlakyStorage(str(tmp_path))
+        storage.failing = {"car_1_a.jpg"}
+        self.queue(test_db, "car_1_a.jpg", "car_1_b.jpg")
+        now = datetime.utcnow()
+
+        assert blob_cleanup.process_deletions(session_factory, storage, now=now) == {"deleted": 1, "failed": 1}
+        assert blob_cleanup.process_deletions(session_factory, storage, now=now) == {"deleted": 0, "failed": 0}
+
+        storage.failing = set()
+        later = now + timedelta(seconds=blob_cleanup.retry_delay(1))
+        assert blob_cleanup.process_deletions(session_factory, storage, now=later) == {"deleted": 1, "failed": 0}
+
+    def test_gives_up_after_max_attempts(self, test_db, session_factory, tmp_path):
+        """Test exhausted rows stay in the table but are no longer claimed."""
+        test_db.add(BlobDeletion(key="car_1_a.jpg", attempts=blob_cleanup.BLOB_DELETE_MAX_ATTEMPTS))
+        test_db.commit()
+
+        result = blob_cleanup.process_deletions(session_factory, FlakyStorage(str(tmp_path)))
+
+        assert result == {"deleted": 0, "failed": 0}
+        assert test_db.query(BlobDeletion).count() == 1
+
+    def test_backend_outage(self, test_db, session_factory):
+        """Test an exception from the backend marks the whole batch failed."""
+        storage = MagicMock()
+        storage.delete_many.side_effect = ConnectionError("down")
+        self.queue(test_db, "car_1_a.jpg", "car_1_b.jpg")
+
+        assert blob_cleanup.process_deletions(session_factory, storage) == {"deleted": 0, "failed": 2}
+
+    def test_gcs_batch_falls_back_per_key(self):
+        """Test a failed GCS batch is retried key by key to find the failures."""
+        bucket = MagicMock()
+        bucket.client.batch.return_value.__exit__.side_effect = RuntimeError("404 in batch")
+        bucket.blob.side_effect = lambda key: MagicMock(delete=MagicMock(
+            side_effect=PermissionError("denied") if key == "b" else None))
+
+        errors = GCSStorage("bucket", bucket=bucket).delete_many(["a", "b"])
+
+        assert errors == {"b": "denied"}
+
+
+class TestReconcile:
+    """Test orphaned car_{id}_* objects are found and queued."""
+
+    def test_queues_unreferenced_objects(self, test_db, session_factory, local_storage):
+        """Test only old, unreferenced photo objects are queued."""
+        car = car_with_photos(test_db, local_storage, count=1)
+        orphans = [f"car_{car.id}_stray.jpg", "car_999_gone.jpg"]
+        for key in orphans + ["notes.txt"]:
+            local_storage.put(key, b"x", "image/jpeg")
+        for key, _ in local_storage.list_keys(""):
+            os.utime(local_storage.path(key), (OLD, OLD))
+        local_storage.put(f"car_{car.id}_uploading.jpg", b"x", "image/jpeg")
+
+        assert blob_cleanup.reconcile_orphans(session_factory, local_storage) == 2
+
+        assert {row.key for row in test_db.query(BlobDeletion)} == set(orphans)
+        assert blob_cleanup.reconcile_orphans(session_factory, local_storage) == 0
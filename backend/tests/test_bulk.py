@@ -0,0 +1,169 @@
+"""Tests for bulk car writes - POST /cars/bulk, PUT /cars/bulk and POST /cars/bulk-update."""
+import pytest
+from fastapi import status
+from factories import CarFactory, ToyotaCamryFactory
+
+
+def car_payload(sample_car_data, **overrides):
+    return dict(sample_car_data, **overrides)
+
+
+class TestBulkCreate:
+    """Test bulk creation endpoint - POST /cars/bulk."""
+
+    def test_bulk_create_success(self, client, sample_car_data):
+        """Test every valid item is created with computed miles."""
+        items = [car_payload(sample_car_data, mileage_km=km) for km in (100, 1000, 50000)]
+
+        response = client.post("/cars/bulk", json=items)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["created"] == 3
+        assert data["failed"] == 0
+        assert [result["index"] for result in data["results"]] == [0, 1, 2]
+
+        cars = client.get("/cars", params={"sort": "mileage_km"}).json()
+        assert [car["mileage_miles"] for car in cars] == [62, 621, 31068]
+        assert all(car["photos"] == [] for car in cars)
+
+    def test_invalid_items_reported_per_index(self, client, sample_car_data):
+        """Test bad items are rejected individually while the rest are created."""
+        items = [
+            car_payload(sample_car_data),
+            {"brand": "Toyota"},
+            car_payload(sample_car_data, year="not a year"),
+            car_payload(sample_car_data, brand="BMW"),
+        ]
+
+        data = client.post("/cars/bulk", json=items).json()
+
+        assert data["created"] == 2
+        assert data["failed"] == 2
+        statuses = {result["index"]: result["status"] for result in data["results"]}
+        assert statuses == {0: "created", 1: "error", 2: "error", 3: "created"}
+        assert data["results"][2]["errors"][0]["loc"] == ["year"]
+
+    def test_chunk_size(self, client, sample_car_data):
+        """Test items spanning several chunks are all written."""
+        items = [car_payload(sample_car_data, price=float(i)) for i in range(7)]
+
+        data = client.post("/cars/bulk", params={"chunk_size": 3}, json=items).json()
+
+        assert data["created"] == 7
+        assert len({result["id"] for result in data["results"]}) == 7
+
+    def test_created_cars_are_searchable_and_listed(self, client, sample_car_data):
+        """Test bulk writes invalidate caches and feed the search index."""
+        assert client.get("/cars").json() == []
+        client.get("/cars/search", params={"q": "camry"})
+
+        client.post("/cars/bulk", json=[car_payload(sample_car_data)])
+
+        assert len(client.get("/cars").json()) == 1
+        assert len(client.get("/cars/search", params={"q": "camry"}).json()) == 1
+
+    def test_body_must_be_a_list(self, client, sample_car_data):
+        """Test a single object is not accepted as a batch."""
+        response = client.post("/cars/bulk", json=sample_car_data)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestBulkUpdate:
+    """Test bulk update endpoint - PUT /cars/bulk."""
+
+    def test_bulk_update_success(self, client, test_db, sample_car_data):
+        """Test full rows are replaced and miles recomputed."""
+        cars = [ToyotaCamryFactory() for _ in range(2)]
+        test_db.add_all(cars)
+        test_db.commit()
+        items = [car_payload(sample_car_data, id=car.id, mileage_km=1000, price=1.0) for car in cars]
+
+        data = client.put("/cars/bulk", json=items).json()
+
+        assert data["updated"] == 2
+        for car in cars:
+            updated = client.get(f"/cars/{car.id}").json()
+            assert updated["price"] == 1.0
+            assert updated["mileage_miles"] == 621
+
+    def test_missing_ids_reported(self, client, test_db, sample_car_data):
+        """Test unknown ids fail without affecting the rest."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        items = [car_payload(sample_car_data, id=99999), car_payload(sample_car_data, id=car.id)]
+
+        data = client.put("/cars/bulk", json=items).json()
+
+        assert data["updated"] == 1
+        assert data["results"][0] == {"index": 0, "status": "error", "errors": [{"msg": "Car not found"}]}
+        assert data["results"][1]["status"] == "updated"
+
+    def test_update_requires_id(self, client, sample_car_data):
+        """Test items without an id are validation errors."""
+        data = client.put("/cars/bulk", json=[sample_car_data]).json()
+
+        assert data["failed"] == 1
+        assert data["results"][0]["errors"][0]["loc"] == ["id"]
+
+
+class TestBulkSetUpdate:
+    """Test set-based field assignments - POST /cars/bulk-update."""
+
+    @pytest.fixture
+    def fleet(self, test_db):
+        cars = [CarFactory(location_status="w drodze", brand="BMW") for _ in range(3)] + \
+            [CarFactory(location_status="na miejscu", brand="BMW"), CarFactory(location_status="w drodze", brand="Audi")]
+        test_db.add_all(cars)
+        test_db.commit()
+        return cars
+
+    def test_update_by_filters(self, client, fleet):
+        """Test every car matching the list filters is updated, and only those."""
+        body = {"filters": {"brand": "BMW", "location_status": "w drodze"}, "set": {"location_status": "na miejscu"}}
+
+        data = client.post("/cars/bulk-update", json=body).json()
+
+        assert data == {"updated": 3, "ids": [car.id for car in fleet[:3]]}
+        statuses = {car["id"]: car["location_status"] for car in client.get("/cars").json()}
+        assert statuses[fleet[4].id] == "w drodze"
+        assert [statuses[car.id] for car in fleet[:4]] == ["na miejscu"] * 4
+
+    def test_update_by_ids(self, client, fleet):
+        """Test ids select the rows, combined with any filters."""
+        ids = [fleet[0].id, fleet[4].id, 99999]
+
+        data = client.post("/cars/bulk-update", json={"ids": ids, "set": {"car_status": "odpala", "mileage_km": 1000}}).json()
+
+        assert data == {"updated": 2, "ids": [fleet[0].id, fleet[4].id]}
+        car = client.get(f"/cars/{fleet[0].id}").json()
+        assert (car["car_status"], car["mileage_miles"], car["version"]) == ("odpala", 621, 2)
+
+    def test_invalidates_cached_reads(self, client, fleet):
+        """Test cached lists, cached cars and their ETags change for touched rows."""
+        car_etag = client.get(f"/cars/{fleet[0].id}").headers["ETag"]
+        list_etag = client.get("/cars").headers["ETag"]
+
+        client.post("/cars/bulk-update", json={"ids": [fleet[0].id], "set": {"price": 1.0}})
+
+        response = client.get(f"/cars/{fleet[0].id}", headers={"If-None-Match": car_etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["price"] == 1.0
+        assert client.get("/cars").headers["ETag"] != list_etag
+
+    @pytest.mark.parametrize("body", [
+        {"set": {"price": 1.0}},
+        {"filters": {}, "set": {"price": 1.0}},
+        {"ids": [1], "set": {}},
+    ])
+    def test_rejects_unbounded_or_empty(self, client, fleet, body):
+        """Test a selector and at least one assignment are required."""
+        assert client.post("/cars/bulk-update", json=body).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rejects_null_required_field(self, client, fleet):
+        """Test required fields cannot be nulled in bulk."""
+        response = client.post("/cars/bulk-update", json={"ids": [fleet[0].id], "set": {"price": None}})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
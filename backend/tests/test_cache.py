@@ -0,0 +1,158 @@
+"""Tests for the listing read cache and its invalidation."""
+import io
+import pytest
+from fastapi import status
+from cache import ListingCache, LocalInvalidationBus, TTLCache
+from factories import ToyotaCamryFactory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test the bounded LRU/TTL cache."""
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted."""
+        cache = TTLCache(max_entries=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the size bound evicts the entry read longest ago."""
+        cache = TTLCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_entries_expire(self):
+        """Test that entries older than the TTL are misses."""
+        clock = FakeClock()
+        cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 4.9
+        assert cache.get("a") == 1
+        clock.now = 5.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a TTL of zero stores nothing."""
+        cache = TTLCache(max_entries=10, ttl=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+
+
+class TestListingCache:
+    """Test invalidation rules of the listing cache."""
+
+    def test_invalidate_car_drops_car_and_all_lists(self):
+        """Test a write evicts its car and every list page."""
+        cache = ListingCache(max_entries=10, ttl=60)
+        cache.set_car(1, b"car1", cache.generation)
+        cache.set_car(2, b"car2", cache.generation)
+        cache.set_list("page", (b"[]", None), cache.generation)
+
+        cache.invalidate(1)
+
+        assert cache.get_car(1) is None
+        assert cache.get_car(2) == b"car2"
+        assert cache.get_list("page") is None
+
+    def test_stale_reader_cannot_repopulate(self):
+        """Test a response read before a write is not stored after it."""
+        cache = ListingCache(max_entries=10, ttl=60)
+        generation = cache.generation
+
+        cache.invalidate(1)
+        cache.set_car(1, b"stale", generation)
+
+        assert cache.get_car(1) is None
+
+    def test_bus_fans_out_to_every_replica(self):
+        """Test one publish reaches all subscribed caches."""
+        bus = LocalInvalidationBus()
+        replicas = [ListingCache(max_entries=10, ttl=60) for _ in range(3)]
+        for replica in replicas:
+            replica.set_car(7, b"car7", replica.generation)
+            bus.subscribe(lambda message, replica=replica: replica.invalidate(message["car_id"]))
+
+        bus.publish({"car_id": 7})
+
+        assert all(replica.get_car(7) is None for replica in replicas)
+
+
+class TestCachedEndpoints:
+    """Test caching and invalidation through the API."""
+
+    @pytest.fixture
+    def car_id(self, test_db):
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        return car.id
+
+    def test_repeated_get_is_served_from_cache(self, client, car_id):
+        """Test the second read of a car is a cache hit."""
+        first = client.get(f"/cars/{car_id}")
+        second = client.get(f"/cars/{car_id}")
+
+        assert first.json() == second.json()
+        stats = client.get("/cache/stats").json()
+        assert stats["cars"]["hits"] == 1
+        assert stats["cars"]["misses"] == 1
+
+    def test_list_cache_keyed_by_parameters(self, client, car_id):
+        """Test different query parameters are cached separately."""
+        client.get("/cars")
+        client.get("/cars")
+        assert client.get("/cars", params={"brand": "BMW"}).json() == []
+
+        stats = client.get("/cache/stats").json()
+        assert stats["lists"]["hits"] == 1
+        assert stats["lists"]["entries"] == 2
+
+    def test_update_invalidates_car_and_lists(self, client, car_id, sample_car_data):
+        """Test reads after an update see the new data."""
+        client.get(f"/cars/{car_id}")
+        client.get("/cars")
+
+        client.put(f"/cars/{car_id}", json=dict(sample_car_data, price=1.0))
+
+        assert client.get(f"/cars/{car_id}").json()["price"] == 1.0
+        assert client.get("/cars").json()[0]["price"] == 1.0
+
+    def test_create_and_delete_invalidate_lists(self, client, sample_car_data):
+        """Test list pages reflect created and deleted cars."""
+        assert client.get("/cars").json() == []
+
+        new_id = client.post("/cars", json=sample_car_data).json()["id"]
+        assert [car["id"] for car in client.get("/cars").json()] == [new_id]
+
+        client.delete(f"/cars/{new_id}")
+        assert client.get("/cars").json() == []
+        assert client.get(f"/cars/{new_id}").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_photo_upload_invalidates_car(self, client, car_id, mock_storage_client):
+        """Test a new photo is visible on the next read."""
+        assert client.get(f"/cars/{car_id}").json()["photos"] == []
+
+        files = {"file": ("test.jpg", io.BytesIO(b"image"), "image/jpeg")}
+        client.post(f"/cars/{car_id}/photos", files=files)
+
+        assert len(client.get(f"/cars/{car_id}").json()["photos"]) == 1
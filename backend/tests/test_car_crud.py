@@ -2,6 +2,7 @@
 import pytest
 from fastapi import status
 from factories import CarFactory, ToyotaCamryFactory, LuxuryCarFactory
+from query_stats import capture_queries
 
 
 class TestCarCreation:
@@ -165,6 +166,91 @@ class TestCarUpdate:
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class TestCarPatch:
+    """Test partial updates with optimistic concurrency - PATCH /cars/{id}."""
+    
+    @pytest.fixture
+    def car(self, client, sample_car_data):
+        return client.post("/cars", json=sample_car_data).json()
+    
+    def test_patch_only_given_fields(self, client, car):
+        """Test untouched fields keep their values and the version advances."""
+        response = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 80000.0})
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["price"] == 80000.0
+        assert data["version"] == car["version"] + 1
+        assert {key: data[key] for key in ("brand", "series", "mileage_miles")} == \
+            {key: car[key] for key in ("brand", "series", "mileage_miles")}
+        assert client.get(f"/cars/{car['id']}").json()["price"] == 80000.0
+    
+    def test_patch_recomputes_miles_with_km(self, client, car):
+        """Test mileage_miles follows a new mileage_km."""
+        response = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "mileage_km": 1000})
+        
+        assert response.json()["mileage_miles"] == 621
+    
+    def test_stale_version_conflicts(self, client, car):
+        """Test the second of two editors holding the same version gets 409."""
+        first = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 1.0})
+        second = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 2.0})
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert second.status_code == status.HTTP_409_CONFLICT
+        assert str(car["version"] + 1) in second.json()["detail"]
+        assert client.get(f"/cars/{car['id']}").json()["price"] == 1.0
+    
+    def test_put_bumps_version(self, client, car, sample_car_data):
+        """Test a full update also invalidates versions read before it."""
+        client.put(f"/cars/{car['id']}", json=dict(sample_car_data, price=1.0))
+        
+        response = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 2.0})
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
+    def test_patch_not_found(self, client):
+        """Test patching a missing car is 404, not a conflict."""
+        response = client.patch("/cars/99999", json={"version": 1, "price": 1.0})
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    @pytest.mark.parametrize("body, expected", [
+        ({"price": 1.0}, status.HTTP_422_UNPROCESSABLE_ENTITY),
+        ({"version": 1, "brand": None}, status.HTTP_422_UNPROCESSABLE_ENTITY),
+        ({"version": 1}, status.HTTP_400_BAD_REQUEST),
+    ])
+    def test_patch_invalid(self, client, car, body, expected):
+        """Test a version is required, required fields cannot be nulled, and empty patches are rejected."""
+        response = client.patch(f"/cars/{car['id']}", json=body)
+        
+        assert response.status_code == expected
+    
+    def test_patch_can_clear_optional_field(self, client, car):
+        """Test nullable fields accept an explicit null."""
+        response = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "series": None})
+        
+        assert response.json()["series"] is None
+    
+    @pytest.mark.parametrize("changes, reads", [
+        ({"mileage_km": 1}, 0),
+        # price moves the car to another inventory rollup, which needs its old values; SQLite's
+        # RETURNING cannot report them, so they are read (and locked) first
+        ({"price": 1.0}, 1),
+    ])
+    def test_patch_is_a_single_update(self, client, car, api_engine, changes, reads):
+        """Test the row is written by one guarded UPDATE, read first only when rollups change."""
+        with capture_queries(api_engine) as captured:
+            client.patch(f"/cars/{car['id']}", json=dict(changes, version=car["version"]))
+        
+        # Only the statements on the cars table; the rollup upsert and catalog bump come after
+        statements = [
+            statement.lstrip().split()[0].upper() for statement in captured
+            if "cars" in statement.split("WHERE")[0] and "catalog_state" not in statement
+        ]
+        assert statements == ["SELECT"] * reads + ["UPDATE"]
+
+
 class TestCarDeletion:
     """Test car deletion endpoint - DELETE /cars/{id}."""
     
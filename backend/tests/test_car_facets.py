@@ -0,0 +1,124 @@
+"""Tests for faceted counts - GET /cars/facets."""
+from collections import Counter
+from fastapi import status
+from factories import CarFactory
+from main import listing_cache
+
+
+def seed_facet_cars(test_db):
+    cars = [
+        CarFactory(brand="BMW", model="X5", year=2020, price=41000.0, mileage_km=30000,
+                   car_status="odpala", location_status="na miejscu"),
+        CarFactory(brand="BMW", model="X5", year=2020, price=44999.0, mileage_km=49999,
+                   car_status="odpala i jezdzi", location_status="na miejscu"),
+        CarFactory(brand="BMW", model="X3", year=2018, price=25000.0, mileage_km=120000,
+                   car_status="odpala", location_status="w drodze"),
+        CarFactory(brand="Toyota", model="Camry", year=2018, price=18000.0, mileage_km=90000,
+                   car_status="stacjonarny", location_status="na miejscu"),
+    ]
+    test_db.add_all(cars)
+    test_db.commit()
+    return cars
+
+
+class TestCarFacets:
+    """Test counts and histograms over the filtered catalog."""
+
+    def test_counts_and_histograms(self, client, test_db):
+        """Test every facet and histogram bucket counts the matching cars."""
+        seed_facet_cars(test_db)
+
+        response = client.get("/cars/facets", params={"price_bucket": 10000, "mileage_bucket": 50000})
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body["total"] == 4
+        assert body["facets"]["brand"] == [{"value": "BMW", "count": 3}, {"value": "Toyota", "count": 1}]
+        assert body["facets"]["model"] == [
+            {"brand": "BMW", "value": "X5", "count": 2},
+            {"brand": "BMW", "value": "X3", "count": 1},
+            {"brand": "Toyota", "value": "Camry", "count": 1},
+        ]
+        assert body["facets"]["car_status"][0] == {"value": "odpala", "count": 2}
+        assert body["facets"]["location_status"] == [
+            {"value": "na miejscu", "count": 3}, {"value": "w drodze", "count": 1},
+        ]
+        assert body["histograms"]["year"] == [{"value": 2018, "count": 2}, {"value": 2020, "count": 2}]
+        assert body["histograms"]["price"] == [
+            {"min": 10000.0, "max": 20000.0, "count": 1},
+            {"min": 20000.0, "max": 30000.0, "count": 1},
+            {"min": 40000.0, "max": 50000.0, "count": 2},
+        ]
+        assert body["histograms"]["mileage_km"] == [
+            {"min": 0, "max": 50000, "count": 2},
+            {"min": 50000, "max": 100000, "count": 1},
+            {"min": 100000, "max": 150000, "count": 1},
+        ]
+
+    def test_same_filters_as_list(self, client, test_db):
+        """Test the facets describe exactly the cars GET /cars returns for the same filters."""
+        test_db.add_all([CarFactory() for _ in range(30)])
+        test_db.commit()
+        params = {"year_min": 2018, "price_max": 300000, "location_status": "na miejscu"}
+
+        cars = client.get("/cars", params=dict(params, all=True)).json()
+        body = client.get("/cars/facets", params=params).json()
+
+        assert body["total"] == len(cars)
+        assert {f["value"]: f["count"] for f in body["facets"]["brand"]} == Counter(car["brand"] for car in cars)
+        assert sum(bucket["count"] for bucket in body["histograms"]["price"]) == len(cars)
+        assert body["facets"]["location_status"] in ([], [{"value": "na miejscu", "count": len(cars)}])
+
+    def test_invalid_bucket_width(self, client):
+        """Test a zero bucket width is rejected."""
+        response = client.get("/cars/facets", params={"price_bucket": 0})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_too_many_buckets(self, client, test_db):
+        """Test a width giving more than FACET_MAX_BUCKETS buckets over the matching cars is a 400."""
+        seed_facet_cars(test_db)
+
+        response = client.get("/cars/facets", params={"price_bucket": 100})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "price_bucket too narrow: 270 buckets" in response.json()["detail"]
+        # The same width is fine over a narrower price range
+        narrow = client.get("/cars/facets", params={"price_bucket": 100, "brand": "BMW", "model": "X5"})
+        assert narrow.status_code == status.HTTP_200_OK
+        assert len(narrow.json()["histograms"]["price"]) == 2
+
+
+class TestCarFacetsCache:
+    """Test facet views are cached per filter signature and dropped by writes."""
+
+    def test_served_from_cache_without_queries(self, client, test_db, assert_max_queries):
+        """Test the first view costs the catalog version and two GROUP BY queries, repeats cost none."""
+        seed_facet_cars(test_db)
+
+        with assert_max_queries(3):
+            first = client.get("/cars/facets", params={"brand": "BMW"})
+        with assert_max_queries(0):
+            second = client.get("/cars/facets", params={"brand": "BMW"})
+
+        assert first.json()["total"] == 3
+        assert second.content == first.content
+        assert listing_cache.stats()["lists"]["hits"] == 1
+
+    def test_write_invalidates(self, client, test_db, sample_car_data):
+        """Test a new car shows up in the next facet view."""
+        seed_facet_cars(test_db)
+        before = client.get("/cars/facets").json()["total"]
+
+        client.post("/cars", json=sample_car_data)
+
+        assert client.get("/cars/facets").json()["total"] == before + 1
+
+    def test_conditional_get(self, client, test_db):
+        """Test an unchanged facet view revalidates with 304."""
+        seed_facet_cars(test_db)
+        etag = client.get("/cars/facets").headers["ETag"]
+
+        response = client.get("/cars/facets", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,335 @@
+"""Tests for listing cars - GET /cars pagination, filtering and sorting."""
+import pytest
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import event
+from factories import CarFactory, ToyotaCamryFactory, car_photos
+from main import DEFAULT_PAGE_SIZE, LIST_FIELDS, encode_cursor
+
+
+def seed_cars(test_db, count):
+    """Insert cars with strictly increasing created_at timestamps."""
+    base = datetime(2024, 1, 1)
+    cars = [CarFactory(created_at=base + timedelta(minutes=i)) for i in range(count)]
+    test_db.add_all(cars)
+    test_db.commit()
+    return cars
+
+
+class TestCarPagination:
+    """Test keyset pagination on GET /cars."""
+
+    def test_default_page_is_bounded(self, client, test_db):
+        """Test that GET /cars without parameters returns a bounded page."""
+        seed_cars(test_db, DEFAULT_PAGE_SIZE + 1)
+
+        response = client.get("/cars")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == DEFAULT_PAGE_SIZE
+        assert "X-Next-Cursor" in response.headers
+
+    def test_pages_cover_all_cars_newest_first(self, client, test_db):
+        """Test walking every page returns each car exactly once, newest first."""
+        seed_cars(test_db, 7)
+
+        seen = []
+        params = {"limit": 3}
+        while True:
+            response = client.get("/cars", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(car["id"] for car in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            params = {"limit": 3, "cursor": next_cursor}
+
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+        created = [client.get(f"/cars/{car_id}").json()["created_at"] for car_id in seen]
+        assert created == sorted(created, reverse=True)
+
+    def test_last_page_has_no_cursor(self, client, test_db):
+        """Test that an exactly full last page does not advertise a next page."""
+        seed_cars(test_db, 3)
+
+        response = client.get("/cars", params={"limit": 3})
+
+        assert len(response.json()) == 3
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_ties_on_created_at_are_broken_by_id(self, client, test_db):
+        """Test cars sharing a timestamp are neither skipped nor repeated."""
+        same_instant = datetime(2024, 1, 1)
+        test_db.add_all([CarFactory(created_at=same_instant) for _ in range(4)])
+        test_db.commit()
+
+        first = client.get("/cars", params={"limit": 2})
+        second = client.get("/cars", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+
+        ids = [car["id"] for car in first.json() + second.json()]
+        assert sorted(ids) == [1, 2, 3, 4]
+
+    def test_invalid_cursor(self, client):
+        """Test that a malformed cursor is rejected."""
+        response = client.get("/cars", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Invalid cursor" in response.json()["detail"]
+
+    @pytest.mark.parametrize("limit", [0, 501])
+    def test_limit_out_of_range(self, client, limit):
+        """Test that page size is bounded."""
+        response = client.get("/cars", params={"limit": limit})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_unbounded_opt_in(self, client, test_db):
+        """Test that all=true returns the whole catalog in one response."""
+        seed_cars(test_db, 5)
+
+        response = client.get("/cars", params={"all": "true", "limit": 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 5
+        assert "X-Next-Cursor" not in response.headers
+
+
+def explain_list_query(client, test_db, api_engine, params):
+    """Run GET /cars and return SQLite's query plan for the SELECT it issued."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM cars" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(api_engine, "before_cursor_execute", capture)
+    try:
+        response = client.get("/cars", params=params)
+    finally:
+        event.remove(api_engine, "before_cursor_execute", capture)
+    assert response.status_code == status.HTTP_200_OK
+
+    statement, parameters = captured[-1]
+    with test_db.get_bind().connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+class TestCarFiltering:
+    """Test server-side filters on GET /cars."""
+
+    def test_filter_by_brand_and_model(self, client, test_db):
+        """Test equality filters on text columns."""
+        test_db.add_all([
+            ToyotaCamryFactory(),
+            CarFactory(brand="BMW", model="X5"),
+            CarFactory(brand="Toyota", model="Corolla"),
+        ])
+        test_db.commit()
+
+        response = client.get("/cars", params={"brand": "Toyota", "model": "Camry"})
+
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["model"] == "Camry"
+
+    def test_filter_by_statuses(self, client, test_db):
+        """Test car_status and location_status filters."""
+        test_db.add_all([
+            CarFactory(car_status="odpala", location_status="w drodze"),
+            CarFactory(car_status="odpala", location_status="na miejscu"),
+            CarFactory(car_status="stacjonarny", location_status="w drodze"),
+        ])
+        test_db.commit()
+
+        response = client.get("/cars", params={"car_status": "odpala", "location_status": "w drodze"})
+
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["car_status"] == "odpala"
+        assert data[0]["location_status"] == "w drodze"
+
+    def test_range_filters_are_inclusive(self, client, test_db):
+        """Test min/max filters on numeric columns."""
+        test_db.add_all([
+            CarFactory(year=2015, price=10000.0, mileage_km=200000, engine_cm3=1200),
+            CarFactory(year=2019, price=50000.0, mileage_km=80000, engine_cm3=2000),
+            CarFactory(year=2023, price=90000.0, mileage_km=10000, engine_cm3=3000),
+        ])
+        test_db.commit()
+
+        response = client.get("/cars", params={
+            "year_min": 2019,
+            "price_max": 90000,
+            "mileage_km_max": 80000,
+            "engine_cm3_min": 2000,
+            "engine_cm3_max": 2000,
+        })
+
+        data = response.json()
+        assert [car["year"] for car in data] == [2019]
+
+    def test_sort_by_price_ascending(self, client, test_db):
+        """Test sorting by a whitelisted column."""
+        test_db.add_all([CarFactory(price=price) for price in (30000.0, 10000.0, 20000.0)])
+        test_db.commit()
+
+        response = client.get("/cars", params={"sort": "price"})
+
+        assert [car["price"] for car in response.json()] == [10000.0, 20000.0, 30000.0]
+
+    def test_sorted_pages_follow_cursor(self, client, test_db):
+        """Test keyset pagination over a non-default sort with duplicate values."""
+        test_db.add_all([CarFactory(price=price) for price in (5.0, 1.0, 3.0, 3.0, 2.0, 4.0)])
+        test_db.commit()
+
+        first = client.get("/cars", params={"sort": "-price", "limit": 3})
+        second = client.get("/cars", params={
+            "sort": "-price", "limit": 3, "cursor": first.headers["X-Next-Cursor"],
+        })
+
+        prices = [car["price"] for car in first.json() + second.json()]
+        assert prices == [5.0, 4.0, 3.0, 3.0, 2.0, 1.0]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_cursor_from_other_sort_is_rejected(self, client, test_db):
+        """Test that a cursor only continues the sort it was issued for."""
+        seed_cars(test_db, 3)
+        cursor = client.get("/cars", params={"limit": 1}).headers["X-Next-Cursor"]
+
+        response = client.get("/cars", params={"sort": "price", "cursor": cursor})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize("sort,value,car_id", [
+        ("price", {"a": 1}, 1),
+        ("price", "10", 1),
+        ("-year", True, 1),
+        ("-created_at", 1700000000, 1),
+        ("price", 10.0, "1"),
+    ])
+    def test_cursor_with_wrong_value_type_is_rejected(self, client, test_db, sort, value, car_id):
+        """Test that a crafted cursor whose values do not fit the sort is a 400, not a server error."""
+        seed_cars(test_db, 3)
+        response = client.get("/cars", params={"sort": sort, "cursor": encode_cursor(sort, value, car_id)})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Invalid cursor" in response.json()["detail"]
+
+    def test_invalid_sort(self, client):
+        """Test that only whitelisted sort keys are accepted."""
+        response = client.get("/cars", params={"sort": "photos"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Invalid sort" in response.json()["detail"]
+
+
+class TestCarListingIndexes:
+    """Test that common filter/sort combinations are served by indexes."""
+
+    @pytest.mark.parametrize("params,index", [
+        ({}, "ix_cars_created_at_id"),
+        ({"brand": "Toyota", "model": "Camry"}, "ix_cars_brand_model_created_at"),
+        ({"location_status": "w drodze", "car_status": "odpala"}, "ix_cars_status_created_at"),
+        ({"price_min": 1000, "price_max": 5000, "sort": "price"}, "ix_cars_price_id"),
+        ({"sort": "-year"}, "ix_cars_year_id"),
+        ({"mileage_km_max": 50000, "sort": "mileage_km"}, "ix_cars_mileage_km_id"),
+    ])
+    def test_query_plan_uses_index(self, client, test_db, api_engine, params, index):
+        """Test the list query is an index scan without a temporary sort."""
+        seed_cars(test_db, 3)
+
+        plan = explain_list_query(client, test_db, api_engine, params)
+
+        assert f"USING INDEX {index}" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_cursor_page_seeks_index(self, client, test_db, api_engine):
+        """Test a deep page seeks into the index rather than scanning from the start."""
+        seed_cars(test_db, 3)
+        cursor = client.get("/cars", params={"limit": 1}).headers["X-Next-Cursor"]
+
+        plan = explain_list_query(client, test_db, api_engine, {"limit": 1, "cursor": cursor})
+
+        assert "SEARCH cars USING INDEX ix_cars_created_at_id" in plan
+
+
+class TestSparseFieldsets:
+    """Test GET /cars?fields= and the view=summary projection."""
+
+    @pytest.fixture
+    def car_with_photos(self, test_db):
+        car = CarFactory(photo_rows=car_photos("https://cdn/a.jpg", "https://cdn/b.jpg",
+                                               sizes=[{"card": "https://cdn/a_card.jpg"}, {}]))
+        test_db.add_all([car, CarFactory()])
+        test_db.commit()
+        return car
+
+    def test_fields_selects_only_requested(self, client, car_with_photos):
+        """Test only id and the requested fields are returned, photo lists included."""
+        response = client.get("/cars", params={"fields": "price,photos, photo_sizes", "sort": "price", "all": True})
+
+        assert response.status_code == status.HTTP_200_OK
+        cars = {car["id"]: car for car in response.json()}
+        assert all(set(car) == {"id", "price", "photos", "photo_sizes"} for car in cars.values())
+        assert cars[car_with_photos.id]["photos"] == ["https://cdn/a.jpg", "https://cdn/b.jpg"]
+        assert cars[car_with_photos.id]["photo_sizes"] == [{"card": "https://cdn/a_card.jpg"}, {}]
+
+    def test_every_field_matches_full_response(self, client, car_with_photos):
+        """Test asking for every field gives exactly the full CarResponse body."""
+        full = client.get("/cars").json()
+
+        projected = client.get("/cars", params={"fields": ",".join(LIST_FIELDS)}).json()
+
+        assert projected == full
+
+    def test_summary(self, client, car_with_photos):
+        """Test the summary holds the card fields and the first photo only."""
+        cars = {car["id"]: car for car in client.get("/cars", params={"view": "summary"}).json()}
+
+        assert cars[car_with_photos.id] == {
+            "id": car_with_photos.id, "brand": car_with_photos.brand, "model": car_with_photos.model,
+            "year": car_with_photos.year, "price": car_with_photos.price,
+            "photo": "https://cdn/a.jpg", "photo_sizes": {"card": "https://cdn/a_card.jpg"},
+        }
+        assert [(car["photo"], car["photo_sizes"]) for car in cars.values()].count((None, {})) == 1
+
+    def test_pages_by_unselected_sort_column(self, client, test_db):
+        """Test the cursor still works when the sort column is not among the fields."""
+        seed_cars(test_db, 5)
+
+        seen, params = [], {"fields": "brand", "sort": "-created_at", "limit": 2}
+        while True:
+            response = client.get("/cars", params=params)
+            seen.extend(car["id"] for car in response.json())
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        assert seen == [car["id"] for car in client.get("/cars").json()]
+
+    def test_cached_per_projection(self, client, car_with_photos):
+        """Test a cached full page is not served for a sparse request, or the other way round."""
+        full = client.get("/cars")
+        summary = client.get("/cars", params={"view": "summary"})
+
+        assert full.headers["ETag"] != summary.headers["ETag"]
+        assert "photo_ids" in client.get("/cars").json()[0]
+        assert set(client.get("/cars", params={"view": "summary"}).json()[0]) == set(summary.json()[0])
+
+    @pytest.mark.parametrize("params", [{"fields": "price,engine"}, {"fields": "price", "view": "summary"}])
+    def test_invalid_projection(self, client, params):
+        """Test unknown fields and fields combined with the summary are rejected."""
+        response = client.get("/cars", params=params)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_query_counts(self, client, car_with_photos, assert_max_queries):
+        """Test the summary needs no photo query and photo fields need exactly one."""
+        with assert_max_queries(2):
+            client.get("/cars", params={"view": "summary"})
+        with assert_max_queries(2):
+            client.get("/cars", params={"fields": "brand,price"})
+        with assert_max_queries(3):
+            client.get("/cars", params={"fields": "photos"})
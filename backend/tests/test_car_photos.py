@@ -0,0 +1,136 @@
+"""Tests for the normalized car_photos table and its one-time migration."""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from factories import CarWithPhotosFactory, ToyotaCamryFactory
+from main import Base, CarPhoto, add_car_photos, upgrade_schema
+
+
+def upload(client, car_id, name="car.jpg"):
+    files = {"file": (name, io.BytesIO(b"not decodable"), "image/jpeg")}
+    return client.post(f"/cars/{car_id}/photos", files=files)
+
+
+class TestPhotoRows:
+    """Test photos are stored one row each, in a stable order."""
+
+    def test_upload_appends_row(self, client, test_db, local_storage):
+        """Test an upload inserts one row after the existing photos."""
+        car = CarWithPhotosFactory()
+        test_db.add(car)
+        test_db.commit()
+
+        data = upload(client, car.id).json()
+
+        row = test_db.get(CarPhoto, data["photo_id"])
+        assert (row.car_id, row.position, row.url) == (car.id, 2, data["photo_url"])
+        assert row.key == data["photo_url"].split("/")[-1]
+        body = client.get(f"/cars/{car.id}").json()
+        assert body["photo_ids"][-1] == data["photo_id"]
+        assert len(body["photos"]) == len(body["photo_ids"]) == len(body["photo_sizes"]) == 3
+
+    def test_positions_survive_deletes(self, client, test_db, local_storage):
+        """Test deleting leaves a gap rather than renumbering, and new photos go last."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        ids = [upload(client, car.id).json()["photo_id"] for _ in range(3)]
+
+        client.delete(f"/cars/{car.id}/photos/{ids[1]}")
+        new_id = upload(client, car.id).json()["photo_id"]
+
+        assert client.get(f"/cars/{car.id}").json()["photo_ids"] == [ids[0], ids[2], new_id]
+        positions = [row.position for row in test_db.query(CarPhoto).order_by(CarPhoto.position)]
+        assert positions == [0, 2, 3]
+
+    def test_upload_changes_car_etag(self, client, test_db, local_storage):
+        """Test a new photo invalidates conditional GETs of the car."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        etag = client.get(f"/cars/{car.id}").headers["ETag"]
+
+        upload(client, car.id)
+
+        response = client.get(f"/cars/{car.id}", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["photos"]) == 1
+
+    def test_delete_car_removes_rows(self, client, test_db):
+        """Test a car's photo rows go with it."""
+        car = CarWithPhotosFactory()
+        test_db.add(car)
+        test_db.commit()
+
+        assert client.delete(f"/cars/{car.id}").status_code == status.HTTP_200_OK
+
+        assert test_db.query(CarPhoto).count() == 0
+
+    def test_concurrent_appends_keep_every_photo(self, tmp_path):
+        """Test parallel writers to one car each get their own position."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'photos.db'}", connect_args={"timeout": 30})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            car = ToyotaCamryFactory()
+            db.add(car)
+            db.commit()
+            car_id = car.id
+
+        def append(i):
+            with Session() as db:
+                return add_car_photos(db, db.get(type(car), car_id), [(f"/media/car_{car_id}_{i}.jpg", {})])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(append, range(16)))
+
+        with Session() as db:
+            positions = sorted(row.position for row in db.query(CarPhoto))
+        assert positions == list(range(16))
+
+
+class TestPhotoMigration:
+    """Test the JSON photo arrays move into car_photos once."""
+
+    @pytest.fixture
+    def legacy_engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE cars (id INTEGER PRIMARY KEY, brand VARCHAR, model VARCHAR, series VARCHAR, "
+                "year INTEGER, mileage_km INTEGER, mileage_miles INTEGER, engine_cm3 INTEGER, "
+                "car_status VARCHAR, location_status VARCHAR, price FLOAT, photos JSON, photo_sizes JSON, "
+                "dealer_ref VARCHAR, created_at DATETIME, updated_at DATETIME)"
+            ))
+            for car_id, photos, sizes in [
+                (1, ["https://cdn/car_1_a.jpg", "https://cdn/car_1_b.jpg"], [{"card": "https://cdn/car_1_a_card.webp"}]),
+                (2, [], []),
+                (3, None, None),
+            ]:
+                conn.execute(text(
+                    "INSERT INTO cars VALUES (:id, 'BMW', 'X5', NULL, 2020, 1, 0, 3000, 'odpala', 'na miejscu', "
+                    "1.0, :photos, :sizes, NULL, '2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+                ), {"id": car_id, "photos": json.dumps(photos), "sizes": json.dumps(sizes)})
+        return engine
+
+    def test_moves_arrays_and_drops_columns(self, legacy_engine):
+        """Test every photo becomes a row in its old order, with its size map."""
+        upgrade_schema(legacy_engine)
+
+        assert "photos" not in {column["name"] for column in inspect(legacy_engine).get_columns("cars")}
+        with sessionmaker(bind=legacy_engine)() as db:
+            rows = db.query(CarPhoto).order_by(CarPhoto.car_id, CarPhoto.position).all()
+        assert [(row.car_id, row.position, row.key) for row in rows] == [(1, 0, "car_1_a.jpg"), (1, 1, "car_1_b.jpg")]
+        assert [row.sizes for row in rows] == [{"card": "https://cdn/car_1_a_card.webp"}, {}]
+
+    def test_runs_once(self, legacy_engine):
+        """Test upgrading an already migrated database changes nothing."""
+        upgrade_schema(legacy_engine)
+        upgrade_schema(legacy_engine)
+
+        with legacy_engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM car_photos")).scalar() == 2
@@ -0,0 +1,198 @@
+"""Tests for conditional GET - ETag, Last-Modified and 304 responses."""
+import io
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.pool import StaticPool
+from factories import ToyotaCamryFactory
+from main import Base, CatalogState, listing_cache, upgrade_schema
+
+
+@pytest.fixture
+def car_id(test_db):
+    car = ToyotaCamryFactory()
+    test_db.add(car)
+    test_db.commit()
+    return car.id
+
+
+def count_statements(api_engine):
+    """Collect SELECTs against the cars table issued on the engine the API uses."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM cars" in statement:
+            statements.append(statement)
+
+    event.listen(api_engine, "before_cursor_execute", capture)
+    return statements
+
+
+class TestCarValidators:
+    """Test ETag/Last-Modified on GET /cars/{id}."""
+
+    def test_response_has_validators(self, client, car_id):
+        """Test strong ETag and Last-Modified are emitted."""
+        response = client.get(f"/cars/{car_id}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"].startswith('"car-')
+        assert response.headers["Last-Modified"].endswith("GMT")
+        assert response.json()["updated_at"] is not None
+
+    def test_if_none_match_returns_304(self, client, car_id):
+        """Test a matching ETag gets an empty 304."""
+        etag = client.get(f"/cars/{car_id}").headers["ETag"]
+
+        response = client.get(f"/cars/{car_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    def test_304_without_loading_row_on_cache_miss(self, client, api_engine, car_id):
+        """Test revalidation only reads the timestamp when the cache is cold."""
+        etag = client.get(f"/cars/{car_id}").headers["ETag"]
+        listing_cache.clear()
+        statements = count_statements(api_engine)
+
+        response = client.get(f"/cars/{car_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert len(statements) == 1
+        assert "cars.brand" not in statements[0]
+
+    def test_update_changes_etag(self, client, car_id, sample_car_data):
+        """Test a write makes the old ETag stale."""
+        etag = client.get(f"/cars/{car_id}").headers["ETag"]
+
+        client.put(f"/cars/{car_id}", json=dict(sample_car_data, price=1.0))
+        response = client.get(f"/cars/{car_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        assert response.json()["price"] == 1.0
+
+    def test_photo_upload_changes_etag(self, client, car_id, mock_storage_client):
+        """Test photo writes bump the car's validators too."""
+        etag = client.get(f"/cars/{car_id}").headers["ETag"]
+
+        files = {"file": ("test.jpg", io.BytesIO(b"image"), "image/jpeg")}
+        client.post(f"/cars/{car_id}/photos", files=files)
+
+        response = client.get(f"/cars/{car_id}", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_modified_since(self, client, car_id):
+        """Test If-Modified-Since compares at one-second granularity."""
+        last_modified = client.get(f"/cars/{car_id}").headers["Last-Modified"]
+
+        fresh = client.get(f"/cars/{car_id}", headers={"If-Modified-Since": last_modified})
+        stale = client.get(f"/cars/{car_id}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+
+        assert fresh.status_code == status.HTTP_304_NOT_MODIFIED
+        assert stale.status_code == status.HTTP_200_OK
+
+    def test_if_none_match_wins_over_if_modified_since(self, client, car_id):
+        """Test a non-matching ETag forces a full response."""
+        last_modified = client.get(f"/cars/{car_id}").headers["Last-Modified"]
+
+        response = client.get(f"/cars/{car_id}", headers={
+            "If-None-Match": '"other"',
+            "If-Modified-Since": last_modified,
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_missing_car_with_validator(self, client):
+        """Test conditional requests for unknown cars are still 404."""
+        response = client.get("/cars/99999", headers={"If-None-Match": '"car-1-0"'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestListValidators:
+    """Test ETag/Last-Modified on GET /cars."""
+
+    def test_list_304_without_loading_rows(self, client, api_engine, car_id):
+        """Test list revalidation reads only the catalog version."""
+        etag = client.get("/cars").headers["ETag"]
+        listing_cache.clear()
+        statements = count_statements(api_engine)
+
+        response = client.get("/cars", headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert statements == []
+
+    def test_list_etag_depends_on_parameters(self, client, car_id):
+        """Test different pages or filters get different ETags."""
+        default = client.get("/cars").headers["ETag"]
+        filtered = client.get("/cars", params={"brand": "Toyota"}).headers["ETag"]
+
+        assert default != filtered
+
+    @pytest.mark.parametrize("write", ["create", "update", "delete"])
+    def test_writes_bump_catalog_version(self, client, car_id, sample_car_data, write):
+        """Test every mutating endpoint invalidates list validators."""
+        etag = client.get("/cars").headers["ETag"]
+
+        if write == "create":
+            client.post("/cars", json=sample_car_data)
+        elif write == "update":
+            client.put(f"/cars/{car_id}", json=sample_car_data)
+        else:
+            client.delete(f"/cars/{car_id}")
+
+        response = client.get("/cars", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+
+
+class TestSchemaUpgrade:
+    """Test upgrading databases created before updated_at existed."""
+
+    def test_adds_updated_at_and_indexes(self):
+        """Test the column is added and backfilled from created_at."""
+        engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE cars (id INTEGER PRIMARY KEY, brand VARCHAR, model VARCHAR, series VARCHAR, "
+                "year INTEGER, mileage_km INTEGER, mileage_miles INTEGER, engine_cm3 INTEGER, "
+                "car_status VARCHAR, location_status VARCHAR, price FLOAT, photos JSON, created_at DATETIME)"
+            ))
+            conn.execute(text(
+                "INSERT INTO cars VALUES (1, 'BMW', 'X5', NULL, 2020, 1, 0, 3000, 'odpala', "
+                "'na miejscu', 1.0, '[]', '2024-01-01 00:00:00.000000')"
+            ))
+
+        upgrade_schema(engine)
+
+        columns = {column["name"] for column in inspect(engine).get_columns("cars")}
+        assert {"updated_at", "version"} <= columns and "photos" not in columns
+        assert "ix_cars_created_at_id" in {index["name"] for index in inspect(engine).get_indexes("cars")}
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT updated_at FROM cars")).scalar() == "2024-01-01 00:00:00.000000"
+
+    def test_catalog_state_row_exists_before_any_write(self, client, test_db, sample_car_data):
+        """Test the version row is created with its table, so writers only ever bump it."""
+        assert test_db.get(CatalogState, 1).version == 0
+
+        client.post("/cars", json=sample_car_data)
+
+        test_db.expire_all()
+        assert test_db.query(CatalogState).count() == 1
+        assert test_db.get(CatalogState, 1).version == 1
+
+    def test_seeds_empty_catalog_state(self):
+        """Test a catalog_state table left empty by an earlier release gets its row."""
+        engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM catalog_state"))
+
+        upgrade_schema(engine)
+        upgrade_schema(engine)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT id, version FROM catalog_state")).all() == [(1, 0)]
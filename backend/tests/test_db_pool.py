@@ -0,0 +1,72 @@
+"""Tests for connection pool settings and metrics - db_pool.py and GET /db/pool/stats."""
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import db_pool
+
+
+@pytest.fixture
+def pooled_engine(tmp_path, monkeypatch):
+    """File SQLite engine with one pooled connection and one overflow slot."""
+    monkeypatch.setattr(db_pool, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(db_pool, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(db_pool, "DB_POOL_TIMEOUT", 0.05)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **db_pool.engine_options(url))
+    db_pool.watch_pool(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestEngineOptions:
+    """Test pool settings are taken from the environment."""
+
+    def test_settings_applied(self, pooled_engine):
+        """Test size, overflow, timeout and pre-ping reach the pool."""
+        pool = pooled_engine.pool
+
+        assert isinstance(pool, QueuePool)
+        assert (pool.size(), pool._max_overflow, pool._timeout, pool._pre_ping) == (1, 1, 0.05, True)
+
+    def test_in_memory_sqlite_is_left_alone(self):
+        """Test per-thread in-memory databases get no pool options."""
+        assert db_pool.engine_options("sqlite:///:memory:") == {}
+
+
+class TestPoolMetrics:
+    """Test checkout wait, occupancy, overflow and timeouts are recorded."""
+
+    def test_checkouts_overflow_and_timeout(self, pooled_engine):
+        """Test the second connection overflows and the third times out."""
+        metrics = pooled_engine.pool.metrics
+        first, second = pooled_engine.connect(), pooled_engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            pooled_engine.connect()
+
+        stats = metrics.snapshot(pooled_engine.pool)
+        first.close()
+        second.close()
+
+        assert (stats["checked_out"], stats["overflow"], stats["peak_checked_out"]) == (2, 1, 2)
+        assert (stats["checkouts"], stats["overflow_connections"], stats["timeouts"]) == (2, 1, 1)
+        assert sum(stats["wait_buckets"].values()) == 2
+
+    def test_dispose_keeps_metrics(self, pooled_engine):
+        """Test the recreated pool reports into the same counters."""
+        with pooled_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        pooled_engine.dispose()
+        with pooled_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert pooled_engine.pool.metrics.checkouts == 2
+
+    def test_stats_endpoint(self, client):
+        """Test the API's own pool is reported."""
+        response = client.get("/db/pool/stats")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {"size", "checked_out", "checkouts", "wait_seconds_total", "timeouts"} <= set(response.json()["sync"])
@@ -0,0 +1,109 @@
+"""Tests for streaming catalog export - GET /cars/export."""
+import csv
+import io
+import json
+import pytest
+from fastapi import status
+from factories import CarFactory, CarWithPhotosFactory
+import main
+from query_stats import capture_queries
+
+
+@pytest.fixture
+def catalog(test_db):
+    cars = [CarFactory(brand="BMW") for _ in range(3)] + [CarWithPhotosFactory(brand="Audi")]
+    test_db.add_all(cars)
+    test_db.commit()
+    return cars
+
+
+class TestCatalogExport:
+    """Test NDJSON and CSV export of the catalog."""
+
+    def test_ndjson_export(self, client, catalog):
+        """Test every car is one JSON line with all columns."""
+        response = client.get("/cars/export")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert 'filename="cars.ndjson"' in response.headers["content-disposition"]
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [1, 2, 3, 4]
+        assert rows[3]["photos"] == catalog[3].photos
+        assert "created_at" in rows[0]
+
+    def test_csv_export(self, client, catalog):
+        """Test CSV has a header row and one row per car."""
+        response = client.get("/cars/export", params={"format": "csv"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 4
+        assert rows[0]["brand"] == "BMW"
+        assert json.loads(rows[3]["photos"]) == catalog[3].photos
+
+    def test_column_projection(self, client, catalog):
+        """Test fields= limits the exported columns and their order."""
+        response = client.get("/cars/export", params={"format": "csv", "fields": "price,id"})
+
+        lines = response.text.splitlines()
+        assert lines[0] == "price,id"
+        assert len(lines) == 5
+
+    @pytest.mark.parametrize("fields", ["price,brand", "price,photos"])
+    def test_projection_without_id(self, client, catalog, fields):
+        """Test the id used to match photos never leaks into a projection that leaves it out."""
+        csv_response = client.get("/cars/export", params={"format": "csv", "fields": fields})
+        ndjson_response = client.get("/cars/export", params={"fields": fields})
+
+        csv_rows = list(csv.reader(io.StringIO(csv_response.text)))
+        assert csv_rows[0] == fields.split(",")
+        assert all(len(row) == 2 for row in csv_rows)
+        assert [row[1] for row in csv_rows[1:4]] == (["BMW"] * 3 if fields == "price,brand" else ["[]"] * 3)
+        rows = [json.loads(line) for line in ndjson_response.text.splitlines()]
+        assert len(rows) == 4 and all(list(row) == fields.split(",") for row in rows)
+
+    def test_filters(self, client, catalog):
+        """Test the list filters apply to the export."""
+        response = client.get("/cars/export", params={"brand": "Audi", "fields": "id,brand"})
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows == [{"id": 4, "brand": "Audi"}]
+
+    def test_batches_are_streamed(self, client, test_db, catalog, monkeypatch):
+        """Test rows are fetched and written in EXPORT_BATCH_SIZE batches, one photo query per batch."""
+        monkeypatch.setattr("main.EXPORT_BATCH_SIZE", 3)
+        batches = []
+        real_export_batch = main.export_batch
+
+        def recording_export_batch(db, rows, fields):
+            batches.append([row.id for row in rows])
+            return real_export_batch(db, rows, fields)
+
+        monkeypatch.setattr("main.export_batch", recording_export_batch)
+        with capture_queries(test_db.get_bind()) as captured:
+            response = client.get("/cars/export", params={"fields": "id,photos"})
+
+        assert batches == [[1, 2, 3], [4]]
+        assert sum("FROM car_photos" in statement for statement in captured) == 2
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2, 3, 4]
+
+    def test_empty_csv_has_header(self, client):
+        """Test an empty export still describes its columns."""
+        response = client.get("/cars/export", params={"format": "csv", "fields": "id,brand"})
+
+        assert response.text.splitlines() == ["id,brand"]
+
+    def test_unknown_field(self, client):
+        """Test projection is limited to Car columns."""
+        response = client.get("/cars/export", params={"fields": "id,password"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in response.json()["detail"]
+
+    def test_unknown_format(self, client):
+        """Test only ndjson and csv are offered."""
+        response = client.get("/cars/export", params={"format": "xml"})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
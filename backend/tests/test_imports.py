@@ -0,0 +1,231 @@
+"""Tests for dealer feed imports - POST /imports and the importer pipeline."""
+import io
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+import importer
+from main import IMPORT_STALE_SECONDS, Car, ImportJob
+
+HEADER = "dealer_ref,brand,model,series,year,mileage_km,engine_cm3,car_status,location_status,price\n"
+
+
+def csv_feed(*rows):
+    return HEADER + "".join(",".join(str(value) for value in row) + "\n" for row in rows)
+
+
+def feed_row(ref, price=10000.0, model="Golf"):
+    return (ref, "Volkswagen", model, "", 2019, 100000, 1600, "odpala", "na miejscu", price)
+
+
+@pytest.fixture(autouse=True)
+def import_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("main.IMPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+
+def upload(client, filename, content, **params):
+    files = {"file": (filename, io.BytesIO(content.encode()), "text/plain")}
+    return client.post("/imports", files=files, params=params)
+
+
+class TestImportEndpoints:
+    """Test upload and progress endpoints."""
+
+    def test_csv_import(self, client):
+        """Test a CSV feed creates cars and reports counters."""
+        response = upload(client, "feed.csv", csv_feed(feed_row("A1"), feed_row("A2")))
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = client.get(f"/imports/{response.json()['id']}").json()
+        assert job["status"] == "completed"
+        assert job["rows_processed"] == 2
+        assert job["rows_created"] == 2
+        cars = client.get("/cars").json()
+        assert {car["dealer_ref"] for car in cars} == {"A1", "A2"}
+        assert all(car["series"] is None and car["mileage_miles"] == 62137 for car in cars)
+
+    def test_completed_upload_is_removed(self, client, import_dir):
+        """Test the spooled copy of a feed is deleted once its job completes."""
+        response = upload(client, "feed.csv", csv_feed(feed_row("A1")))
+
+        assert client.get(f"/imports/{response.json()['id']}").json()["status"] == "completed"
+        assert list(import_dir.glob("*.csv")) == []
+
+    def test_jsonl_import_with_row_errors(self, client, sample_car_data):
+        """Test invalid rows are recorded per row and do not stop the import."""
+        lines = [
+            json.dumps(dict(sample_car_data, dealer_ref="T1")),
+            "{not json",
+            json.dumps(dict(sample_car_data, dealer_ref="T2", year="soon")),
+            json.dumps(sample_car_data),
+            json.dumps(dict(sample_car_data, dealer_ref="T3")),
+        ]
+        job_id = upload(client, "feed.jsonl", "\n".join(lines) + "\n").json()["id"]
+
+        job = client.get(f"/imports/{job_id}").json()
+        assert job["rows_created"] == 2
+        assert job["rows_failed"] == 3
+        errors = client.get(f"/imports/{job_id}/errors").json()
+        assert [error["row_number"] for error in errors] == [2, 3, 4]
+        assert errors[1]["errors"][0]["loc"] == ["year"]
+        assert errors[2]["errors"][0]["loc"] == ["dealer_ref"]
+
+        page = client.get(f"/imports/{job_id}/errors", params={"after_row": 3}).json()
+        assert [error["row_number"] for error in page] == [4]
+
+    def test_reimport_upserts_on_dealer_ref(self, client):
+        """Test a second feed updates existing cars instead of duplicating them."""
+        upload(client, "feed.csv", csv_feed(feed_row("A1"), feed_row("A2")))
+
+        job_id = upload(client, "feed.csv", csv_feed(feed_row("A1", price=1.0), feed_row("A3"))).json()["id"]
+
+        job = client.get(f"/imports/{job_id}").json()
+        assert (job["rows_created"], job["rows_updated"]) == (1, 1)
+        cars = {car["dealer_ref"]: car for car in client.get("/cars").json()}
+        assert sorted(cars) == ["A1", "A2", "A3"]
+        assert cars["A1"]["price"] == 1.0
+
+    def test_unknown_format(self, client):
+        """Test feeds must be CSV or JSONL."""
+        response = upload(client, "feed.xml", "<cars/>")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_spool_failure_is_reported_as_is(self, client, import_dir, monkeypatch):
+        """Test a spool file that could not be created surfaces the original error."""
+        def failing_open(*args, **kwargs):
+            raise OSError("disk full")
+        monkeypatch.setattr("main.open", failing_open, raising=False)
+
+        with pytest.raises(OSError, match="disk full"):
+            upload(client, "feed.csv", csv_feed(feed_row("A1")))
+
+        assert list(import_dir.glob("*.csv")) == []
+
+    def test_format_override(self, client):
+        """Test format= wins over the file extension."""
+        job_id = upload(client, "feed.txt", csv_feed(feed_row("A1")), format="csv").json()["id"]
+
+        assert client.get(f"/imports/{job_id}").json()["rows_created"] == 1
+
+    def test_job_not_found(self, client):
+        """Test unknown job ids are 404."""
+        assert client.get("/imports/99999").status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/imports/99999/errors").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_api_create_rejects_duplicate_dealer_ref(self, client, sample_car_data):
+        """Test the natural key is unique through the API as well."""
+        client.post("/cars", json=dict(sample_car_data, dealer_ref="X"))
+
+        response = client.post("/cars", json=dict(sample_car_data, dealer_ref="X"))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+
+class TestImportPipeline:
+    """Test chunking, checkpoints and resume."""
+
+    def create_job(self, test_db, import_dir, content, feed_format="csv"):
+        path = import_dir / f"feed.{feed_format}"
+        path.write_text(content)
+        job = ImportJob(filename=path.name, path=str(path), format=feed_format)
+        test_db.add(job)
+        test_db.commit()
+        return job.id
+
+    def test_checkpoint_advances_per_chunk(self, test_db, import_dir, session_factory):
+        """Test progress is committed after every chunk."""
+        job_id = self.create_job(test_db, import_dir, csv_feed(*[feed_row(f"R{i}") for i in range(5)]))
+        progress = []
+
+        result = importer.run_import(session_factory, job_id, chunk_size=2,
+                                     on_progress=lambda job: progress.append(job.rows_processed))
+
+        assert progress == [2, 4]
+        assert result["rows_processed"] == 5
+        assert result["status"] == "completed"
+
+    def test_resume_after_crash(self, client, test_db, import_dir, session_factory):
+        """Test an interrupted import resumes without duplicating committed rows."""
+        job_id = self.create_job(test_db, import_dir, csv_feed(*[feed_row(f"R{i}") for i in range(5)]))
+        real_import_chunk = importer.import_chunk
+        calls = []
+
+        def crash_on_second_chunk(db, job, chunk):
+            calls.append(len(chunk))
+            if len(calls) == 2:
+                raise RuntimeError("worker killed")
+            real_import_chunk(db, job, chunk)
+
+        with patch("importer.import_chunk", crash_on_second_chunk):
+            crashed = importer.run_import(session_factory, job_id, chunk_size=2)
+        assert crashed["status"] == "failed"
+        assert crashed["rows_processed"] == 2
+        assert "worker killed" in crashed["error"]
+
+        resumed = client.post(f"/imports/{job_id}/resume", params={"chunk_size": 2})
+        assert resumed.status_code == status.HTTP_202_ACCEPTED
+
+        job = client.get(f"/imports/{job_id}").json()
+        assert job["status"] == "completed"
+        assert job["rows_created"] == 5
+        assert test_db.query(Car).count() == 5
+        # Resumed through the API from the spool directory, so the feed went with the job
+        assert not (import_dir / "feed.csv").exists()
+
+    def test_resume_only_failed_or_interrupted(self, client, test_db, import_dir, session_factory):
+        """Test a running job is refused until its checkpoint has gone stale."""
+        job_id = self.create_job(test_db, import_dir, csv_feed(feed_row("A1")))
+        job = test_db.get(ImportJob, job_id)
+        job.status = "running"
+        test_db.commit()
+
+        assert client.post(f"/imports/{job_id}/resume").status_code == status.HTTP_409_CONFLICT
+        assert importer.run_import(session_factory, job_id)["status"] == "running"
+
+        job.updated_at = datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS + 1)
+        test_db.commit()
+        response = client.post(f"/imports/{job_id}/resume")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert client.get(f"/imports/{job_id}").json()["status"] == "completed"
+        assert client.post(f"/imports/{job_id}/resume").status_code == status.HTTP_409_CONFLICT
+
+    def test_completed_job_cannot_resume(self, client, test_db, import_dir, session_factory):
+        """Test resume is refused once a job has finished."""
+        job_id = self.create_job(test_db, import_dir, csv_feed(feed_row("A1")))
+        importer.run_import(session_factory, job_id)
+
+        response = client.post(f"/imports/{job_id}/resume")
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_duplicate_ref_within_chunk_last_wins(self, test_db, import_dir, session_factory):
+        """Test a feed repeating a dealer_ref yields one car with the last values."""
+        job_id = self.create_job(test_db, import_dir, csv_feed(feed_row("A1", price=1.0), feed_row("A1", price=2.0)))
+
+        importer.run_import(session_factory, job_id)
+
+        cars = test_db.query(Car).all()
+        assert len(cars) == 1
+        assert cars[0].price == 2.0
+
+    def test_cli(self, test_db, import_dir, monkeypatch, capsys):
+        """Test the command-line entry point creates and runs a job."""
+        path = import_dir / "cli.jsonl"
+        path.write_text(json.dumps(dict(zip(HEADER.strip().split(","), feed_row("C1")))) + "\n")
+        monkeypatch.setattr("importer.SessionLocal", sessionmaker(bind=test_db.get_bind()))
+
+        exit_code = importer.main_cli([str(path), "--chunk-size", "10"])
+
+        assert exit_code == 0
+        assert json.loads(capsys.readouterr().out.splitlines()[-1])["rows_created"] == 1
+        assert path.exists()
@@ -0,0 +1,182 @@
+"""Tests for inventory rollups - GET /stats and inventory_stats.py."""
+import io
+from unittest.mock import patch
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from factories import CarFactory
+import inventory_stats
+import main
+from inventory_stats import compute_rollups, read_rollups, rebuild_rollups, rollup_drift
+from main import Base, InventoryRollup, median_from_buckets
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+
+def car_data(sample_car_data, **changes):
+    return dict(sample_car_data, **changes)
+
+
+def assert_no_drift(test_db):
+    test_db.expire_all()
+    assert rollup_drift(compute_rollups(test_db), read_rollups(test_db)) == []
+
+
+class TestRollupMaintenance:
+    """Test every write path keeps the rollups equal to a full recount."""
+
+    def test_crud_writes(self, client, test_db, sample_car_data):
+        """Test create, update, patch and delete apply their deltas."""
+        first = client.post("/cars", json=sample_car_data).json()
+        second = client.post("/cars", json=car_data(sample_car_data, price=50000.0)).json()
+        client.put(f"/cars/{first['id']}", json=car_data(sample_car_data, year=2020))
+        client.patch(f"/cars/{second['id']}", json={"version": second["version"], "location_status": "w drodze"})
+        client.patch(f"/cars/{second['id']}", json={"version": second["version"] + 1, "mileage_km": 1})
+        third = client.post("/cars", json=sample_car_data).json()
+        client.delete(f"/cars/{third['id']}")
+
+        assert_no_drift(test_db)
+        assert client.get("/stats").json() == {
+            "total": 2,
+            "average_price": 72500.0,
+            "by_location_status": [{"value": "na miejscu", "count": 1}, {"value": "w drodze", "count": 1}],
+        }
+
+    def test_bulk_writes_and_imports(self, client, test_db, sample_car_data, tmp_path, monkeypatch):
+        """Test the bulk endpoints and dealer feed imports apply their deltas."""
+        monkeypatch.setattr("main.IMPORT_DIR", str(tmp_path))
+        created = client.post("/cars/bulk", json=[sample_car_data, car_data(sample_car_data, model="Corolla")]).json()
+        ids = [result["id"] for result in created["results"]]
+        client.put("/cars/bulk", json=[car_data(sample_car_data, id=ids[0], price=1000.0)])
+        client.post("/cars/bulk-update", json={"ids": ids, "set": {"location_status": "w drodze"}})
+        client.post("/cars/bulk-update", json={"ids": ids, "set": {"car_status": "stacjonarny"}})
+        feed = ("dealer_ref,brand,model,series,year,mileage_km,engine_cm3,car_status,location_status,price\n"
+                "A1,Volkswagen,Golf,,2019,100000,1600,odpala,na miejscu,10000\n")
+        for price in ("10000", "12000"):
+            files = {"file": ("feed.csv", io.BytesIO(feed.replace("10000\n", price + "\n").encode()), "text/plain")}
+            assert client.post("/imports", files=files).status_code == status.HTTP_202_ACCEPTED
+
+        assert_no_drift(test_db)
+        assert client.get("/stats").json()["total"] == 3
+
+    def test_bulk_update_repeated_id(self, client, test_db, sample_car_data):
+        """Test an id given twice in one chunk counts its old values once and its last item wins."""
+        car_id = client.post("/cars", json=sample_car_data).json()["id"]
+        items = [car_data(sample_car_data, id=car_id, price=price) for price in (1000.0, 2000.0)]
+
+        response = client.put("/cars/bulk", json=items)
+
+        assert response.json()["updated"] == 2
+        assert client.get(f"/cars/{car_id}").json()["price"] == 2000.0
+        assert_no_drift(test_db)
+        assert client.get("/stats").json()["total"] == 1
+
+    def test_delete_matching_no_row(self, client, sample_car_data):
+        """Test a DELETE that finds the car already gone is a 404 that subtracts nothing."""
+        car_id = client.post("/cars", json=sample_car_data).json()["id"]
+        original_delete = main.delete
+
+        def delete_nothing(table):
+            # Stands in for a concurrent delete committing between the read and this DELETE
+            statement = original_delete(table)
+            return statement.where(main.Car.id == -1) if table is main.Car else statement
+
+        with patch("main.delete", side_effect=delete_nothing), patch("async_api.delete", side_effect=delete_nothing):
+            response = client.delete(f"/cars/{car_id}")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert client.get(f"/cars/{car_id}").status_code == status.HTTP_200_OK
+        assert client.get("/stats").json()["total"] == 1
+
+    def test_failed_write_leaves_rollups_alone(self, client, test_db, sample_car_data):
+        """Test the delta is rolled back with a write that fails to commit."""
+        client.post("/cars", json=car_data(sample_car_data, dealer_ref="D1"))
+
+        response = client.post("/cars", json=car_data(sample_car_data, dealer_ref="D1", price=1.0))
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert_no_drift(test_db)
+        assert client.get("/stats").json()["total"] == 1
+
+
+class TestPriceStats:
+    """Test averages and medians per brand, model and year."""
+
+    def test_average_and_median(self, client, sample_car_data):
+        """Test the median of an even count averages the two middle prices."""
+        for price in (10000.0, 20000.0, 30000.0, 100000.0):
+            client.post("/cars", json=car_data(sample_car_data, price=price))
+        client.post("/cars", json=car_data(sample_car_data, brand="BMW", model="X5", price=80000.0))
+
+        response = client.get("/stats/prices", params={"brand": "Toyota"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"brand": "Toyota", "model": "Camry", "year": 2023, "count": 4,
+                                    "average_price": 40000.0, "median_price": 25000.0}]
+        assert len(client.get("/stats/prices").json()) == 2
+
+    def test_median_within_shared_bucket(self):
+        """Test cars sharing a bucket are represented by its average price."""
+        assert median_from_buckets([(100.0, 1), (200.5, 2), (400.0, 1)], 4) == 200.5
+        assert median_from_buckets([(100.0, 2), (300.0, 1)], 3) == 100.0
+        assert median_from_buckets([], 0) is None
+
+    def test_empty_catalog(self, client):
+        """Test the endpoints answer before any car exists."""
+        assert client.get("/stats").json() == {"total": 0, "average_price": None, "by_location_status": []}
+        assert client.get("/stats/prices").json() == []
+
+
+class TestRebuild:
+    """Test the recount finds and repairs drift."""
+
+    def test_rebuild_repairs_drift(self, client, test_db, session_factory, sample_car_data):
+        """Test cars written behind the API's back are reported, then counted by the rebuild."""
+        client.post("/cars", json=sample_car_data)
+        test_db.add_all([CarFactory(location_status="w drodze") for _ in range(3)])
+        test_db.commit()
+
+        checked = rebuild_rollups(session_factory, check_only=True)
+        assert checked["cars"] == 4 and checked["drift"] and not checked["rebuilt"]
+        assert client.get("/stats").json()["total"] == 1
+
+        rebuilt = rebuild_rollups(session_factory)
+        assert rebuilt["rebuilt"] and rebuilt["drift"] == checked["drift"]
+        assert rebuild_rollups(session_factory, check_only=True)["drift"] == []
+        assert client.get("/stats").json()["by_location_status"][0] == {"value": "w drodze", "count": 3}
+
+    def test_check_command_exit_code(self, test_db, session_factory, capsys, monkeypatch):
+        """Test --check reports each drifted rollup and exits 1 without writing."""
+        monkeypatch.setattr(inventory_stats, "SessionLocal", session_factory)
+        monkeypatch.setattr(inventory_stats, "ensure_schema", lambda: None)
+        test_db.add(CarFactory(brand="Audi", model="A4", year=2019, location_status="na miejscu"))
+        test_db.commit()
+
+        assert inventory_stats.main_cli(["--check"]) == 1
+        output = capsys.readouterr().out
+        assert "Rollup drift Audi/A4/2019/na miejscu/" in output
+        assert '"drifted": 1' in output
+
+        assert inventory_stats.main_cli([]) == 0
+        assert inventory_stats.main_cli(["--check"]) == 0
+
+    def test_rollups_seeded_for_existing_catalog(self, tmp_path):
+        """Test ensure_schema counts the cars of a database that predates the rollups."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+        Base.metadata.create_all(engine)
+        InventoryRollup.__table__.drop(engine)
+        with Session(engine) as db:
+            db.add_all([CarFactory(brand="Audi") for _ in range(2)])
+            db.commit()
+
+        with patch("main.engine", engine), patch("main.schema_ready", False):
+            main.ensure_schema()
+
+        with Session(engine) as db:
+            rollups = read_rollups(db)
+        assert {key[0] for key in rollups} == {"Audi"}
+        assert sum(count for count, _ in rollups.values()) == 2
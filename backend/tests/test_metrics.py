@@ -0,0 +1,131 @@
+"""Tests for Prometheus metrics - metrics.py and GET /metrics."""
+import io
+import pytest
+from fastapi import status
+from factories import ToyotaCamryFactory
+import metrics
+from metrics import (IN_FLIGHT, REQUEST_DURATION, REQUEST_QUERIES, REQUESTS, STORAGE_DURATION, STORAGE_ERRORS,
+                     Counter, Histogram, storage_timer)
+
+
+class TestExposition:
+    """Test the text format written for each metric type."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket lines count every observation at or below their bound."""
+        histogram = Histogram("job_seconds", "Job time.", ("queue",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(("photos",), value)
+
+        assert histogram.render().splitlines() == [
+            "# HELP job_seconds Job time.",
+            "# TYPE job_seconds histogram",
+            'job_seconds_bucket{queue="photos",le="0.1"} 2',
+            'job_seconds_bucket{queue="photos",le="1"} 3',
+            'job_seconds_bucket{queue="photos",le="+Inf"} 4',
+            'job_seconds_sum{queue="photos"} 3.65',
+            'job_seconds_count{queue="photos"} 4',
+        ]
+
+    def test_label_values_are_escaped(self):
+        """Test quotes, backslashes and newlines cannot break the format."""
+        counter = Counter("events_total", "Events.", ("name",))
+        counter.inc(('say "hi"\\\n',))
+
+        assert 'events_total{name="say \\"hi\\"\\\\\\n"} 1' in counter.render()
+
+
+class TestRequestMetrics:
+    """Test every request is counted under its route template."""
+
+    def test_counted_by_route_template_and_status(self, client, test_db):
+        """Test the path parameter does not become a label value."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        found, missing = ("GET", "/cars/{car_id}", "200"), ("GET", "/cars/{car_id}", "404")
+        before = REQUESTS.value(found), REQUESTS.value(missing), REQUEST_DURATION.count(found[:2])
+
+        client.get(f"/cars/{car.id}")
+        client.get("/cars/999999")
+
+        assert (REQUESTS.value(found), REQUESTS.value(missing), REQUEST_DURATION.count(found[:2])) == \
+            (before[0] + 1, before[1] + 1, before[2] + 2)
+
+    def test_unmatched_paths_share_one_label(self, client):
+        """Test unknown paths cannot create unbounded series."""
+        labels = ("GET", metrics.UNMATCHED_ROUTE, "404")
+        before = REQUESTS.value(labels)
+
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+
+        assert REQUESTS.value(labels) == before + 2
+
+    def test_database_queries_attributed_to_request(self, client, test_db):
+        """Test queries run by the handler, on the threadpool or event loop, count toward its route."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        labels = ("GET", "/cars/{car_id}")
+        before = REQUEST_QUERIES.count(labels), REQUEST_QUERIES.total(labels)
+
+        client.get(f"/cars/{car.id}")
+
+        assert REQUEST_QUERIES.count(labels) == before[0] + 1
+        assert REQUEST_QUERIES.total(labels) >= before[1] + 1
+
+    def test_in_flight_gauge_returns_to_idle(self, client):
+        """Test the gauge is decremented after each request, including errors."""
+        before = IN_FLIGHT.value()
+
+        client.get("/health")
+        client.get("/cars/not-a-number")
+
+        assert IN_FLIGHT.value() == before
+
+
+class TestStorageMetrics:
+    """Test photo storage calls are timed by operation."""
+
+    def test_upload_times_storage_calls(self, client, test_db, local_storage):
+        """Test a streamed upload records its open, write and commit calls."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        operations = ("stream_open", "stream_write", "stream_commit")
+        before = [STORAGE_DURATION.count((operation,)) for operation in operations]
+
+        files = {"file": ("car.jpg", io.BytesIO(b"not decodable"), "image/jpeg")}
+        assert client.post(f"/cars/{car.id}/photos", files=files).status_code == status.HTTP_200_OK
+
+        assert [STORAGE_DURATION.count((operation,)) for operation in operations] == [n + 1 for n in before]
+
+    def test_failures_are_counted(self):
+        """Test a raising call is both timed and counted as an error."""
+        before = STORAGE_DURATION.count(("put",)), STORAGE_ERRORS.value(("put",))
+
+        with pytest.raises(OSError):
+            with storage_timer("put"):
+                raise OSError("bucket unreachable")
+
+        assert (STORAGE_DURATION.count(("put",)), STORAGE_ERRORS.value(("put",))) == (before[0] + 1, before[1] + 1)
+
+
+class TestMetricsEndpoint:
+    """Test GET /metrics serves everything in the Prometheus text format."""
+
+    def test_scrape(self, client):
+        """Test the request, database and pool metrics are all exposed."""
+        client.get("/health")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+        body = response.text
+        assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert "# TYPE http_requests_in_flight gauge" in body
+        assert "http_request_db_queries_bucket" in body
+        assert 'db_pool_checkout_wait_seconds_count{engine="sync"}' in body
@@ -2,8 +2,15 @@
 import pytest
 from fastapi import status
 from unittest.mock import Mock, patch
-from factories import CarWithPhotosFactory, ToyotaCamryFactory
+from factories import CarWithPhotosFactory, ToyotaCamryFactory, car_photos
+import asyncio
+import httpx
 import io
+import os
+import time
+from fastapi import UploadFile
+from main import CatalogState, app, stream_to_storage
+from storage_backends import LocalStorage, LocalWriter
 
 
 class TestPhotoUpload:
@@ -21,9 +28,7 @@ class TestPhotoUpload:
         file_content = b"fake image content"
         files = {"file": ("test.jpg", io.BytesIO(file_content), "image/jpeg")}
         
-        # Mock the bucket attribute in main module
-        with patch('main.bucket', mock_storage_client['bucket']):
-            response = client.post(f"/cars/{car.id}/photos", files=files)
+        response = client.post(f"/cars/{car.id}/photos", files=files)
         
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -72,14 +77,12 @@ class TestPhotoUpload:
         
         # Upload first photo
         file1 = {"file": ("test1.jpg", io.BytesIO(b"image1"), "image/jpeg")}
-        with patch('main.bucket', mock_storage_client['bucket']):
-            response1 = client.post(f"/cars/{car.id}/photos", files=file1)
+        response1 = client.post(f"/cars/{car.id}/photos", files=file1)
         assert response1.status_code == status.HTTP_200_OK
         
         # Upload second photo
         file2 = {"file": ("test2.jpg", io.BytesIO(b"image2"), "image/jpeg")}
-        with patch('main.bucket', mock_storage_client['bucket']):
-            response2 = client.post(f"/cars/{car.id}/photos", files=file2)
+        response2 = client.post(f"/cars/{car.id}/photos", files=file2)
         assert response2.status_code == status.HTTP_200_OK
         
         # Verify both photos are stored
@@ -87,7 +90,7 @@ class TestPhotoUpload:
         car_data = car_response.json()
         assert len(car_data["photos"]) == 2
     
-    @patch('main.bucket', None)
+    @patch('main.photo_storage', None)
     def test_upload_photo_storage_unavailable(self, client, test_db):
         """Test photo upload when cloud storage is unavailable."""
         car = ToyotaCamryFactory()
@@ -104,8 +107,178 @@ class TestPhotoUpload:
         assert "Failed to upload photo" in response.json()["detail"]
 
 
+class SlowWriter:
+    """Blob writer whose writes block like a slow network upload."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.chunks = []
+        self.closed = False
+
+    def write(self, chunk):
+        time.sleep(self.delay)
+        self.chunks.append(chunk)
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamedUpload:
+    """Test photos are streamed to storage in chunks, off the event loop."""
+
+    @pytest.fixture
+    def car_id(self, test_db):
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        return car.id
+
+    @pytest.fixture
+    def writer(self, mock_storage_client, monkeypatch):
+        writer = SlowWriter()
+        mock_storage_client['blob'].open.return_value = writer
+        monkeypatch.setattr('main.PHOTO_CHUNK_SIZE', 1024)
+        return writer
+
+    def test_upload_streamed_in_chunks(self, client, car_id, writer):
+        """Test the file reaches storage chunk by chunk and is finalized."""
+        content = bytes(range(256)) * 10
+
+        response = client.post(f"/cars/{car_id}/photos", files={"file": ("car.jpg", io.BytesIO(content), "image/jpeg")})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [len(chunk) for chunk in writer.chunks] == [1024, 1024, 512]
+        assert b"".join(writer.chunks) == content
+        assert writer.closed
+
+    def test_max_size_enforced_while_streaming(self, client, car_id, writer, monkeypatch):
+        """Test an oversized photo is rejected with 413 and never finalized."""
+        monkeypatch.setattr('main.PHOTO_MAX_BYTES', 1500)
+
+        response = client.post(f"/cars/{car_id}/photos", files={"file": ("car.jpg", io.BytesIO(b"x" * 4096), "image/jpeg")})
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert not writer.closed
+        assert client.get(f"/cars/{car_id}").json()["photos"] == []
+
+    def test_failed_write_aborts_upload(self, tmp_path, monkeypatch):
+        """Test a storage error mid-stream discards the partial upload and still propagates."""
+        monkeypatch.setattr('main.photo_storage', LocalStorage(str(tmp_path), "http://photos.test"))
+        monkeypatch.setattr(LocalWriter, "write", Mock(side_effect=OSError("disk full")))
+        upload = UploadFile(io.BytesIO(b"x" * 4096), filename="car.jpg")
+
+        with pytest.raises(OSError, match="disk full"):
+            asyncio.run(stream_to_storage(upload, "car_1_a.jpg"))
+
+        assert os.listdir(tmp_path) == []
+
+    def test_other_requests_served_during_slow_upload(self, test_db, car_id, writer):
+        """Test the event loop keeps answering while storage writes block."""
+        writer.delay = 0.05
+        content = b"x" * 1024 * 10
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                upload = asyncio.create_task(
+                    client.post(f"/cars/{car_id}/photos", files={"file": ("car.jpg", content, "image/jpeg")})
+                )
+                while not writer.chunks:
+                    await asyncio.sleep(0.005)
+                served = [await client.get("/health") for _ in range(3)]
+                served.append(await client.get(f"/cars/{car_id}"))
+                finished_during_upload = not writer.closed
+                return served, finished_during_upload, await upload
+
+        served, finished_during_upload, upload = asyncio.run(scenario())
+
+        assert all(response.status_code == status.HTTP_200_OK for response in served)
+        assert finished_during_upload
+        assert upload.status_code == status.HTTP_200_OK
+        assert len(writer.chunks) == 10
+
+
+class TestBatchUpload:
+    """Test multi-photo upload endpoint - POST /cars/{id}/photos/batch."""
+
+    @pytest.fixture
+    def car_id(self, test_db):
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        return car.id
+
+    def post_batch(self, client, car_id, *files):
+        return client.post(f"/cars/{car_id}/photos/batch",
+                           files=[("files", (name, io.BytesIO(content), content_type)) for name, content, content_type in files])
+
+    def test_uploads_in_request_order_with_one_commit(self, client, test_db, car_id, local_storage):
+        """Test every file is stored and appended in order by a single write."""
+        names = [f"photo{i}.jpg" for i in range(5)]
+
+        response = self.post_batch(client, car_id, *[(name, name.encode(), "image/jpeg") for name in names])
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["uploaded"], data["failed"]) == (5, 0)
+        assert [result["filename"] for result in data["results"]] == names
+        photos = client.get(f"/cars/{car_id}").json()["photos"]
+        assert photos == [result["photo_url"] for result in data["results"]]
+        assert test_db.get(CatalogState, 1).version == 1
+
+    def test_per_file_errors(self, client, car_id, local_storage, monkeypatch):
+        """Test invalid or oversized files fail alone while the rest are stored."""
+        monkeypatch.setattr('main.PHOTO_MAX_BYTES', 100)
+
+        data = self.post_batch(
+            client, car_id,
+            ("ok.jpg", b"small", "image/jpeg"),
+            ("notes.txt", b"text", "text/plain"),
+            ("huge.jpg", b"x" * 1000, "image/jpeg"),
+        ).json()
+
+        assert (data["uploaded"], data["failed"]) == (1, 2)
+        assert data["results"][1]["errors"] == [{"msg": "File must be an image"}]
+        assert "limit" in data["results"][2]["errors"][0]["msg"]
+        assert len(client.get(f"/cars/{car_id}").json()["photos"]) == 1
+
+    def test_concurrency_is_bounded(self, client, car_id, local_storage, monkeypatch):
+        """Test no more than PHOTO_UPLOAD_CONCURRENCY files upload at once."""
+        monkeypatch.setattr('main.PHOTO_UPLOAD_CONCURRENCY', 2)
+        in_flight = []
+        peak = []
+
+        async def slow_stream(file, key):
+            in_flight.append(key)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.02)
+            in_flight.remove(key)
+            return f"/media/{key}"
+
+        monkeypatch.setattr('main.stream_to_storage', slow_stream)
+
+        data = self.post_batch(client, car_id, *[(f"{i}.jpg", b"x", "image/jpeg") for i in range(6)]).json()
+
+        assert data["uploaded"] == 6
+        assert max(peak) == 2
+
+    def test_car_not_found(self, client, local_storage):
+        """Test uploading to a missing car is 404."""
+        response = self.post_batch(client, 99999, ("a.jpg", b"x", "image/jpeg"))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_too_many_files(self, client, car_id, local_storage, monkeypatch):
+        """Test the per-request file limit."""
+        monkeypatch.setattr('main.PHOTO_BATCH_MAX_FILES', 2)
+
+        response = self.post_batch(client, car_id, *[(f"{i}.jpg", b"x", "image/jpeg") for i in range(3)])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 class TestPhotoDelete:
-    """Test photo deletion endpoint - DELETE /cars/{id}/photos/{photo_index}."""
+    """Test photo deletion endpoint - DELETE /cars/{id}/photos/{photo_id}."""
     
     def test_delete_photo_success(self, client, test_db, mock_storage_client):
         """Test successful photo deletion."""
@@ -116,10 +289,8 @@ class TestPhotoDelete:
         test_db.refresh(car)
         
         initial_photo_count = len(car.photos)
-        photo_to_delete_index = 0
         
-        with patch('main.bucket', mock_storage_client['bucket']):
-            response = client.delete(f"/cars/{car.id}/photos/{photo_to_delete_index}")
+        response = client.delete(f"/cars/{car.id}/photos/{car.photo_ids[0]}")
         
         assert response.status_code == status.HTTP_200_OK
         assert "photo deleted successfully" in response.json()["message"].lower()
@@ -139,8 +310,8 @@ class TestPhotoDelete:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "Car not found" in response.json()["detail"]
     
-    def test_delete_photo_invalid_index(self, client, test_db, mock_storage_client):
-        """Test deleting photo with invalid index."""
+    def test_delete_photo_not_found(self, client, test_db, mock_storage_client):
+        """Test deleting a photo id that does not exist."""
         car = ToyotaCamryFactory()  # Car with no photos
         test_db.add(car)
         test_db.commit()
@@ -151,28 +322,25 @@ class TestPhotoDelete:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "Photo not found" in response.json()["detail"]
     
-    def test_delete_photo_negative_index(self, client, test_db, mock_storage_client):
-        """Test deleting photo with negative index."""
-        car = CarWithPhotosFactory()
-        test_db.add(car)
+    def test_delete_photo_of_another_car(self, client, test_db, mock_storage_client):
+        """Test a photo id is only deletable through the car it belongs to."""
+        owner, other = CarWithPhotosFactory(), ToyotaCamryFactory()
+        test_db.add_all([owner, other])
         test_db.commit()
-        test_db.refresh(car)
         
-        response = client.delete(f"/cars/{car.id}/photos/-1")
+        response = client.delete(f"/cars/{other.id}/photos/{owner.photo_ids[0]}")
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "Photo not found" in response.json()["detail"]
+        assert len(client.get(f"/cars/{owner.id}").json()["photos"]) == 2
     
-    def test_delete_photo_out_of_range_index(self, client, test_db, mock_storage_client):
-        """Test deleting photo with out-of-range index."""
+    def test_delete_photo_by_index_is_gone(self, client, test_db, mock_storage_client):
+        """Test a list index is no longer accepted in place of the photo id."""
         car = CarWithPhotosFactory()
         test_db.add(car)
         test_db.commit()
-        test_db.refresh(car)
         
-        # Try to delete photo at index beyond array length
-        invalid_index = len(car.photos) + 5
-        response = client.delete(f"/cars/{car.id}/photos/{invalid_index}")
+        response = client.delete(f"/cars/{car.id}/photos/-1")
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "Photo not found" in response.json()["detail"]
@@ -180,19 +348,17 @@ class TestPhotoDelete:
     def test_delete_middle_photo(self, client, test_db, mock_storage_client):
         """Test deleting a photo from the middle of the list."""
         # Create car with 3 photos
-        car = CarWithPhotosFactory()
-        car.photos = [
+        car = CarWithPhotosFactory(photo_rows=car_photos(
             "https://storage.googleapis.com/test-bucket/photo1.jpg",
             "https://storage.googleapis.com/test-bucket/photo2.jpg",
             "https://storage.googleapis.com/test-bucket/photo3.jpg"
-        ]
+        ))
         test_db.add(car)
         test_db.commit()
         test_db.refresh(car)
         
-        # Delete middle photo (index 1)
-        with patch('main.bucket', mock_storage_client['bucket']):
-            response = client.delete(f"/cars/{car.id}/photos/1")
+        # Delete middle photo
+        response = client.delete(f"/cars/{car.id}/photos/{car.photo_ids[1]}")
         
         assert response.status_code == status.HTTP_200_OK
         
@@ -0,0 +1,192 @@
+"""Tests for SQL instrumentation - query_stats.py and the assert_max_queries fixture."""
+import io
+import pytest
+from fastapi import status
+from sqlalchemy import column, create_engine, insert, table, text
+from factories import CarWithPhotosFactory, ToyotaCamryFactory
+import query_stats
+from main import Car
+from query_stats import QueryStats, capture_queries, current_request, fingerprint
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE cars (id INTEGER PRIMARY KEY, brand VARCHAR)"))
+    yield engine
+    engine.dispose()
+
+
+class TestFingerprint:
+    """Test statements differing only in values share a fingerprint."""
+
+    @pytest.mark.parametrize("statement, expected", [
+        ("SELECT * FROM cars WHERE id IN (?, ?, ?) LIMIT 20", "SELECT * FROM cars WHERE id IN (?, ...) LIMIT ?"),
+        ("SELECT * FROM cars WHERE brand = 'O''Brien' AND id = %(id_1)s",
+         "SELECT * FROM cars WHERE brand = ? AND id = ?"),
+        ("INSERT INTO cars (id, brand) VALUES ($1, $2), ($3, $4)", "INSERT INTO cars (id, brand) VALUES (?, ...), ..."),
+        ("SELECT price::text\n  FROM cars_1\n WHERE id = :id", "SELECT price::text FROM cars_1 WHERE id = ?"),
+    ])
+    def test_normalized(self, statement, expected):
+        """Test literals, placeholders, lists and whitespace are normalized, identifiers are not."""
+        assert fingerprint(statement) == expected
+
+    def test_in_lists_of_any_length_match(self):
+        """Test an IN list's length does not split one query into many."""
+        assert fingerprint("SELECT 1 WHERE id IN (?)") != fingerprint("SELECT 1 WHERE id IN (?, ?)")
+        assert fingerprint("SELECT 1 WHERE id IN (?, ?)") == fingerprint("SELECT 1 WHERE id IN (?, ?, ?, ?)")
+
+
+class TestRequestAttribution:
+    """Test statements are recorded on the current request's stats."""
+
+    def test_counts_and_groups_by_fingerprint(self, sqlite_engine):
+        """Test count, time and fingerprint grouping for one request."""
+        stats = QueryStats()
+        token = current_request.set(stats)
+        try:
+            with sqlite_engine.connect() as conn:
+                for car_id in range(3):
+                    conn.execute(text(f"SELECT brand FROM cars WHERE id = {car_id}"))
+                conn.execute(text("SELECT COUNT(*) FROM cars"))
+        finally:
+            current_request.reset(token)
+
+        assert stats.queries == 4 and stats.query_seconds > 0
+        assert [(fp, count) for fp, count, _ in stats.by_fingerprint()] == [
+            ("SELECT brand FROM cars WHERE id = ?", 3),
+            ("SELECT COUNT(*) FROM cars", 1),
+        ]
+
+    def test_repeated_statement_warning(self, capsys, monkeypatch):
+        """Test a fingerprint over the threshold is reported as a possible N+1."""
+        monkeypatch.setattr(query_stats, "SQL_REPEATED_QUERY_WARN", 3)
+        stats = QueryStats()
+        for photo_id in range(3):
+            stats.record(f"SELECT * FROM car_photos WHERE id = {photo_id}", 0.001)
+
+        query_stats.report_repeated_statements(stats, "POST /cars/{car_id}/photos/batch")
+
+        output = capsys.readouterr().out
+        assert "POST /cars/{car_id}/photos/batch ran the same query 3 times" in output
+        assert "possible N+1: SELECT * FROM car_photos WHERE id = ?" in output
+
+    def test_executemany_batches_are_not_repeats(self, tmp_path, capsys, monkeypatch):
+        """Test the batches of one executemany count as queries but never as a possible N+1."""
+        monkeypatch.setattr(query_stats, "SQL_REPEATED_QUERY_WARN", 3)
+        engine = create_engine(f"sqlite:///{tmp_path / 'batches.db'}", insertmanyvalues_page_size=2)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE cars (id INTEGER PRIMARY KEY, brand VARCHAR)"))
+        cars = table("cars", column("id"), column("brand"))
+        stats = QueryStats()
+        token = current_request.set(stats)
+        try:
+            with capture_queries(engine) as captured, engine.begin() as conn:
+                conn.execute(insert(cars).returning(cars.c.id), [{"brand": str(i)} for i in range(8)])
+        finally:
+            current_request.reset(token)
+            engine.dispose()
+
+        query_stats.report_repeated_statements(stats, "POST /cars/bulk")
+        assert stats.queries == 4 and stats.by_fingerprint() == []
+        assert capsys.readouterr().out == ""
+        assert len(captured) == 4 and captured.report().endswith("[executemany]")
+
+
+class TestSlowQueryLog:
+    """Test statements over SQL_SLOW_QUERY_MS are reported."""
+
+    def test_slow_query_with_plan(self, sqlite_engine, capsys, monkeypatch):
+        """Test the report includes the fingerprint and, when enabled, the EXPLAIN output."""
+        monkeypatch.setattr(query_stats, "SQL_SLOW_QUERY_MS", 0.000001)
+        monkeypatch.setattr(query_stats, "SQL_EXPLAIN_SLOW", True)
+
+        with sqlite_engine.connect() as conn:
+            conn.execute(text("SELECT brand FROM cars WHERE brand = :brand"), {"brand": "BMW"})
+
+        output = capsys.readouterr().out
+        assert "Slow query" in output and "SELECT brand FROM cars WHERE brand = ?" in output
+        assert "SCAN cars" in output
+
+    def test_writes_are_not_explained(self, sqlite_engine, capsys, monkeypatch):
+        """Test only reads are explained, so a failing EXPLAIN cannot abort a write's transaction."""
+        monkeypatch.setattr(query_stats, "SQL_SLOW_QUERY_MS", 0.000001)
+        monkeypatch.setattr(query_stats, "SQL_EXPLAIN_SLOW", True)
+
+        with sqlite_engine.begin() as conn:
+            conn.execute(text("UPDATE cars SET brand = 'BMW'"))
+
+        output = capsys.readouterr().out
+        assert "Slow query" in output and "SCAN" not in output
+
+    def test_fast_queries_are_quiet(self, sqlite_engine, capsys, monkeypatch):
+        """Test nothing is printed under the threshold."""
+        monkeypatch.setattr(query_stats, "SQL_SLOW_QUERY_MS", 60000)
+
+        with sqlite_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert "Slow query" not in capsys.readouterr().out
+
+
+class TestQueryBudgets:
+    """Test the per-endpoint query budgets; a new N+1 fails here."""
+
+    def test_budget_failure_lists_statements(self, sqlite_engine):
+        """Test the helper's report groups the captured statements."""
+        with capture_queries(sqlite_engine) as captured:
+            with sqlite_engine.connect() as conn:
+                for car_id in range(2):
+                    conn.execute(text("SELECT brand FROM cars WHERE id = :id"), {"id": car_id})
+
+        assert len(captured) == 2
+        assert captured.report() == "   2 x SELECT brand FROM cars WHERE id = ?"
+
+    def test_over_budget_fails(self, client, assert_max_queries):
+        """Test exceeding the budget fails the test."""
+        with pytest.raises(AssertionError, match="queries, budget 0"):
+            with assert_max_queries(0):
+                client.get("/cars")
+
+    def test_list_and_get(self, client, test_db, assert_max_queries):
+        """Test a page costs the catalog version, the cars and one query for all their photos."""
+        test_db.add_all([CarWithPhotosFactory() for _ in range(10)])
+        test_db.commit()
+        car_id = test_db.query(Car).first().id
+
+        with assert_max_queries(3):
+            assert len(client.get("/cars").json()) == 10
+        with assert_max_queries(2):
+            client.get(f"/cars/{car_id}")
+
+    def test_writes(self, client, assert_max_queries, sample_car_data):
+        """Test create, update and patch stay within a handful of statements, rollup upsert included."""
+        with assert_max_queries(6):
+            car = client.post("/cars", json=sample_car_data).json()
+        with assert_max_queries(7):
+            car = client.put(f"/cars/{car['id']}", json=dict(sample_car_data, price=1.0)).json()
+        with assert_max_queries(3) as plain_patch:
+            car = client.patch(f"/cars/{car['id']}", json={"version": car["version"], "mileage_km": 1}).json()
+        # Moving a car between rollups costs exactly two more: the read of its old values and the upsert
+        with assert_max_queries(5) as rollup_patch:
+            assert client.patch(f"/cars/{car['id']}", json={"version": car["version"], "price": 2.0}).status_code == 200
+        assert len(rollup_patch) == len(plain_patch) + 2
+
+    def test_batch_upload_does_not_grow_with_photos(self, client, test_db, local_storage, assert_max_queries):
+        """Test appending eight photos costs no more queries than appending one."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        url = f"/cars/{car.id}/photos/batch"
+
+        def photos(count):
+            return [("files", (f"car{i}.jpg", io.BytesIO(b"not decodable"), "image/jpeg")) for i in range(count)]
+
+        with assert_max_queries(8) as single:
+            client.post(url, files=photos(1))
+        with assert_max_queries(len(single)):
+            response = client.post(url, files=photos(8))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["uploaded"] == 8
@@ -0,0 +1,139 @@
+"""Tests for fuzzy car search - GET /cars/search and the trigram index."""
+import time
+import pytest
+from fastapi import status
+from factories import CarFactory, ToyotaCamryFactory
+from search import CarSearchIndex, tokenize
+
+
+def make_index(rows):
+    index = CarSearchIndex()
+    index.ensure_loaded(lambda: rows)
+    return index
+
+
+class TestSearchIndex:
+    """Test the in-process trigram index."""
+
+    def test_tokenize_strips_diacritics_and_punctuation(self):
+        """Test normalization of brand/model text."""
+        assert tokenize("Mercedes-Benz E-Klasa") == ["mercedes", "benz", "e", "klasa"]
+        assert tokenize("Škoda Octavia Łódź") == ["skoda", "octavia", "lodz"]
+
+    def test_abbreviated_query_matches_by_prefix(self):
+        """Test that "merc e klasa" finds the Mercedes E-Klasa first."""
+        index = make_index([
+            (1, "Mercedes", "E-Klasa", None),
+            (2, "Mercedes", "C-Klasa", None),
+            (3, "Volkswagen", "Golf", "Sport"),
+        ])
+
+        results = index.search("merc e klasa", limit=10)
+
+        assert [car_id for car_id, _ in results][:2] == [1, 2]
+        assert 3 not in [car_id for car_id, _ in results]
+
+    def test_typo_tolerance(self):
+        """Test that misspelled tokens still match."""
+        index = make_index([
+            (1, "Volkswagen", "Golf", "Sport"),
+            (2, "Toyota", "Camry", "Hybrid"),
+        ])
+
+        results = index.search("volkswagn glof sprot", limit=10)
+
+        assert results[0][0] == 1
+
+    def test_add_update_remove(self):
+        """Test that writes are reflected in later searches."""
+        index = make_index([])
+        index.add(1, "Audi", "A4", None)
+        assert [car_id for car_id, _ in index.search("audi", 10)] == [1]
+
+        index.add(1, "Audi", "A6", None)
+        assert index.search("a4", 10) == []
+        assert [car_id for car_id, _ in index.search("a6", 10)] == [1]
+
+        index.remove(1)
+        assert index.search("audi", 10) == []
+
+    def test_writes_before_load_are_ignored(self):
+        """Test that an unloaded index leaves population to the loader."""
+        index = CarSearchIndex()
+        index.add(1, "Audi", "A4", None)
+
+        index.ensure_loaded(lambda: [(2, "BMW", "X5", None)])
+
+        assert [car_id for car_id, _ in index.search("audi bmw", 10)] == [2]
+
+    def test_limit(self):
+        """Test that result count is capped and newest ids come first."""
+        index = make_index([(car_id, "BMW", "X5", None) for car_id in range(1, 11)])
+
+        results = index.search("bmw", limit=3)
+
+        assert [car_id for car_id, _ in results] == [10, 9, 8]
+
+    @pytest.mark.slow
+    def test_lookup_speed_on_large_catalog(self):
+        """Test lookups stay fast when tens of thousands of listings share each text."""
+        brands = ["Toyota", "BMW", "Mercedes", "Audi", "Volkswagen"]
+        models = ["Corolla", "X5", "Sprinter", "A4", "Golf"]
+        # 25 texts of 20000 cars each
+        index = make_index((car_id, brands[car_id % 5], models[car_id // 5 % 5], None) for car_id in range(500000))
+
+        start = time.perf_counter()
+        for _ in range(20):
+            results = index.search("volkswagn golf", limit=20)
+        elapsed = (time.perf_counter() - start) / 20
+
+        assert [car_id for car_id, _ in results] == list(range(499999, 0, -25))[:20]
+        assert elapsed < 0.001
+
+class TestSearchEndpoint:
+    """Test search endpoint - GET /cars/search."""
+
+    def test_search_returns_ranked_cars(self, client, test_db):
+        """Test results are full car payloads in ranking order."""
+        test_db.add_all([
+            CarFactory(brand="Volkswagen", model="Golf", series="Sport"),
+            CarFactory(brand="Volkswagen", model="Passat", series="Base"),
+            ToyotaCamryFactory(series="Hybrid"),
+        ])
+        test_db.commit()
+
+        response = client.get("/cars/search", params={"q": "golf sport"})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data[0]["model"] == "Golf"
+        assert all(car["brand"] != "Toyota" for car in data)
+
+    def test_search_follows_writes(self, client, sample_car_data):
+        """Test create, update and delete keep the index current."""
+        car_id = client.post("/cars", json=sample_car_data).json()["id"]
+        assert [car["id"] for car in client.get("/cars/search", params={"q": "camry"}).json()] == [car_id]
+
+        updated = dict(sample_car_data, model="Corolla")
+        client.put(f"/cars/{car_id}", json=updated)
+        assert client.get("/cars/search", params={"q": "camry"}).json() == []
+        assert client.get("/cars/search", params={"q": "corola"}).json()[0]["id"] == car_id
+
+        client.delete(f"/cars/{car_id}")
+        assert client.get("/cars/search", params={"q": "corolla"}).json() == []
+
+    def test_search_no_match(self, client, test_db):
+        """Test an unrelated query returns an empty list."""
+        test_db.add(ToyotaCamryFactory())
+        test_db.commit()
+
+        response = client.get("/cars/search", params={"q": "zzzz"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+    def test_search_requires_query(self, client):
+        """Test q is mandatory."""
+        response = client.get("/cars/search")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,115 @@
+"""Tests for lazy initialization - cold start, /ready and LazyStorage."""
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import Mock, patch
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import OperationalError
+import main
+from main import get_db
+from storage_backends import LazyStorage, LocalStorage
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestImportSideEffects:
+    """Test importing the app touches neither the database nor storage."""
+
+    def test_import_is_side_effect_free(self, tmp_path):
+        """Test a fresh import creates no tables and loads no storage or image libraries."""
+        database = tmp_path / "cold.db"
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", STORAGE_BACKEND="gcs")
+        probe = ("import json, sys, main; "
+                 "print(json.dumps(sorted(m for m in ('google.cloud.storage', 'PIL.Image') if m in sys.modules)))")
+
+        output = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+
+        assert json.loads(output.strip().splitlines()[-1]) == []
+        assert not database.exists() or inspect(create_engine(f"sqlite:///{database}")).get_table_names() == []
+
+    def test_ensure_schema_runs_once(self, tmp_path):
+        """Test the schema is created on the first call only."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+        with patch("main.engine", engine), patch("main.schema_ready", False), \
+                patch("main.upgrade_schema") as upgrade:
+            main.ensure_schema()
+            main.ensure_schema()
+
+        assert "cars" in inspect(engine).get_table_names()
+        upgrade.assert_called_once_with(engine)
+
+
+class TestReadiness:
+    """Test /ready, which unlike /health checks dependencies."""
+
+    def test_ready(self, client, local_storage):
+        """Test a migrated database and working storage report ready."""
+        with patch("main.schema_ready", True):
+            response = client.get("/ready")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"status": "ready",
+                                   "checks": {"schema": "ok", "database": "ok", "storage": "ok"}}
+
+    def test_not_ready_before_schema(self, client, local_storage):
+        """Test the probe fails until the startup hook has created the schema."""
+        with patch("main.schema_ready", False):
+            response = client.get("/ready")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["checks"]["schema"] == "pending"
+
+    def test_database_down(self, client, local_storage):
+        """Test an unreachable database fails readiness but not /health."""
+        db = Mock()
+        db.execute.side_effect = OperationalError("SELECT 1", {}, Exception("connection refused"))
+        client.app.dependency_overrides[get_db] = lambda: db
+
+        with patch("main.schema_ready", True):
+            response = client.get("/ready")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json()["checks"]["database"].startswith("error")
+        assert client.get("/health").status_code == status.HTTP_200_OK
+
+    def test_storage_failure_does_not_gate_readiness(self, client):
+        """Test broken storage is reported while the API stays in rotation."""
+        storage = LazyStorage(Mock(side_effect=OSError("no credentials")))
+
+        with patch("main.schema_ready", True), patch("main.photo_storage", storage):
+            response = client.get("/ready")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "no credentials" in response.json()["checks"]["storage"]
+
+
+class TestLazyStorage:
+    """Test the storage proxy builds its backend once, on first use."""
+
+    def test_created_on_first_use(self, tmp_path):
+        """Test the factory runs lazily and only once."""
+        factory = Mock(return_value=LocalStorage(str(tmp_path), "/media"))
+        storage = LazyStorage(factory)
+
+        assert not storage.initialized
+        factory.assert_not_called()
+        assert storage.url("car_1_a.jpg") == "/media/car_1_a.jpg"
+        storage.put("car_1_a.jpg", b"x", "image/jpeg")
+        factory.assert_called_once()
+
+    def test_failure_is_retried_after_backoff(self, tmp_path):
+        """Test a failed init is not retried on every call, but is retried later."""
+        factory = Mock(side_effect=[OSError("no credentials"), LocalStorage(str(tmp_path), "/media")])
+        storage = LazyStorage(factory, retry_after=60)
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="no credentials"):
+                storage.get()
+        assert factory.call_count == 1
+
+        with patch("storage_backends.time.monotonic", return_value=storage._failed_at + 61):
+            assert isinstance(storage.get(), LocalStorage)
@@ -0,0 +1,119 @@
+"""Tests for photo storage backends - storage_backends.py."""
+import io
+import os
+import pytest
+from unittest.mock import Mock
+from fastapi import status
+from google.api_core.exceptions import NotFound
+from factories import ToyotaCamryFactory
+from storage_backends import GCSStorage, LocalStorage, create_storage_backend
+
+
+class TestLocalStorage:
+    """Test the local-disk backend."""
+
+    def test_put_exists_url_delete(self, tmp_path):
+        """Test the basic object lifecycle."""
+        backend = LocalStorage(str(tmp_path), "/media/")
+
+        url = backend.put("car_1_a.jpg", b"data", "image/jpeg")
+
+        assert url == "/media/car_1_a.jpg"
+        assert backend.exists("car_1_a.jpg")
+        assert (tmp_path / "car_1_a.jpg").read_bytes() == b"data"
+        backend.delete("car_1_a.jpg")
+        assert not backend.exists("car_1_a.jpg")
+
+    def test_delete_missing_key(self, tmp_path):
+        """Test deleting a missing key is a no-op."""
+        LocalStorage(str(tmp_path), "/media").delete("car_1_missing.jpg")
+
+    def test_stream_put_visible_only_after_commit(self, tmp_path):
+        """Test streamed chunks appear under the key atomically on commit."""
+        backend = LocalStorage(str(tmp_path), "/media")
+        writer = backend.stream_put("car_1_a.jpg", "image/jpeg", 4)
+        writer.write(b"abcd")
+        writer.write(b"ef")
+
+        assert not backend.exists("car_1_a.jpg")
+        assert writer.commit() == "/media/car_1_a.jpg"
+        assert (tmp_path / "car_1_a.jpg").read_bytes() == b"abcdef"
+
+    def test_abort_leaves_nothing(self, tmp_path):
+        """Test an aborted upload removes its partial file."""
+        backend = LocalStorage(str(tmp_path), "/media")
+        writer = backend.stream_put("car_1_a.jpg", "image/jpeg", 4)
+        writer.write(b"abcd")
+
+        writer.abort()
+
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.parametrize("key", ["", "../etc/passwd", "a/b.jpg", ".upload-x"])
+    def test_rejects_unsafe_keys(self, tmp_path, key):
+        """Test keys cannot escape the storage directory or hit temp files."""
+        with pytest.raises(ValueError):
+            LocalStorage(str(tmp_path), "/media").exists(key)
+
+
+class TestGCSStorage:
+    """Test the Google Cloud Storage backend against a mock bucket."""
+
+    def test_put_makes_public(self):
+        """Test uploaded objects are public and addressed by their public URL."""
+        bucket = Mock()
+        blob = bucket.blob.return_value
+        blob.public_url = "https://storage.googleapis.com/b/car_1_a.jpg"
+
+        url = GCSStorage("b", bucket=bucket).put("car_1_a.jpg", b"data", "image/jpeg")
+
+        assert url == blob.public_url
+        blob.upload_from_string.assert_called_once_with(b"data", content_type="image/jpeg")
+        blob.make_public.assert_called_once()
+
+    def test_stream_put_uses_resumable_writer(self):
+        """Test streamed uploads are finalized and made public on commit."""
+        bucket = Mock()
+        blob = bucket.blob.return_value
+
+        writer = GCSStorage("b", bucket=bucket).stream_put("car_1_a.jpg", "image/png", 262144)
+        writer.write(b"chunk")
+        writer.commit()
+
+        blob.open.assert_called_once_with("wb", chunk_size=262144, content_type="image/png")
+        blob.open.return_value.write.assert_called_once_with(b"chunk")
+        blob.open.return_value.close.assert_called_once()
+        blob.make_public.assert_called_once()
+
+    def test_delete_missing_key(self):
+        """Test NotFound on delete is swallowed."""
+        bucket = Mock()
+        bucket.blob.return_value.delete.side_effect = NotFound("gone")
+
+        GCSStorage("b", bucket=bucket).delete("car_1_a.jpg")
+
+
+def test_unknown_backend():
+    """Test an unknown STORAGE_BACKEND fails loudly."""
+    with pytest.raises(ValueError):
+        create_storage_backend("s3", "bucket", "./media", "/media")
+
+
+class TestPhotoEndpointsOnLocalStorage:
+    """Test the photo endpoints end to end against local disk."""
+
+    def test_upload_and_delete(self, client, test_db, local_storage):
+        """Test the original lands on disk and delete removes it."""
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        files = {"file": ("car.jpg", io.BytesIO(b"not decodable"), "image/jpeg")}
+
+        uploaded = client.post(f"/cars/{car.id}/photos", files=files).json()
+        photo_url = uploaded["photo_url"]
+
+        key = photo_url.split("/")[-1]
+        assert photo_url == f"/media/{key}"
+        assert local_storage.exists(key)
+        assert client.delete(f"/cars/{car.id}/photos/{uploaded['photo_id']}").status_code == status.HTTP_200_OK
+        assert not local_storage.exists(key)
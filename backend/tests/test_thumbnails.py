@@ -0,0 +1,135 @@
+"""Tests for photo derivatives - thumbnails.py and their use by POST /cars/{id}/photos."""
+import io
+import pytest
+from fastapi import status
+from PIL import Image
+from factories import ToyotaCamryFactory
+from thumbnails import PHOTO_SIZES, InvalidImage, render_derivatives
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_image(size=(2000, 1000), image_format="JPEG", mode="RGB", orientation=None, color="red"):
+    exif = Image.Exif()
+    exif[MAKE] = "TestCam"
+    if orientation:
+        exif[ORIENTATION] = orientation
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, image_format, exif=exif.tobytes())
+    return output.getvalue()
+
+
+def open_image(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+class TestRenderDerivatives:
+    """Test resizing, orientation and metadata handling."""
+
+    def test_every_size_fits_its_box(self):
+        """Test each derivative's longest edge matches its size."""
+        derivatives = render_derivatives(make_image(), "webp")
+
+        assert set(derivatives) == set(PHOTO_SIZES)
+        for name, edge in PHOTO_SIZES.items():
+            image = open_image(derivatives[name])
+            assert image.format == "WEBP"
+            assert image.size == (edge, edge // 2)
+
+    def test_small_originals_are_not_upscaled(self):
+        """Test an image below every size keeps its dimensions."""
+        derivatives = render_derivatives(make_image(size=(100, 50)), "jpeg")
+
+        assert all(open_image(data).size == (100, 50) for data in derivatives.values())
+
+    def test_exif_orientation_applied(self):
+        """Test a sideways-tagged photo comes out upright."""
+        derivatives = render_derivatives(make_image(size=(400, 200), orientation=6), "jpeg")
+
+        assert open_image(derivatives["full"]).size == (200, 400)
+
+    def test_metadata_stripped(self):
+        """Test no EXIF survives re-encoding."""
+        derivatives = render_derivatives(make_image(orientation=6), "jpeg")
+
+        assert all(len(open_image(data).getexif()) == 0 for data in derivatives.values())
+
+    def test_alpha_flattened_for_jpeg(self):
+        """Test transparent PNGs encode as RGB JPEG and keep alpha in WebP."""
+        png = make_image(size=(300, 300), image_format="PNG", mode="RGBA", color=(255, 0, 0, 128))
+
+        assert open_image(render_derivatives(png, "jpeg")["card"]).mode == "RGB"
+        assert open_image(render_derivatives(png, "webp")["card"]).mode == "RGBA"
+
+    def test_invalid_image(self):
+        """Test undecodable uploads raise InvalidImage."""
+        with pytest.raises(InvalidImage):
+            render_derivatives(b"not an image")
+
+
+class TestUploadDerivatives:
+    """Test uploads store per-size derivatives and expose their URLs."""
+
+    @pytest.fixture
+    def car_id(self, test_db):
+        car = ToyotaCamryFactory()
+        test_db.add(car)
+        test_db.commit()
+        return car.id
+
+    @pytest.fixture
+    def bucket(self, mock_storage_client, monkeypatch):
+        blobs = {}
+
+        def blob(name):
+            if name not in blobs:
+                blobs[name] = mock_storage_client['blob'].__class__()
+                blobs[name].public_url = f"https://storage.googleapis.com/test-bucket/{name}"
+            return blobs[name]
+
+        mock_storage_client['bucket'].blob.side_effect = blob
+        return blobs
+
+    def test_upload_stores_sizes(self, client, car_id, bucket):
+        """Test each size is encoded in the pool, uploaded and listed on the car."""
+        files = {"file": ("car.jpg", io.BytesIO(make_image()), "image/jpeg")}
+
+        response = client.post(f"/cars/{car_id}/photos", files=files)
+
+        assert response.status_code == status.HTTP_200_OK
+        sizes = response.json()["sizes"]
+        assert set(sizes) == set(PHOTO_SIZES)
+        assert all(url.endswith(f"_{name}.webp") for name, url in sizes.items())
+        thumbnail = bucket[sizes["thumbnail"].split("/")[-1]]
+        content, kwargs = thumbnail.upload_from_string.call_args
+        assert kwargs["content_type"] == "image/webp"
+        assert open_image(content[0]).size == (160, 80)
+
+        car = client.get(f"/cars/{car_id}").json()
+        assert car["photo_sizes"] == [sizes]
+        assert car["photos"] == [response.json()["photo_url"]]
+
+    def test_undecodable_upload_keeps_original_only(self, client, car_id, bucket):
+        """Test a file Pillow cannot read is stored without derivatives."""
+        files = {"file": ("car.jpg", io.BytesIO(b"fake image content"), "image/jpeg")}
+
+        response = client.post(f"/cars/{car_id}/photos", files=files)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["sizes"] == {}
+        assert client.get(f"/cars/{car_id}").json()["photo_sizes"] == [{}]
+
+    def test_delete_removes_sizes(self, client, car_id, bucket):
+        """Test deleting a photo deletes its derivatives and size map."""
+        files = {"file": ("car.jpg", io.BytesIO(make_image()), "image/jpeg")}
+        uploaded = client.post(f"/cars/{car_id}/photos", files=files).json()
+        sizes = uploaded["sizes"]
+
+        response = client.delete(f"/cars/{car_id}/photos/{uploaded['photo_id']}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert all(bucket[url.split("/")[-1]].delete.called for url in sizes.values())
+        assert client.get(f"/cars/{car_id}").json()["photo_sizes"] == []
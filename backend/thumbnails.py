@@ -0,0 +1,93 @@
+"""Resized derivatives of uploaded car photos.
+
+Every upload is re-encoded into ``PHOTO_SIZES`` (longest edge in pixels) as
+WebP or JPEG, with the EXIF orientation applied and all metadata (EXIF, GPS,
+ICC, XMP) dropped. Decoding and encoding are CPU bound, so they run in a
+bounded process pool instead of on the event loop or the request threadpool.
+"""
+import asyncio
+import io
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+PHOTO_SIZES = {"thumbnail": 160, "card": 480, "full": 1600}
+PHOTO_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+PHOTO_FORMAT = os.getenv("PHOTO_FORMAT", "webp")
+PHOTO_QUALITY = int(os.getenv("PHOTO_QUALITY", "80"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Refuse decompression bombs well before they exhaust a worker's memory
+MAX_IMAGE_PIXELS = 50_000_000
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image Pillow can decode."""
+
+
+def render_derivatives(data: bytes, photo_format: str = PHOTO_FORMAT,
+                       quality: int = PHOTO_QUALITY) -> Dict[str, bytes]:
+    """Return ``{size_name: encoded_bytes}`` for every entry in PHOTO_SIZES."""
+    # Imported here so only the encoder processes pay for Pillow
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    pillow_format, _ = PHOTO_FORMATS[photo_format]
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            # JPEGs decode straight at a reduced scale no smaller than the largest size
+            largest = max(PHOTO_SIZES.values())
+            original.draft(None, (largest, largest))
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+
+    # JPEG has no alpha channel; WebP keeps it
+    keep_alpha = pillow_format == "WEBP" and image.mode in ("RGBA", "LA", "PA")
+    image = image.convert("RGBA" if keep_alpha else "RGB")
+
+    derivatives = {}
+    for name, edge in PHOTO_SIZES.items():
+        resized = image.copy()
+        # Never upscale: a small original is only re-encoded
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        output = io.BytesIO()
+        # No exif/icc_profile arguments, so the encoded file carries no metadata
+        resized.save(output, pillow_format, quality=quality, optimize=pillow_format == "JPEG")
+        derivatives[name] = output.getvalue()
+    return derivatives
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+    return _pool
+
+
+async def render_in_pool(data: bytes, photo_format: str = PHOTO_FORMAT) -> Dict[str, bytes]:
+    """Render derivatives in the process pool.
+
+    At most two jobs per worker are queued at once, so a burst of uploads
+    waits here (holding only its request) instead of piling image data
+    into the pool's unbounded queue.
+    """
+    loop = asyncio.get_running_loop()
+    # Semaphores belong to one event loop; tests and tools may run several in turn
+    slots = _slots.setdefault(loop, asyncio.Semaphore(THUMBNAIL_WORKERS * 2))
+    async with slots:
+        return await loop.run_in_executor(get_pool(), render_derivatives, data, photo_format)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = None
+    _slots.clear()
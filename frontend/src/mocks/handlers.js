@@ -100,13 +100,14 @@ export const handlers = [
       ctx.status(200),
       ctx.json({
         message: 'Photo uploaded successfully',
+        photo_id: 1,
         photo_url: 'https://example.com/new-photo.jpg'
       })
     );
   }),
 
   // Delete photo
-  rest.delete(`${API_BASE}/cars/:id/photos/:photoIndex`, (req, res, ctx) => {
+  rest.delete(`${API_BASE}/cars/:id/photos/:photoId`, (req, res, ctx) => {
     return res(
       ctx.status(200),
       ctx.json({ message: 'Photo deleted successfully' })